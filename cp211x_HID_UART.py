@@ -18,7 +18,11 @@ Python wrapper for Silabs CP211x library (SLABHIDtoUART.dll).
 Documentation for the library is provided by HID_to_UART_API_Specification.doc.
 """
 
+import os
+import struct
 import sys
+import threading
+import time
 # from ComPortTestSuite import *
 
 import ctypes as ct
@@ -27,9 +31,13 @@ __version__ = "0.0.3"
 __date__ = "02 September 2015"
 
 __all__ = ['HID_UART', 'HID_UART_STATUS_DESC',
-           'HidUartDevice', 'HidUartError', 'IsOpened',
-           'GetNumDevices', 'GetAttributes', 'GetString',
-           'GetLibraryVersion', 'GetHidLibraryVersion', "TestInvalDevIndex"]
+           'HidUartDevice', 'HidUartError', 'HidUartWriteTimeoutError', 'IsOpened',
+           'GetNumDevices', 'GetAttributes', 'GetString', 'GetDeviceIndex',
+           'DeviceIndex', 'DeviceEntry', 'LatchTransaction', 'DeviceInfo',
+           'GetLibraryVersion', 'GetHidLibraryVersion', "TestInvalDevIndex",
+           'LoadLibrary', 'SetLibrary', 'SetLibraryPath',
+           'IO_MODE_LATENCY', 'IO_MODE_THROUGHPUT', 'IO_MODE_AUTO',
+           'STALE_HANDLE_STATUSES', 'close_quietly']
 
 # ==============================================================================
 
@@ -88,8 +96,21 @@ HID_UART_STATUS_DESC = {
 # Constant definitions copied from the public DLL header
 HID_UART_SUCCESS = 0x00
 HID_UART_DEVICE_NOT_FOUND = 0x01
+HID_UART_INVALID_HANDLE = 0x02
+HID_UART_INVALID_DEVICE_OBJECT = 0x03
+HID_UART_INVALID_PARAMETER = 0x04
+HID_UART_INVALID_REQUEST_LENGTH = 0x05
+HID_UART_READ_ERROR = 0x10
+HID_UART_WRITE_ERROR = 0x11
 HID_UART_READ_TIMED_OUT = 0x12
 HID_UART_WRITE_TIMED_OUT = 0x13
+HID_UART_DEVICE_IO_FAILED = 0x14
+HID_UART_DEVICE_ACCESS_ERROR = 0x15
+HID_UART_DEVICE_NOT_SUPPORTED = 0x16
+HID_UART_UNKNOWN_ERROR = 0xFF
+
+# Maximum UART payload carried by one CP2110 interrupt report
+HID_UART_MAX_REPORT_PAYLOAD = 63
 
 HID_UART_SHORT_STOP_BIT = 0
 HID_UART_LONG_STOP_BIT = 1
@@ -105,6 +126,20 @@ HID_UART_SIX_DATA_BITS = 1
 HID_UART_SEVEN_DATA_BITS = 2
 HID_UART_EIGHT_DATA_BITS = 3
 
+# GPIO latch bit that switches DUT power (PowerOff/PowerOn/PowerCycle)
+POWER_PIN_MASK = 0x0004
+POWER_ON_LATCH = 0x0004
+POWER_OFF_LATCH = 0x0000
+
+# HidUartDevice.SetIoMode() read strategies
+IO_MODE_LATENCY = "latency"
+IO_MODE_THROUGHPUT = "throughput"
+IO_MODE_AUTO = "auto"
+
+# Statuses after which a handle is lost (unplug, Reset(), USB error) and must be reopened
+STALE_HANDLE_STATUSES = (HID_UART_INVALID_HANDLE, HID_UART_DEVICE_IO_FAILED,
+                         HID_UART_DEVICE_NOT_FOUND)
+
 
 class HidUartError(Exception):
     def __init__(self, status):
@@ -118,49 +153,339 @@ class HidUartError(Exception):
         return self.name
 
 
+class HidUartWriteTimeoutError(HidUartError):
+    """HID_UART_WRITE_TIMED_OUT with the number of bytes that did go out."""
+
+    def __init__(self, written, requested):
+        HidUartError.__init__(self, HID_UART_WRITE_TIMED_OUT)
+        self.written = written
+        self.requested = requested
+
+    def __str__(self):
+        return "{} ({} of {} bytes written)".format(
+            self.name, self.written, self.requested)
+
+
 def hiduart_errcheck(result, func, args):
     if result != HID_UART_SUCCESS:
         raise HidUartError(result)
 
 
+def _as_ctypes_buffer(buffer, writable):
+    """Returns (ctypes object, size in bytes) that aliases buffer's memory.
+
+    bytes objects are passed through as-is (ctypes hands the library a pointer
+    to their storage). Writable buffers are wrapped with from_buffer, which
+    shares memory instead of copying. Read-only buffers other than bytes
+    (e.g. a memoryview over bytes) cannot be aliased by ctypes and are copied.
+    """
+    if isinstance(buffer, bytes):
+        if writable:
+            raise TypeError("ReadInto requires a writable buffer, not bytes")
+        return buffer, len(buffer)
+    if isinstance(buffer, bytearray):
+        nbytes = len(buffer)
+        return ((ct.c_char * nbytes).from_buffer(buffer) if nbytes else None), nbytes
+    view = memoryview(buffer)
+    if view.format != 'B' or view.ndim != 1:
+        view = view.cast('B')
+    nbytes = view.nbytes
+    if view.readonly:
+        if writable:
+            raise TypeError("ReadInto requires a writable buffer")
+        return view.tobytes(), nbytes
+    if nbytes == 0:
+        return None, 0
+    return (ct.c_char * nbytes).from_buffer(view), nbytes
+
+
+def _as_ctypes_pointer(buffer, writable):
+    """Like _as_ctypes_buffer, but returns a pointer to the first byte.
+
+    Aliasing one c_char costs about half as much as building a sized array,
+    but the result has no buffer interface, so it is only passed to compiled
+    libraries (Python stand-ins get _as_ctypes_buffer's arrays).
+    """
+    if isinstance(buffer, bytes):
+        if writable:
+            raise TypeError("ReadInto requires a writable buffer, not bytes")
+        return buffer, len(buffer)
+    if isinstance(buffer, bytearray):
+        nbytes = len(buffer)
+        return (ct.byref(ct.c_char.from_buffer(buffer)) if nbytes else None), nbytes
+    view = memoryview(buffer)
+    if view.format != 'B' or view.ndim != 1:
+        view = view.cast('B')
+    nbytes = view.nbytes
+    if view.readonly:
+        if writable:
+            raise TypeError("ReadInto requires a writable buffer")
+        return view.tobytes(), nbytes
+    if nbytes == 0:
+        return None, 0
+    return ct.byref(ct.c_char.from_buffer(view)), nbytes
+
+
 # ==============================================================================
 # CP211x HIDtoUART DLL
 # ==============================================================================
 
-if sys.platform == 'win32':
-    _DLL = ct.windll.LoadLibrary("SLABHIDtoUART.dll")
-elif sys.platform.startswith('linux'):
-    _DLL_prev = ct.CDLL("./libslabhiddevice.so.1.0", mode=ct.RTLD_GLOBAL)
-    _DLL = ct.cdll.LoadLibrary("./libslabhidtouart.so.1.0")
-elif sys.platform == 'darwin':
-    _DLL = ct.cdll.LoadLibrary("libSLABHIDtoUART.dylib")
+# Library locations are resolved on first use, in this order:
+#  1. SetLibraryPath() / LoadLibrary() arguments
+#  2. the CP211X_LIB_DIR environment variable
+#  3. LD_LIBRARY_PATH entries
+#  4. the SDK directory created by setup_cp2110_linux.sh next to this module
+#  5. this module's directory and the current working directory
+#  6. the system loader's default search path
+LIB_DIR_ENV = "CP211X_LIB_DIR"
+
+_LIBRARY_NAMES = {
+    'win32': ("SLABHIDtoUART.dll", None),
+    'linux': ("libslabhidtouart.so.1.0", "libslabhiddevice.so.1.0"),
+    'darwin': ("libSLABHIDtoUART.dylib", None),
+}
+
+_SDK_LIB_ARCH = {
+    'x86_64': "x86_64", 'amd64': "x86_64",
+    'i386': "x86_32", 'i686': "x86_32",
+}
+
+_library_config = {'uart': None, 'hid': None}
+_library_lock = threading.RLock()
+_DLL_prev = None
+
+# Functions whose non-zero status raises HidUartError through hiduart_errcheck
+_ERRCHECK_FUNCTIONS = ["HidUart_GetNumDevices",
+                       "HidUart_GetAttributes", "HidUart_GetString",
+                       "HidUart_GetLibraryVersion", "HidUart_GetHidLibraryVersion",
+                       "HidUart_Open", "HidUart_Close",
+                       "HidUart_IsOpened", "HidUart_GetPartNumber",
+                       "HidUart_GetOpenedAttributes", "HidUart_GetOpenedString",
+                       "HidUart_SetUartEnable", "HidUart_GetUartEnable",
+                       "HidUart_FlushBuffers", "HidUart_CancelIo",
+                       "HidUart_SetTimeouts", "HidUart_GetTimeouts",
+                       "HidUart_SetUartConfig", "HidUart_GetUartConfig",
+                       "HidUart_GetUartStatus", "HidUart_Reset",
+                       "HidUart_StartBreak", "HidUart_StopBreak",
+                       "HidUart_ReadLatch", "HidUart_WriteLatch"]
+
+
+# C prototypes (SLABHIDtoUART.h). Pointer arguments are declared as void* so
+# that byref() out-parameters of any width and ctypes/bytes buffers pass as-is.
+_HANDLE = ct.c_void_p
+_PTR = ct.c_void_p
+_DWORD = ct.c_uint32
+_WORD = ct.c_uint16
+_BYTE = ct.c_uint8
+_BOOL = ct.c_int
+_PROTOTYPES = {
+    "HidUart_GetNumDevices": (_PTR, _WORD, _WORD),
+    "HidUart_GetAttributes": (_DWORD, _WORD, _WORD, _PTR, _PTR, _PTR),
+    "HidUart_GetString": (_DWORD, _WORD, _WORD, _PTR, _DWORD),
+    "HidUart_GetLibraryVersion": (_PTR, _PTR, _PTR),
+    "HidUart_GetHidLibraryVersion": (_PTR, _PTR, _PTR),
+    "HidUart_Open": (_PTR, _DWORD, _WORD, _WORD),
+    "HidUart_Close": (_HANDLE,),
+    "HidUart_IsOpened": (_HANDLE, _PTR),
+    "HidUart_GetPartNumber": (_HANDLE, _PTR, _PTR),
+    "HidUart_GetOpenedAttributes": (_HANDLE, _PTR, _PTR, _PTR),
+    "HidUart_GetOpenedString": (_HANDLE, _PTR, _DWORD),
+    "HidUart_SetUartEnable": (_HANDLE, _BOOL),
+    "HidUart_GetUartEnable": (_HANDLE, _PTR),
+    "HidUart_Read": (_HANDLE, _PTR, _DWORD, _PTR),
+    "HidUart_Write": (_HANDLE, _PTR, _DWORD, _PTR),
+    "HidUart_FlushBuffers": (_HANDLE, _BOOL, _BOOL),
+    "HidUart_CancelIo": (_HANDLE,),
+    "HidUart_SetTimeouts": (_HANDLE, _DWORD, _DWORD),
+    "HidUart_GetTimeouts": (_HANDLE, _PTR, _PTR),
+    "HidUart_GetUartStatus": (_HANDLE, _PTR, _PTR, _PTR, _PTR),
+    "HidUart_SetUartConfig": (_HANDLE, _DWORD, _BYTE, _BYTE, _BYTE, _BYTE),
+    "HidUart_GetUartConfig": (_HANDLE, _PTR, _PTR, _PTR, _PTR, _PTR),
+    "HidUart_StartBreak": (_HANDLE, _BYTE),
+    "HidUart_StopBreak": (_HANDLE,),
+    "HidUart_Reset": (_HANDLE,),
+    "HidUart_ReadLatch": (_HANDLE, _PTR),
+    "HidUart_WriteLatch": (_HANDLE, _WORD, _WORD),
+}
 
-# for win_function in ["HidUart_GetHidGuid",
+# Per-transfer entry points that HidUartDevice calls through _hot_functions()
+_HOT_FUNCTIONS = ("HidUart_Read", "HidUart_Write", "HidUart_ReadLatch", "HidUart_WriteLatch",
+                  "HidUart_GetUartStatus", "HidUart_GetTimeouts", "HidUart_SetTimeouts")
+
+
+def _platform_key():
+    if sys.platform.startswith('linux'):
+        return 'linux'
+    return sys.platform
+
+
+def _library_search_dirs():
+    import platform
+    dirs = []
+    if os.environ.get(LIB_DIR_ENV):
+        dirs.append(os.environ[LIB_DIR_ENV])
+    dirs.extend(d for d in os.environ.get("LD_LIBRARY_PATH", "").split(os.pathsep) if d)
+    here = os.path.dirname(os.path.abspath(__file__))
+    machine = platform.machine().lower()
+    arch = _SDK_LIB_ARCH.get(machine, "arm7" if machine.startswith("arm") else "x86_64")
+    dirs.append(os.path.join(here, "sdk", "USBXpressHostSDK", "CP2110_4", "lib", arch))
+    dirs.append(here)
+    dirs.append(os.getcwd())
+    return dirs
+
+
+def _resolve_library(name, configured):
+    """Returns the path to load for name: the configured path, the first hit in the search dirs, or name."""
+    if configured:
+        if os.path.isdir(configured):
+            return os.path.join(configured, name)
+        return configured
+    for directory in _library_search_dirs():
+        path = os.path.join(directory, name)
+        if os.path.exists(path):
+            return path
+    return name
+
+
+def _bind_prototypes(lib):
+    """Configures return types and error checking on a loaded shared library."""
+    # for win_function in ["HidUart_GetHidGuid",
     # "HidUart_GetIndexedString", "HidUart_GetOpenedIndexedString"]:
-    # fnc = getattr(_DLL, win_function)
+    # fnc = getattr(lib, win_function)
     # fnc.restype = ct.c_int
     # fnc.errcheck = hiduart_errcheck
 
-for hiduart_function in ["HidUart_GetNumDevices",
-                         "HidUart_GetAttributes", "HidUart_GetString",
-                         "HidUart_GetLibraryVersion", "HidUart_GetHidLibraryVersion",
-                         "HidUart_Open", "HidUart_Close",
-                         "HidUart_IsOpened", "HidUart_GetPartNumber",
-                         "HidUart_GetOpenedAttributes", "HidUart_GetOpenedString",
-                         "HidUart_SetUartEnable", "HidUart_GetUartEnable",
-                         "HidUart_FlushBuffers", "HidUart_CancelIo",
-                         "HidUart_SetTimeouts", "HidUart_GetTimeouts",
-                         "HidUart_SetUartConfig", "HidUart_GetUartConfig",
-                         "HidUart_GetUartStatus", "HidUart_Reset",
-                         "HidUart_StartBreak", "HidUart_StopBreak",
-                         "HidUart_ReadLatch", "HidUart_WriteLatch"]:
-    fnc = getattr(_DLL, hiduart_function)
-    fnc.restype = ct.c_int
-    fnc.errcheck = hiduart_errcheck
-
-# Don't want hiduart_errcheck for these functions
-getattr(_DLL, "HidUart_Read").restype = ct.c_int
-getattr(_DLL, "HidUart_Write").restype = ct.c_int
+    for hiduart_function in _ERRCHECK_FUNCTIONS:
+        fnc = getattr(lib, hiduart_function)
+        fnc.restype = ct.c_int
+        fnc.argtypes = _PROTOTYPES[hiduart_function]
+        fnc.errcheck = hiduart_errcheck
+
+    # Don't want hiduart_errcheck for these functions
+    for hiduart_function in ("HidUart_Read", "HidUart_Write"):
+        fnc = getattr(lib, hiduart_function)
+        fnc.restype = ct.c_int
+        fnc.argtypes = _PROTOTYPES[hiduart_function]
+
+    # Separate function pointers for the per-transfer calls: no errcheck callback
+    # (callers test the status inline) and no argtypes, whose per-argument
+    # from_param conversions cost as much as the call. Callers pass the handle,
+    # out-parameters and buffers as ctypes objects; sizes, timeouts and latch
+    # values go as Python ints, which ctypes passes as C ints (DWORD and WORD
+    # parameters take their low bits, as with the declared prototypes).
+    hot = []
+    for hiduart_function in _HOT_FUNCTIONS:
+        fnc = lib[hiduart_function]
+        fnc.restype = ct.c_int
+        hot.append(fnc)
+    lib._hot_functions = tuple(hot)
+
+
+def _hot_functions(lib):
+    """Returns the _HOT_FUNCTIONS entry points of lib, each returning its status.
+
+    Python stand-ins return HID_UART_SUCCESS or raise, which callers handle
+    the same way. The lazy placeholder resolves the library on first call.
+    """
+    hot = getattr(lib, "_hot_functions", None)
+    if hot is not None:
+        return hot
+    if isinstance(lib, _LazyLibrary):
+        def resolve(name):
+            return lambda *args: getattr(_library(), name)(*args)
+        return tuple(resolve(name) for name in _HOT_FUNCTIONS)
+    return tuple(getattr(lib, name) for name in _HOT_FUNCTIONS)
+
+
+def SetLibraryPath(uart=None, hid=None):
+    """
+    Sets where the SLABHIDtoUART (and on Linux, SLABHIDDevice) libraries are loaded from.
+
+    Either argument may be a file or a directory. Takes effect on the next
+    library load; call before the first device call or follow with LoadLibrary().
+    """
+    _library_config['uart'] = uart
+    _library_config['hid'] = hid
+
+
+def SetLibrary(lib):
+    """
+    Installs an already loaded library, or any object exposing the HidUart_*
+    entry points with the library's calling convention (e.g. a simulator).
+
+    Python objects must return HID_UART_SUCCESS or raise HidUartError from every
+    function except HidUart_Read/HidUart_Write, which return their status.
+    """
+    global _DLL
+    with _library_lock:
+        if isinstance(lib, ct.CDLL):
+            _bind_prototypes(lib)
+        _DLL = lib
+    return lib
+
+
+def LoadLibrary(uart=None, hid=None):
+    """Loads and binds the vendor libraries now and returns the SLABHIDtoUART handle."""
+    global _DLL, _DLL_prev
+    if uart is not None or hid is not None:
+        SetLibraryPath(uart, hid)
+    key = _platform_key()
+    if key not in _LIBRARY_NAMES:
+        raise OSError("Unsupported platform: " + sys.platform)
+    uart_name, hid_name = _LIBRARY_NAMES[key]
+    with _library_lock:
+        if key == 'win32':
+            lib = ct.windll.LoadLibrary(_resolve_library(uart_name, _library_config['uart']))
+        else:
+            if hid_name:
+                _DLL_prev = ct.CDLL(_resolve_library(hid_name, _library_config['hid']),
+                                    mode=ct.RTLD_GLOBAL)
+            lib = ct.cdll.LoadLibrary(_resolve_library(uart_name, _library_config['uart']))
+        _bind_prototypes(lib)
+        _DLL = lib
+    return lib
+
+
+class _LazyLibrary(object):
+    """Placeholder for _DLL that loads the libraries on first attribute access."""
+
+    def __getattr__(self, name):
+        if not name.startswith("HidUart_"):
+            raise AttributeError(name)
+        with _library_lock:
+            lib = _DLL
+            if lib is self:
+                lib = LoadLibrary()
+        return getattr(lib, name)
+
+
+_DLL = _LazyLibrary()
+
+
+def _library():
+    """Returns the loaded library (or installed stand-in), loading it if needed."""
+    if isinstance(_DLL, _LazyLibrary):
+        with _library_lock:
+            if isinstance(_DLL, _LazyLibrary):
+                return LoadLibrary()
+    return _DLL
+
+
+def _deref(ref):
+    """Returns the ctypes object behind a byref()/pointer() out-parameter.
+
+    Used by Python implementations of the HidUart_* entry points.
+    """
+    obj = getattr(ref, '_obj', None)
+    if obj is not None:
+        return obj
+    return getattr(ref, 'contents', ref)
+
+def _uart_char_time(baud, data, parity, stop):
+    """Returns seconds per UART character for a HID_UART_* configuration."""
+    bits = 1 + 5 + data + (1 if parity != HID_UART_NO_PARITY else 0) + \
+        (2 if stop == HID_UART_LONG_STOP_BIT else 1)
+    return float(bits) / (baud or 115200)
 
 # ==============================================================================
 # Library Functions
@@ -172,31 +497,32 @@ getattr(_DLL, "HidUart_Write").restype = ct.c_int
 # HidUart_GetNumDevices(DWORD* numDevices, WORD vid, WORD pid);
 
 
-def GetNumDevices(vid=HID_UART.VID, pid=HID_UART.PID):
+def GetNumDevices(vid=HID_UART.VID, pid=HID_UART.PID, library=None):
     """Returns the number of devices connected to the host with matching VID/PID."""
     ndev = ct.c_ulong()
-    _DLL.HidUart_GetNumDevices(ct.byref(ndev), vid, pid)
+    (library or _DLL).HidUart_GetNumDevices(ct.byref(ndev), vid, pid)
     return ndev.value
 
 # HidUart_GetAttributes(DWORD deviceNum, WORD vid, WORD pid, WORD* deviceVid, WORD* devicePid, WORD* deviceReleaseNumber);
 
 
-def GetAttributes(index=0, vid=HID_UART.VID, pid=HID_UART.PID):
+def GetAttributes(index=0, vid=HID_UART.VID, pid=HID_UART.PID, library=None):
     """Returns VID, PID and release number for the indexed device with matching VID/PID."""
     dev_vid = ct.c_ushort()
     dev_pid = ct.c_ushort()
     dev_rel = ct.c_ushort()
-    _DLL.HidUart_GetAttributes(index, vid, pid, ct.byref(
+    (library or _DLL).HidUart_GetAttributes(index, vid, pid, ct.byref(
         dev_vid), ct.byref(dev_pid), ct.byref(dev_rel))
     return (dev_vid.value, dev_pid.value, dev_rel.value)
 
 # HidUart_GetString(DWORD deviceNum, WORD vid, WORD pid, char* deviceString, DWORD options);
 
 
-def GetString(index=0, vid=HID_UART.VID, pid=HID_UART.PID, opt=HID_UART.SERIAL_STR):
+def GetString(index=0, vid=HID_UART.VID, pid=HID_UART.PID, opt=HID_UART.SERIAL_STR,
+              library=None):
     """Returns the selected string for the indexed device with matching VID/PID."""
     buf = ct.create_string_buffer(512)
-    _DLL.HidUart_GetString(index, vid, pid, buf, opt)
+    (library or _DLL).HidUart_GetString(index, vid, pid, buf, opt)
     return buf.value.decode()
 
 # HidUart_GetLibraryVersion(BYTE* major, BYTE* minor, BOOL* release);
@@ -235,6 +561,198 @@ def IsOpened(index=0, vid=HID_UART.VID, pid=HID_UART.PID):
     return bool(status == 0x15)
 
 
+def GetDeviceIndex(serial, vid=HID_UART.VID, pid=HID_UART.PID):
+    """Returns the index of the device with matching VID/PID and serial number."""
+    return DeviceIndex.shared(vid, pid).lookup(serial).index
+
+
+# ==============================================================================
+# Device Index
+# ==============================================================================
+
+class _HotplugWatcher(object):
+    """
+    Reports whether hidraw device nodes were added or removed since the last check.
+
+    Uses inotify on /dev where available, so checking is a single non-blocking
+    read. Elsewhere it compares /dev/hidraw* listings, or reports a change on
+    every check when there is no /dev to look at.
+    """
+
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+    _EVENT = struct.Struct("iIII")
+
+    def __init__(self, directory="/dev", prefix="hidraw"):
+        self.directory = directory
+        self.prefix = prefix
+        self._fd = None
+        self._snapshot = None
+        if sys.platform.startswith('linux') and os.path.isdir(directory):
+            try:
+                libc = ct.CDLL(None, use_errno=True)
+                fd = libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+                if fd >= 0:
+                    if libc.inotify_add_watch(fd, directory.encode(),
+                                              self.IN_CREATE | self.IN_DELETE) >= 0:
+                        self._fd = fd
+                    else:
+                        os.close(fd)
+            except (AttributeError, OSError):
+                pass
+            if self._fd is None:
+                self._snapshot = self._listing()
+
+    def _listing(self):
+        try:
+            return sorted(n for n in os.listdir(self.directory) if n.startswith(self.prefix))
+        except OSError:
+            return None
+
+    def changed(self):
+        if self._fd is not None:
+            changed = False
+            while True:
+                try:
+                    data = os.read(self._fd, 4096)
+                except BlockingIOError:
+                    return changed
+                offset = 0
+                while offset < len(data):
+                    wd, mask, cookie, length = self._EVENT.unpack_from(data, offset)
+                    offset += self._EVENT.size
+                    name = data[offset:offset + length].rstrip(b"\0")
+                    offset += length
+                    if name.startswith(self.prefix.encode()):
+                        changed = True
+        if self._snapshot is not None:
+            listing = self._listing()
+            changed = listing != self._snapshot
+            self._snapshot = listing
+            return changed
+        return True
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class DeviceEntry(object):
+    """Enumeration data for one device in a DeviceIndex."""
+
+    __slots__ = ('index', 'serial', 'path', 'vid', 'pid', 'release', 'status')
+
+    def __init__(self, index, serial=None, path=None, vid=None, pid=None,
+                 release=None, status=HID_UART_SUCCESS):
+        self.index = index
+        self.serial = serial
+        self.path = path
+        self.vid = vid
+        self.pid = pid
+        self.release = release
+        self.status = status    # HidUart status if the device could not be queried
+
+    def __repr__(self):
+        return "DeviceEntry(index={}, serial={!r}, path={!r})".format(
+            self.index, self.serial, self.path)
+
+
+class DeviceIndex(object):
+    """
+    Cached enumeration of the devices with matching VID/PID.
+
+    The bus is enumerated once and kept as serial -> DeviceEntry; it is only
+    enumerated again when hidraw nodes come or go, so lookups by serial number
+    are a dict access. Devices that are opened elsewhere cannot be queried and
+    are listed with their HidUart status instead of a serial number.
+    """
+
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, vid=HID_UART.VID, pid=HID_UART.PID, watcher=None, library=None):
+        self.vid = vid
+        self.pid = pid
+        self.library = library
+        self.entries = []
+        self._by_serial = {}
+        self._watcher = watcher if watcher is not None else _HotplugWatcher()
+        self._lock = threading.Lock()
+        self._valid = False
+        self.refreshes = 0
+
+    @classmethod
+    def shared(cls, vid=HID_UART.VID, pid=HID_UART.PID):
+        """Returns the process-wide DeviceIndex for vid/pid."""
+        with cls._shared_lock:
+            index = cls._shared.get((vid, pid))
+            if index is None:
+                index = cls._shared[(vid, pid)] = cls(vid, pid)
+            return index
+
+    def __len__(self):
+        self.sync()
+        return len(self.entries)
+
+    def __iter__(self):
+        self.sync()
+        return iter(list(self.entries))
+
+    def invalidate(self):
+        """Forces the next lookup to enumerate the bus again."""
+        self._valid = False
+
+    def sync(self):
+        """Enumerates the bus if devices were added or removed since the last call."""
+        with self._lock:
+            if self._watcher.changed() or not self._valid:
+                self._refresh()
+
+    def refresh(self):
+        """Enumerates the bus now."""
+        with self._lock:
+            self._watcher.changed()
+            self._refresh()
+
+    def _refresh(self):
+        entries = []
+        by_serial = {}
+        lib = self.library
+        for index in range(GetNumDevices(self.vid, self.pid, lib)):
+            entry = DeviceEntry(index)
+            try:
+                entry.serial = GetString(index, self.vid, self.pid, HID_UART.SERIAL_STR, lib)
+                entry.path = GetString(index, self.vid, self.pid, HID_UART.PATH_STR, lib)
+                entry.vid, entry.pid, entry.release = GetAttributes(index, self.vid, self.pid, lib)
+            except HidUartError as e:
+                entry.status = e.status
+            entries.append(entry)
+            if entry.serial is not None:
+                by_serial[entry.serial] = entry
+        self.entries = entries
+        self._by_serial = by_serial
+        self._valid = True
+        self.refreshes += 1
+
+    def lookup(self, serial):
+        """Returns the DeviceEntry for serial, raising HID_UART_DEVICE_NOT_FOUND if absent."""
+        self.sync()
+        entry = self._by_serial.get(serial)
+        if entry is None:
+            raise HidUartError(HID_UART_DEVICE_NOT_FOUND)
+        return entry
+
+    def serials(self):
+        self.sync()
+        return list(self._by_serial)
+
+    def close(self):
+        self._watcher.close()
+
+
 # ==============================================================================
 # HidUart Class
 # ==============================================================================
@@ -262,23 +780,97 @@ class HidUartDevice(object):
 
     def __init__(self):
         self.handle = ct.c_void_p(0)
+        self._bind_library(_DLL)
+        # Reused across calls so the I/O paths do not allocate per transfer
+        self._rx_count = ct.c_ulong(0)
+        self._rx_count_ref = ct.byref(self._rx_count)
+        self._tx_count = ct.c_ulong(0)
+        self._tx_count_ref = ct.byref(self._tx_count)
+        self._latch_out = ct.c_ushort(0)
+        self._latch_out_ref = ct.byref(self._latch_out)
+        self._status_out = (ct.c_ushort(0), ct.c_ushort(0), ct.c_byte(0), ct.c_byte(0))
+        self._status_out_refs = tuple(ct.byref(v) for v in self._status_out)
+        self._timeouts_out = (ct.c_ulong(0), ct.c_ulong(0))
+        self._timeouts_out_refs = tuple(ct.byref(v) for v in self._timeouts_out)
+        self._rx_buffer = bytearray(256)
+        # Shadow copy of the GPIO latch; only bits in _latch_known are trusted
+        self._latch = 0
+        self._latch_known = 0
+        self._latch_verified_at = 0.0
+        self._latch_lock = threading.Lock()
+        self._latch_verify_interval = None
+        self._latch_timer = None
+        self._latch_timer_generation = 0
+        self.latch_drift = 0
+        # expect() state
+        self._expect_buffer = ""
+        self._expect_decoder = None
+        self.match = None
+        self.before = ""
+        self.after = ""
+        self.expect_elapsed = 0.0
+        self.linesep = "\r"
+        # SetIoMode() state: None keeps the caller's fixed timeouts
+        self._io_mode = None
+        self._io_active = None
+        self._io_fill = 0.0
+        self._char_time = 10.0 / 115200
+        self._rto = None
+        self._wto = None
+        self._io_saved = None
+        # Descriptors that cannot change while the handle is open (GetDeviceInfo)
+        self._static_info = None
+        self._string_buffer = None
+        self.latency_idle_ms = 2
+        self.throughput_max_ms = 1000
 
     # HidUart_Open(HID_UART_DEVICE* device, DWORD deviceNum, WORD vid, WORD pid);
-    def Open(self, DevIndex, vid=HID_UART.VID, pid=HID_UART.PID):
-        GetNumDevices()
-        _DLL.HidUart_Open(ct.byref(self.handle), DevIndex, vid, pid)
+    def Open(self, DevIndex=0, vid=HID_UART.VID, pid=HID_UART.PID, serial=None,
+             backend=None):
+        """Opens the device by index (default 0), or by serial number through the shared DeviceIndex.
+
+        The library's device list is only re-enumerated when devices were
+        added or removed since the last Open. backend selects an alternative
+        implementation of the HidUart_* entry points for this device (see
+        SetLibrary); by default the vendor library is used.
+        """
+        if backend is not None:
+            self._bind_library(backend)
+            if serial is not None:
+                DevIndex = DeviceIndex(vid, pid, library=backend).lookup(serial).index
+        else:
+            self._bind_library(_library())
+            index = DeviceIndex.shared(vid, pid)
+            if serial is not None:
+                DevIndex = index.lookup(serial).index
+            else:
+                index.sync()
+        self._dll.HidUart_Open(ct.byref(self.handle), DevIndex, vid, pid)
+        self._latch_known = 0
+        self._static_info = None
+        self._schedule_latch_verify()
+
+    def _bind_library(self, lib):
+        """Selects the library (or stand-in) this device calls, including its hot entry points."""
+        self._dll = lib
+        self._c_buffer = _as_ctypes_pointer if isinstance(lib, ct.CDLL) else _as_ctypes_buffer
+        (self._hot_read, self._hot_write, self._hot_read_latch, self._hot_write_latch,
+         self._hot_get_uart_status, self._hot_get_timeouts,
+         self._hot_set_timeouts) = _hot_functions(lib)
 
     # HidUart_Close(HID_UART_DEVICE device);
     def Close(self):
         if self.handle.value:
-            _DLL.HidUart_Close(self.handle)
+            self._dll.HidUart_Close(self.handle)
             self.handle.value = 0
+        self._static_info = None
+        self._schedule_latch_verify()
 
     # HidUart_IsOpened(HID_UART_DEVICE device, BOOL* opened);
     def IsOpened(self):
         opened = ct.c_long(0)
         if self.handle:
-            _DLL.HidUart_IsOpened(self.handle, ct.byref(opened))
+            self._dll.HidUart_IsOpened(self.handle, ct.byref(opened))
         return bool(opened.value)
 
     # HidUart_GetOpenedAttributes(HID_UART_DEVICE device, WORD* deviceVid, WORD* devicePid, WORD* deviceReleaseNumber);
@@ -286,7 +878,7 @@ class HidUartDevice(object):
         vid = ct.c_ushort(0)
         pid = ct.c_ushort(0)
         rel = ct.c_ushort(0)
-        _DLL.HidUart_GetOpenedAttributes(
+        self._dll.HidUart_GetOpenedAttributes(
             self.handle, ct.byref(vid), ct.byref(pid), ct.byref(rel))
         return (vid.value, pid.value, rel.value)
 
@@ -294,84 +886,207 @@ class HidUartDevice(object):
     def GetPartNumber(self):
         pno = ct.c_byte(0)
         ver = ct.c_byte(0)
-        _DLL.HidUart_GetPartNumber(self.handle, ct.byref(pno), ct.byref(ver))
+        self._dll.HidUart_GetPartNumber(self.handle, ct.byref(pno), ct.byref(ver))
         return (pno.value, ver.value)
 
     # HidUart_GetOpenedString(HID_UART_DEVICE device, char* deviceString, DWORD options);
     def GetString(self, opt=HID_UART.SERIAL_STR):
-        buf = ct.create_string_buffer(512)
-        _DLL.HidUart_GetOpenedString(self.handle, buf, opt)
+        buf = self._string_buffer
+        if buf is None:
+            buf = self._string_buffer = ct.create_string_buffer(512)
+        buf[0] = b"\0"
+        self._dll.HidUart_GetOpenedString(self.handle, buf, opt)
         return buf.value.decode()
 
     # HidUart_SetUartEnable(HID_UART_DEVICE device, BOOL enable);
     def SetUartEnable(self, enable=True):
-        _DLL.HidUart_SetUartEnable(self.handle, enable)
+        self._dll.HidUart_SetUartEnable(self.handle, enable)
 
     # HidUart_GetUartEnable(HID_UART_DEVICE device, BOOL* enable);
     def GetUartEnable(self):
         enable = ct.c_long(0)
-        _DLL.HidUart_GetUartEnable(self.handle, ct.byref(enable))
+        self._dll.HidUart_GetUartEnable(self.handle, ct.byref(enable))
         return bool(enable.value)
 
     # HidUart_FlushBuffers(HID_UART_DEVICE device, BOOL flushTransmit, BOOL flushReceive);
     def FlushBuffers(self, flushTransmit=True, flushReceive=True):
-        _DLL.HidUart_FlushBuffers(self.handle, flushTransmit, flushReceive)
+        self._dll.HidUart_FlushBuffers(self.handle, flushTransmit, flushReceive)
 
     # HidUart_CancelIo(HID_UART_DEVICE device);
     def CancelIo(self):
-        _DLL.HidUart_CancelIo(self.handle)
+        self._dll.HidUart_CancelIo(self.handle)
 
     # HidUart_Read(HID_UART_DEVICE device, BYTE* buffer, DWORD numBytesToRead, DWORD* numBytesRead);
-    def Read(self, size=256):
-        buf = ct.create_string_buffer(size)
-        cnt = ct.c_ulong(0)
-        status = _DLL.HidUart_Read(self.handle, buf, size, ct.byref(cnt))
+    def ReadInto(self, buffer, size=None):
+        """Reads up to size bytes (default: len(buffer)) into a writable buffer.
+
+        Accepts any writable object supporting the buffer protocol (bytearray,
+        memoryview, mmap, array). Data lands directly in the caller's memory and
+        the exact number of bytes reported by HidUart_Read is returned, so
+        embedded NUL bytes are preserved.
+        """
+        cbuf, nbytes = self._c_buffer(buffer, writable=True)
+        if size is None or size > nbytes:
+            size = nbytes
+        if self._io_mode is not None:
+            self._adapt_read_timeout(size)
+        status = self._hot_read(self.handle, cbuf, size, self._rx_count_ref)
         if status == HID_UART_SUCCESS or status == HID_UART_READ_TIMED_OUT:
-            return buf.value
-        else:
-            raise
+            if self._io_mode == IO_MODE_AUTO:
+                self._observe_read(self._rx_count.value, size)
+            return self._rx_count.value
+        raise HidUartError(status)
+
+    def Read(self, size=256, bytesToRead=None):
+        """Returns up to size bytes read from the device.
+
+        Read(buf, bytesToRead) is the CComPort-style variant used by TestSuite;
+        it reads into buf and returns the byte count, like ReadInto. As before,
+        that variant reports a library error as 0 bytes read instead of raising.
+        """
+        if not isinstance(size, int):
+            try:
+                return self.ReadInto(size, bytesToRead)
+            except HidUartError:
+                return 0
+        if len(self._rx_buffer) < size:
+            self._rx_buffer = bytearray(size)
+        count = self.ReadInto(self._rx_buffer, size)
+        return bytes(memoryview(self._rx_buffer)[:count])
 
     def ReadString(self, size=256):
         return self.Read(size).decode('ascii', 'ignore')
 
     # HidUart_Write(HID_UART_DEVICE device, BYTE* buffer, DWORD numBytesToWrite, DWORD* numBytesWritten);
-    def Write(self, buffer):
-        cnt = ct.c_ulong(0)
-        status = _DLL.HidUart_Write(
-            self.handle, buffer, len(buffer), ct.byref(cnt))
-        if status == HID_UART_SUCCESS or status == HID_UART_WRITE_TIMED_OUT:
-            return cnt.value
+    def Write(self, buffer, bytesToWrite=None, raiseOnTimeout=False):
+        """Writes buffer to the device and returns the number of bytes written.
+
+        bytes and writable buffers (bytearray, memoryview slices, mmap, array)
+        are passed to the library without copying. bytesToWrite limits the
+        write to the first bytesToWrite bytes (CComPort-style variant); that
+        variant reports a library error as 0 bytes written instead of raising.
+        With raiseOnTimeout, a timed out write raises HidUartWriteTimeoutError
+        carrying the partial byte count instead of returning it.
+        """
+        if type(buffer) is bytes:
+            cbuf, nbytes = buffer, len(buffer)      # passed as-is by both conversions
         else:
-            raise
+            cbuf, nbytes = self._c_buffer(buffer, writable=False)
+        if bytesToWrite is not None and bytesToWrite < nbytes:
+            nbytes = bytesToWrite
+        status = self._hot_write(self.handle, cbuf, nbytes, self._tx_count_ref)
+        if status == HID_UART_SUCCESS:
+            return self._tx_count.value
+        if status == HID_UART_WRITE_TIMED_OUT:
+            if raiseOnTimeout:
+                raise HidUartWriteTimeoutError(self._tx_count.value, nbytes)
+            return self._tx_count.value
+        if bytesToWrite is not None:
+            return 0
+        raise HidUartError(status)
 
     def WriteString(self, string):
         return self.Write(string.encode('ascii', 'ignore'))
 
+    def sendline(self, line=""):
+        """Writes line followed by linesep (\\r, like pressing Enter on a terminal)."""
+        return self.WriteString(line + self.linesep)
+
+    def expect(self, patterns, timeout=30.0, searchwindowsize=2048, read_timeout=10,
+               chunk_size=4096, max_buffer=1 << 20):
+        """Waits until one of patterns appears in the RX stream and returns its list index.
+
+        patterns is a regex (str or compiled) or a list of them. Only data that
+        arrived since the last search, plus searchwindowsize characters before
+        it, is searched again, so long outputs are not rescanned. On a match,
+        match holds the re match object, before the text preceding it, after
+        the matched text and expect_elapsed the seconds waited; text after the
+        match stays buffered for the next call. Reads use a read_timeout (ms)
+        device timeout so a match is seen promptly; the previous timeouts are
+        restored afterwards. Raises HidUartError(HID_UART_READ_TIMED_OUT) after
+        timeout seconds, keeping the received text buffered (before holds it).
+        """
+        import re
+        if isinstance(patterns, (list, tuple)):
+            compiled = [re.compile(p) if isinstance(p, str) else p for p in patterns]
+        else:
+            compiled = [re.compile(patterns) if isinstance(patterns, str) else patterns]
+        if self._expect_decoder is None:
+            import codecs
+            self._expect_decoder = codecs.getincrementaldecoder('utf-8')('replace')
+        decode = self._expect_decoder.decode
+        chunk = bytearray(chunk_size)
+        view = memoryview(chunk)
+        start = time.monotonic()
+        deadline = start + timeout
+        scan = 0
+        saved = self.GetTimeouts()
+        self.SetTimeouts(read_timeout, saved[1])
+        try:
+            while True:
+                buffer = self._expect_buffer
+                best = None
+                for index, pattern in enumerate(compiled):
+                    m = pattern.search(buffer, scan)
+                    if m is not None and (best is None or m.start() < best[1].start()):
+                        best = (index, m)
+                if best is not None:
+                    index, m = best
+                    self.match = m
+                    self.before = buffer[:m.start()]
+                    self.after = m.group(0)
+                    self._expect_buffer = buffer[m.end():]
+                    self.expect_elapsed = time.monotonic() - start
+                    return index
+                scan = max(len(buffer) - searchwindowsize, 0)
+                if time.monotonic() >= deadline:
+                    self.match = None
+                    self.before = buffer
+                    self.after = ""
+                    self.expect_elapsed = time.monotonic() - start
+                    raise HidUartError(HID_UART_READ_TIMED_OUT)
+                count = self.ReadInto(chunk)
+                if count:
+                    buffer += decode(view[:count])
+                    if len(buffer) > max_buffer:
+                        drop = len(buffer) - max_buffer
+                        buffer = buffer[drop:]
+                        scan = max(scan - drop, 0)
+                    self._expect_buffer = buffer
+        finally:
+            self.SetTimeouts(*saved)
+
     # HidUart_SetTimeouts(HID_UART_DEVICE device, DWORD readTimeout, DWORD writeTimeout);
     def SetTimeouts(self, rto=1000, wto=1000):
-        _DLL.HidUart_SetTimeouts(self.handle, rto, wto)
+        status = self._hot_set_timeouts(self.handle, rto, wto)
+        if status:
+            raise HidUartError(status)
+        self._rto, self._wto = rto, wto
+        if self._io_mode is not None:
+            # Restored by SetIoMode(None) instead of the timeouts saved on entry
+            self._io_saved = (rto, wto)
 
     # HidUart_GetTimeouts(HID_UART_DEVICE device, DWORD* readTimeout, DWORD* writeTimeout);
     def GetTimeouts(self):
-        rto = ct.c_ulong(0)
-        wto = ct.c_ulong(0)
-        _DLL.HidUart_GetTimeouts(self.handle, ct.byref(rto), ct.byref(wto))
+        status = self._hot_get_timeouts(self.handle, *self._timeouts_out_refs)
+        if status:
+            raise HidUartError(status)
+        rto, wto = self._timeouts_out
         return (rto.value, wto.value)
 
     # HidUart_GetUartStatus(HID_UART_DEVICE device, WORD* transmitFifoSize, WORD* receiveFifoSize, BYTE* errorStatus, BYTE* lineBreakStatus);
     def GetUartStatus(self):
-        tx_fifo = ct.c_ushort(0)
-        rx_fifo = ct.c_ushort(0)
-        err_stat = ct.c_byte(0)
-        lbr_stat = ct.c_byte(0)
-        _DLL.HidUart_GetUartStatus(self.handle, ct.byref(tx_fifo), ct.byref(
-            rx_fifo), ct.byref(err_stat), ct.byref(lbr_stat))
+        status = self._hot_get_uart_status(self.handle, *self._status_out_refs)
+        if status:
+            raise HidUartError(status)
+        tx_fifo, rx_fifo, err_stat, lbr_stat = self._status_out
         return (tx_fifo.value, rx_fifo.value, err_stat.value, lbr_stat.value)
 
     # HidUart_SetUartConfig(HID_UART_DEVICE device, DWORD baudRate, BYTE dataBits, BYTE parity, BYTE stopBits, BYTE flowControl);
     def SetUartConfig(self, baud=115200, data=HID_UART.EIGHT_DATA_BITS,
                       parity=HID_UART.NO_PARITY, stop=HID_UART.SHORT_STOP_BIT, flow=HID_UART.NO_FLOW_CONTROL):
-        _DLL.HidUart_SetUartConfig(self.handle, baud, data, parity, stop, flow)
+        self._dll.HidUart_SetUartConfig(self.handle, baud, data, parity, stop, flow)
+        self._char_time = _uart_char_time(baud, data, parity, stop)
 
     # HidUart_GetUartConfig(HID_UART_DEVICE device, DWORD* baudRate, BYTE* dataBits, BYTE* parity, BYTE* stopBits, BYTE* flowControl);
     def GetUartConfig(self):
@@ -380,33 +1095,238 @@ class HidUartDevice(object):
         parity = ct.c_ulong()
         stop = ct.c_ulong()
         flow = ct.c_ulong()
-        _DLL.HidUart_GetUartConfig(self.handle, ct.byref(baud),
+        self._dll.HidUart_GetUartConfig(self.handle, ct.byref(baud),
                                    ct.byref(data), ct.byref(parity), ct.byref(stop), ct.byref(flow))
         return (baud.value, data.value, parity.value, stop.value, flow.value)
 
+    def SetIoMode(self, mode=IO_MODE_LATENCY):
+        """Selects how ReadInto/Read choose the device read timeout.
+
+        IO_MODE_LATENCY    - each read checks the RX FIFO level (GetUartStatus)
+                             and waits only as long as the pending bytes take
+                             to arrive, or latency_idle_ms when the FIFO is empty
+        IO_MODE_THROUGHPUT - reads wait long enough for the whole request at the
+                             configured baud rate (capped at throughput_max_ms)
+        IO_MODE_AUTO       - starts in latency mode and switches to throughput
+                             while reads keep coming back mostly full
+        None               - restores the timeouts in effect before SetIoMode
+        """
+        if mode not in (None, IO_MODE_LATENCY, IO_MODE_THROUGHPUT, IO_MODE_AUTO):
+            raise ValueError("Invalid I/O mode: %r" % (mode,))
+        if mode is None:
+            if self._io_mode is not None and self._io_saved is not None:
+                self.SetTimeouts(*self._io_saved)
+            self._io_mode = None
+            return
+        if self._io_mode is None:
+            self._io_saved = self.GetTimeouts()
+            self._rto, self._wto = self._io_saved
+            baud, data, parity, stop, flow = self.GetUartConfig()
+            self._char_time = _uart_char_time(baud, data, parity, stop)
+        self._io_mode = mode
+        self._io_active = IO_MODE_THROUGHPUT if mode == IO_MODE_THROUGHPUT else IO_MODE_LATENCY
+        self._io_fill = 0.0
+
+    def GetIoMode(self):
+        """Returns (selected mode, mode currently used for reads)."""
+        return (self._io_mode, self._io_active if self._io_mode is not None else None)
+
+    def _adapt_read_timeout(self, size):
+        char_ms = self._char_time * 1000.0
+        if self._io_active == IO_MODE_LATENCY:
+            pending = self.GetUartStatus()[1]
+            if pending:
+                # Bytes already in the FIFO: one 1 ms USB frame per report, plus one
+                rto = -(-min(pending, size) // HID_UART_MAX_REPORT_PAYLOAD) + 1
+            else:
+                rto = max(self.latency_idle_ms, int(2 * char_ms + 0.999))
+        else:
+            rto = min(max(int(size * char_ms * 1.5) + 2, 20), self.throughput_max_ms)
+        if rto != self._rto:
+            status = self._hot_set_timeouts(self.handle, rto, self._wto)
+            if status:
+                raise HidUartError(status)
+            self._rto = rto
+
+    def _observe_read(self, count, size):
+        fill = self._io_fill = 0.75 * self._io_fill + 0.25 * (float(count) / size if size else 0.0)
+        if self._io_active == IO_MODE_LATENCY:
+            if fill > 0.6 and size > HID_UART_MAX_REPORT_PAYLOAD:
+                self._io_active = IO_MODE_THROUGHPUT
+        elif fill < 0.2:
+            self._io_active = IO_MODE_LATENCY
+
     # HidUart_StartBreak(HID_UART_DEVICE device, BYTE duration);
     def StartBreak(self, duration=0):
-        _DLL.HidUart_StartBreak(self.handle, duration)
+        self._dll.HidUart_StartBreak(self.handle, duration)
 
     # HidUart_StopBreak(HID_UART_DEVICE device);
     def StopBreak(self):
-        _DLL.HidUart_StopBreak(self.handle)
+        self._dll.HidUart_StopBreak(self.handle)
 
     # HidUart_Reset(HID_UART_DEVICE device);
     def Reset(self):
-        _DLL.HidUart_Reset(self.handle)
-        _DLL.HidUart_Close(self.handle)
+        self._dll.HidUart_Reset(self.handle)
+        self._dll.HidUart_Close(self.handle)
         self.handle.value = 0
+        self._latch_known = 0
+        self._schedule_latch_verify()
 
     # HidUart_ReadLatch(HID_UART_DEVICE device, WORD* latchValue);
-    def ReadLatch(self):
-        latch = ct.c_ushort()
-        _DLL.HidUart_ReadLatch(self.handle, ct.byref(latch))
-        return latch.value
+    def ReadLatch(self, verify=False):
+        """Returns the GPIO latch.
+
+        The value is served from the shadow copy kept by WriteLatch once every
+        bit is known. verify=True (or an elapsed latch_verify_interval) reads
+        the device instead; a readback that differs from the shadow counts as
+        drift in latch_drift. Pins configured as inputs change on their own,
+        so read them with verify=True.
+        """
+        if not verify and self._latch_known == 0xFFFF:
+            interval = self._latch_verify_interval
+            if interval is None or time.monotonic() - self._latch_verified_at < interval:
+                return self._latch
+        # The lock only guards the shadow against the background verifier
+        locked = self._latch_verify_interval is not None
+        if locked:
+            self._latch_lock.acquire()
+        try:
+            status = self._hot_read_latch(self.handle, self._latch_out_ref)
+            if status:
+                raise HidUartError(status)
+            latch = self._latch_out.value
+            if (self._latch ^ latch) & self._latch_known:
+                self.latch_drift += 1
+            self._latch = latch
+            self._latch_known = 0xFFFF
+            self._latch_verified_at = time.monotonic()
+        finally:
+            if locked:
+                self._latch_lock.release()
+        return latch
 
     # HidUart_WriteLatch(HID_UART_DEVICE device, WORD latchValue, WORD latchMask);
     def WriteLatch(self, latch, mask):
-        _DLL.HidUart_WriteLatch(self.handle, latch, mask)
+        locked = self._latch_verify_interval is not None
+        if locked:
+            self._latch_lock.acquire()
+        try:
+            status = self._hot_write_latch(self.handle, latch, mask)
+            if status:
+                raise HidUartError(status)
+            self._latch = (self._latch & ~mask) | (latch & mask)
+            self._latch_known |= mask & 0xFFFF
+        finally:
+            if locked:
+                self._latch_lock.release()
+
+    @property
+    def latch_verify_interval(self):
+        """Seconds after which the latch shadow is checked against the device (None: never).
+
+        While set and the device is open, a background timer reads the latch
+        whenever the shadow has gone unverified for that long, so drift shows
+        up in latch_drift even if nothing calls ReadLatch.
+        """
+        return self._latch_verify_interval
+
+    @latch_verify_interval.setter
+    def latch_verify_interval(self, interval):
+        self._latch_verify_interval = interval
+        self._schedule_latch_verify()
+
+    def _schedule_latch_verify(self, generation=None):
+        """(Re)arms the latch verification timer; generation is passed by the timer itself."""
+        with self._latch_lock:
+            if generation is not None and generation != self._latch_timer_generation:
+                return                  # superseded by an Open/Close or a new interval
+            if self._latch_timer is not None:
+                self._latch_timer.cancel()
+                self._latch_timer = None
+            self._latch_timer_generation += 1
+            interval = self._latch_verify_interval
+            if interval is None or not self.handle.value:
+                return
+            due = interval
+            if self._latch_known:
+                due = max(self._latch_verified_at + interval - time.monotonic(), 0.0)
+            timer = threading.Timer(due, self._verify_latch_tick,
+                                    (self._latch_timer_generation,))
+            timer.daemon = True
+            self._latch_timer = timer
+            timer.start()
+
+    def _verify_latch_tick(self, generation):
+        interval = self._latch_verify_interval
+        if (generation == self._latch_timer_generation and interval is not None
+                and self._latch_known
+                and time.monotonic() - self._latch_verified_at >= interval):
+            try:
+                self.ReadLatch(verify=True)
+            except HidUartError:
+                pass
+        self._schedule_latch_verify(generation)
+
+    def InvalidateLatch(self):
+        """Forgets the shadow latch so the next ReadLatch goes to the device."""
+        self._latch_known = 0
+
+    def LatchTransaction(self):
+        """Returns a LatchTransaction that commits its pin changes in one WriteLatch."""
+        return LatchTransaction(self)
+
+    def GetDeviceInfo(self, live=True, verify_latch=False):
+        """Returns a DeviceInfo snapshot of the open device.
+
+        Serial, manufacturer, product, part number and VID/PID/release are
+        fetched once per open handle and cached; UART config, UART status and
+        the GPIO latch are read on every call (live=False skips them). The
+        latch comes from the shadow copy unless verify_latch is set. A field
+        group that fails is left as None and its error kept in info.errors.
+        """
+        info = DeviceInfo()
+        static = self._static_info
+        if static is None:
+            static = {}
+            errors = {}
+            for field, opt in (('serial', HID_UART.SERIAL_STR),
+                               ('manufacturer', HID_UART.MANUFACTURER_STR),
+                               ('product', HID_UART.PRODUCT_STR)):
+                try:
+                    static[field] = self.GetString(opt)
+                except HidUartError as e:
+                    errors[field] = str(e)
+            try:
+                static['part_number'], static['version'] = self.GetPartNumber()
+            except HidUartError as e:
+                errors['part_number'] = str(e)
+            try:
+                static['vid'], static['pid'], static['release'] = self.GetAttributes()
+            except HidUartError as e:
+                errors['attributes'] = str(e)
+            if errors:
+                info.errors.update(errors)
+            else:
+                self._static_info = static
+        for field, value in static.items():
+            setattr(info, field, value)
+        if live:
+            try:
+                (info.baud, info.data_bits, info.parity, info.stop_bits,
+                 info.flow_control) = self.GetUartConfig()
+            except HidUartError as e:
+                info.errors['uart_config'] = str(e)
+            try:
+                (info.tx_fifo, info.rx_fifo, info.error_status,
+                 info.line_break_status) = self.GetUartStatus()
+            except HidUartError as e:
+                info.errors['uart_status'] = str(e)
+            try:
+                info.latch = self.ReadLatch(verify_latch)
+            except HidUartError as e:
+                info.errors['latch'] = str(e)
+        info.timestamp = time.time()
+        return info
 
     # ----------------------------------------------------------
     # Following methods emulate CComPort class from TestSuite and are required by TestSuite.py # Opens port, setst timeouts and clears it for test
@@ -416,32 +1336,14 @@ class HidUartDevice(object):
         self.Purge()
 
     def Purge(self):
-        _DLL.HidUart_FlushBuffers(self.handle, True, True)
+        self._dll.HidUart_FlushBuffers(self.handle, True, True)
 
     def Disconnect(self):
         self.Close()
 
-    def Read(self, buf, bytesToRead):
-        BytesRead = ct.c_ulong(0)
-        status = _DLL.HidUart_Read(
-            self.handle, buf, bytesToRead, ct.byref(BytesRead))
-        if status == HID_UART_SUCCESS or status == HID_UART_READ_TIMED_OUT:
-            return BytesRead.value
-        else:
-            return 0
-
-    def Write(self, buf, bytesToWrite):
-        BytesWritten = ct.c_ulong(0)
-        status = _DLL.HidUart_Write(
-            self.handle, buf, bytesToWrite, ct.byref(BytesWritten))
-        if status == HID_UART_SUCCESS or status == HID_UART_WRITE_TIMED_OUT:
-            return BytesWritten.value
-        else:
-            return 0
-
     def SetComTimeout(self, timeout):
         # Add 200 ms to timeout for command overhead
-        _DLL.HidUart_SetTimeouts(self.handle, timeout + 200, timeout + 200)
+        self.SetTimeouts(timeout + 200, timeout + 200)
 
     # Translates Windows COM API parameters (WinComApi.py) into HidUart parameters, then configures port
     # SetComConfig(DWORD baud = 115200, BYTE dataBits = 8, BYTE parity = NOPARITY, BYTE stopBits = ONESTOPBIT, BYTE flowControl = COM_NO_FLOW_CONTROL);
@@ -465,6 +1367,92 @@ class HidUartDevice(object):
         return 0
 
 
+class DeviceInfo(object):
+    """Snapshot of an open device's descriptors and live UART/GPIO state (see GetDeviceInfo)."""
+
+    __slots__ = ('serial', 'manufacturer', 'product', 'part_number', 'version',
+                 'vid', 'pid', 'release',
+                 'baud', 'data_bits', 'parity', 'stop_bits', 'flow_control',
+                 'tx_fifo', 'rx_fifo', 'error_status', 'line_break_status',
+                 'latch', 'timestamp', 'errors')
+
+    def __init__(self):
+        for field in self.__slots__:
+            setattr(self, field, None)
+        self.errors = {}
+
+    def __repr__(self):
+        return "DeviceInfo(serial={!r}, part={}, vid={}, pid={}, baud={}, latch={})".format(
+            self.serial, self.part_number, self.vid, self.pid, self.baud, self.latch)
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    def to_json(self, **kwargs):
+        import json
+        return json.dumps(self.to_dict(), **kwargs)
+
+
+class LatchTransaction(object):
+    """
+    Collects GPIO pin changes and sends them as a single HidUart_WriteLatch.
+
+        with hu.LatchTransaction() as tx:
+            tx.set(2, False)
+            tx.set(5, True)
+
+    Changes are committed when the block exits without an exception, or
+    explicitly with commit(). Later changes to a pin override earlier ones.
+    """
+
+    def __init__(self, device):
+        self.device = device
+        self.latch = 0
+        self.mask = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+
+    def set(self, pin, value):
+        bit = 1 << pin
+        self.mask |= bit
+        if value:
+            self.latch |= bit
+        else:
+            self.latch &= ~bit
+        return self
+
+    def high(self, pin):
+        return self.set(pin, True)
+
+    def low(self, pin):
+        return self.set(pin, False)
+
+    def update(self, latch, mask):
+        """Merges a latch/mask pair into the transaction."""
+        self.latch = (self.latch & ~mask) | (latch & mask)
+        self.mask |= mask
+        return self
+
+    def commit(self):
+        """Writes the collected changes (if any) and starts a new, empty transaction."""
+        if self.mask:
+            self.device.WriteLatch(self.latch, self.mask)
+        self.latch = self.mask = 0
+
+
+def close_quietly(hu):
+    """Closes hu, dropping the handle even if the library reports an error."""
+    try:
+        hu.Close()
+    except HidUartError:
+        hu.handle.value = 0
+
+
 def PRINTV(*arg):
     print(*arg)
     pass
@@ -488,7 +1476,7 @@ def TestInvalDevIndex(NumDevices):
 def PowerOff(hu):
     print(
         "\n\033[1;34m==================== Executing Power Off ====================\033[0m\n")
-    if hu.WriteLatch(0, 4) != None:  # 0 is to put pin 3 as off
+    if hu.WriteLatch(POWER_OFF_LATCH, POWER_PIN_MASK) != None:  # 0 is to put pin 3 as off
         print("Error Writing Latch ")
         return 1
     latch = hu.ReadLatch()
@@ -520,7 +1508,7 @@ def PowerOff(hu):
 def PowerOn(hu):
     print(
         "\n\033[1;34m==================== Executing Power On =====================\033[0m\n")
-    if hu.WriteLatch(4, 4) != None:  # 4 is to put pin 3 as on
+    if hu.WriteLatch(POWER_ON_LATCH, POWER_PIN_MASK) != None:  # 4 is to put pin 3 as on
         print("Error Writing Latch ")
         return 1
     latch = hu.ReadLatch()
@@ -548,12 +1536,17 @@ def PowerOn(hu):
     return 0
 
 
-def PowerCycle(hu):
+def PowerCycle(hu, off_time=0.0):
+    """Powers the DUT off, keeps it off for at least off_time seconds, then on again.
+
+    Use cp211x_sequencer for precisely timed or repeated cycles.
+    """
     print(
         "\n\033[1;34m==================== Executing Power Cycle ===================\033[0m\n")
-    if hu.WriteLatch(0, 4) != None:  # 0 is to put pin 3 as off
+    if hu.WriteLatch(POWER_OFF_LATCH, POWER_PIN_MASK) != None:  # 0 is to put pin 3 as off
         print("\033[91mError Writing Latch while Power Off\033[0m")
         return 1
+    off_until = time.monotonic() + off_time
     latch = hu.ReadLatch()
 
     def decode_gpio_latch(latch):
@@ -575,9 +1568,12 @@ def PowerCycle(hu):
             "\033[1;34m-------------------------------------------------------------------\033[0m\n")
     except Exception as e:
         print(f"\033[91m[Info] Could not fetch GPIO info: {e}\033[0m")
+    remaining = off_until - time.monotonic()
+    if remaining > 0:
+        time.sleep(remaining)
     print(
         "\n\033[1;34m-------------------- Powering On (Cycle) ---------------------\033[0m\n")
-    if hu.WriteLatch(4, 4) != None:  # 4 is to put pin 3 as on
+    if hu.WriteLatch(POWER_ON_LATCH, POWER_PIN_MASK) != None:  # 4 is to put pin 3 as on
         print("\033[91mError Writing Latch while Power On\033[0m")
         return 1
     latch = hu.ReadLatch()
@@ -597,7 +1593,7 @@ def PowerCycle(hu):
     return 0
 
 
-def print_hid_device_info(hu):
+def print_hid_device_info(hu, info=None):
     def decode_gpio_latch(latch):
         # Returns a string with pin states for pins 0-7, values in green
         return ', '.join([
@@ -606,67 +1602,86 @@ def print_hid_device_info(hu):
         ])
 
     try:
+        if info is None:
+            info = hu.GetDeviceInfo()
+        errors = info.errors
         print("\n\033[1;36m================= HID Device Information =================\033[0m")
         # Serial
-        try:
-            serial = hu.GetString(HID_UART.SERIAL_STR)
-            print(f"  \033[1;37mSerial Number   :\033[0m \033[32m{serial}\033[0m")
-        except Exception as e:
-            print(f"  \033[1;37mSerial Number   :\033[0m <Error: {e}>")
+        if 'serial' not in errors:
+            print(f"  \033[1;37mSerial Number   :\033[0m \033[32m{info.serial}\033[0m")
+        else:
+            print(f"  \033[1;37mSerial Number   :\033[0m <Error: {errors['serial']}>")
         # Manufacturer
-        try:
-            manufacturer = hu.GetString(HID_UART.MANUFACTURER_STR)
-            print(f"  \033[1;37mManufacturer    :\033[0m \033[32m{manufacturer}\033[0m")
-        except Exception as e:
-            print(f"  \033[1;37mManufacturer    :\033[0m <Error: {e}>")
+        if 'manufacturer' not in errors:
+            print(f"  \033[1;37mManufacturer    :\033[0m \033[32m{info.manufacturer}\033[0m")
+        else:
+            print(f"  \033[1;37mManufacturer    :\033[0m <Error: {errors['manufacturer']}>")
         # Product
-        try:
-            product = hu.GetString(HID_UART.PRODUCT_STR)
-            print(f"  \033[1;37mProduct         :\033[0m \033[32m{product}\033[0m")
-        except Exception as e:
-            print(f"  \033[1;37mProduct         :\033[0m <Error: {e}>")
+        if 'product' not in errors:
+            print(f"  \033[1;37mProduct         :\033[0m \033[32m{info.product}\033[0m")
+        else:
+            print(f"  \033[1;37mProduct         :\033[0m <Error: {errors['product']}>")
         # Part number and version
-        try:
-            part, ver = hu.GetPartNumber()
-            print(f"  \033[1;37mPart Number     :\033[0m \033[32m{part}\033[0m (Version: \033[32m{ver}\033[0m)")
-        except Exception as e:
-            print(f"  \033[1;37mPart Number     :\033[0m <Error: {e}>")
+        if 'part_number' not in errors:
+            print(f"  \033[1;37mPart Number     :\033[0m \033[32m{info.part_number}\033[0m (Version: \033[32m{info.version}\033[0m)")
+        else:
+            print(f"  \033[1;37mPart Number     :\033[0m <Error: {errors['part_number']}>")
         # Attributes
-        try:
-            vid, pid, rel = hu.GetAttributes()
-            print(f"  \033[1;37mVID            :\033[0m \033[32m0x{vid:04X}\033[0m  \033[1;37mPID:\033[0m \033[32m0x{pid:04X}\033[0m  \033[1;37mRelease:\033[0m \033[32m0x{rel:04X}\033[0m")
-        except Exception as e:
-            print(f"  \033[1;37mAttributes      :\033[0m <Error: {e}>")
+        if 'attributes' not in errors:
+            print(f"  \033[1;37mVID            :\033[0m \033[32m0x{info.vid:04X}\033[0m  \033[1;37mPID:\033[0m \033[32m0x{info.pid:04X}\033[0m  \033[1;37mRelease:\033[0m \033[32m0x{info.release:04X}\033[0m")
+        else:
+            print(f"  \033[1;37mAttributes      :\033[0m <Error: {errors['attributes']}>")
         # UART config
-        try:
-            baud, data, parity, stop, flow = hu.GetUartConfig()
-            print(f"  \033[1;37mUART Config     :\033[0m baud=\033[32m{baud}\033[0m, dataBits=\033[32m{data}\033[0m, parity=\033[32m{parity}\033[0m, stopBits=\033[32m{stop}\033[0m, flowControl=\033[32m{flow}\033[0m")
-        except Exception as e:
-            print(f"  \033[1;37mUART Config     :\033[0m <Error: {e}>")
+        if 'uart_config' not in errors:
+            print(f"  \033[1;37mUART Config     :\033[0m baud=\033[32m{info.baud}\033[0m, dataBits=\033[32m{info.data_bits}\033[0m, parity=\033[32m{info.parity}\033[0m, stopBits=\033[32m{info.stop_bits}\033[0m, flowControl=\033[32m{info.flow_control}\033[0m")
+        else:
+            print(f"  \033[1;37mUART Config     :\033[0m <Error: {errors['uart_config']}>")
 
         # Live UART status
-        try:
-            tx_fifo, rx_fifo, err_stat, lbr_stat = hu.GetUartStatus()
-            print(f"  \033[1;37mUART FIFO       :\033[0m TX=\033[32m{tx_fifo}\033[0m, RX=\033[32m{rx_fifo}\033[0m")
-            print(f"  \033[1;37mUART Error Stat.:\033[0m \033[32m0x{err_stat:02X}\033[0m  \033[1;37mLine Break Stat.:\033[0m \033[32m0x{lbr_stat:02X}\033[0m")
-        except Exception as e:
-            print(f"  \033[1;37mUART Status     :\033[0m <Error: {e}>")
+        if 'uart_status' not in errors:
+            print(f"  \033[1;37mUART FIFO       :\033[0m TX=\033[32m{info.tx_fifo}\033[0m, RX=\033[32m{info.rx_fifo}\033[0m")
+            print(f"  \033[1;37mUART Error Stat.:\033[0m \033[32m0x{info.error_status:02X}\033[0m  \033[1;37mLine Break Stat.:\033[0m \033[32m0x{info.line_break_status:02X}\033[0m")
+        else:
+            print(f"  \033[1;37mUART Status     :\033[0m <Error: {errors['uart_status']}>")
 
         # GPIO latch state
-        try:
-            latch = hu.ReadLatch()
-            print(f"  \033[1;37mGPIO Latch      :\033[0m \033[32m0x{latch:04X}\033[0m  [ {decode_gpio_latch(latch)} ]")
-        except Exception as e:
-            print(f"  \033[1;37mGPIO Latch      :\033[0m <Error: {e}>")
+        if 'latch' not in errors:
+            print(f"  \033[1;37mGPIO Latch      :\033[0m \033[32m0x{info.latch:04X}\033[0m  [ {decode_gpio_latch(info.latch)} ]")
+        else:
+            print(f"  \033[1;37mGPIO Latch      :\033[0m <Error: {errors['latch']}>")
 
         print("\033[1;36m========================================================\033[0m\n")
     except Exception as e:
         print(f"\033[91mError printing HID device info: {e}\033[0m")
 
 
+def _print_json_info(index=None):
+    """--json: prints DeviceInfo for one device index, or a list for all devices."""
+    import json
+    indexes = [index] if index is not None else range(GetNumDevices())
+    infos = []
+    for ndx in indexes:
+        info = {'index': ndx}
+        hu = HidUartDevice()
+        try:
+            hu.Open(ndx)
+            info.update(hu.GetDeviceInfo().to_dict())
+        except HidUartError as e:
+            info['errors'] = {'open': str(e)}
+        finally:
+            hu.Close()
+        infos.append(info)
+    print(json.dumps(infos[0] if index is not None else infos, indent=2))
+    return 0 if all('open' not in i['errors'] for i in infos) else 1
+
+
 if __name__ == "__main__":
     import sys
 
+    if "--json" in sys.argv[1:]:
+        args = [a for a in sys.argv[1:] if a != "--json"]
+        sys.exit(_print_json_info(int(args[0]) if args else None))
+
     errorlevel = 1
     opened = False
     hu = HidUartDevice()
@@ -682,6 +1697,7 @@ if __name__ == "__main__":
             errorlevel = 0
             if NumDevices:
                 hu.Open(ndx)
+                opened = True
                 print_hid_device_info(hu)
                 prompt = (
                     "\n\033[1;36mPlease select an action:\033[0m\n"
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+asyncio interface for CP211x devices.
+
+All library calls run on small per-device thread pools so the event loop is
+never blocked, and one process can drive many boards concurrently.
+Cancelling a pending read or write calls HidUart_CancelIo, so the library
+call really is aborted instead of being left to run out its timeout.
+
+    reader, writer = await open_hid_uart_connection("0001A2B3")
+    writer.write(b"help\\r\\n")
+    await writer.drain()
+    line = await reader.readline()
+
+    hid = writer.get_extra_info("hid_uart")     # AsyncHidUartDevice
+    latch = await hid.ReadLatch()
+"""
+
+import asyncio
+import concurrent.futures
+
+from cp211x_HID_UART import HID_UART, HidUartDevice, HidUartError, GetDeviceIndex
+
+__all__ = ['open_hid_uart_connection', 'AsyncHidUartDevice', 'HidUartTransport']
+
+
+class AsyncHidUartDevice(object):
+    """
+    Awaitable wrapper around an open HidUartDevice.
+
+    Reads, writes and control requests each get their own worker thread so a
+    blocking HidUart_Read never delays a latch or status request.
+    """
+
+    def __init__(self, device, loop=None):
+        self.device = device
+        self._loop = loop or asyncio.get_running_loop()
+        self._rx_executor = concurrent.futures.ThreadPoolExecutor(1, "hid-uart-rx")
+        self._tx_executor = concurrent.futures.ThreadPoolExecutor(1, "hid-uart-tx")
+        self._ctl_executor = concurrent.futures.ThreadPoolExecutor(1, "hid-uart-ctl")
+
+    async def _call(self, executor, func, *args):
+        return await self._loop.run_in_executor(executor, func, *args)
+
+    async def _io_call(self, executor, func, *args):
+        future = self._loop.run_in_executor(executor, func, *args)
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            # Abort the blocking library call instead of letting it time out
+            try:
+                self.device.CancelIo()
+            except HidUartError:
+                pass
+            raise
+
+    async def readinto(self, buffer):
+        return await self._io_call(self._rx_executor, self.device.ReadInto, buffer)
+
+    async def read(self, size=256):
+        return await self._io_call(self._rx_executor, self.device.Read, size)
+
+    async def write(self, buffer):
+        return await self._io_call(self._tx_executor, self.device.Write, buffer)
+
+    async def ReadLatch(self, verify=False):
+        return await self._call(self._ctl_executor, self.device.ReadLatch, verify)
+
+    async def WriteLatch(self, latch, mask):
+        return await self._call(self._ctl_executor, self.device.WriteLatch, latch, mask)
+
+    async def GetUartStatus(self):
+        return await self._call(self._ctl_executor, self.device.GetUartStatus)
+
+    async def GetUartConfig(self):
+        return await self._call(self._ctl_executor, self.device.GetUartConfig)
+
+    async def SetUartConfig(self, baud=115200, data=HID_UART.EIGHT_DATA_BITS,
+                            parity=HID_UART.NO_PARITY, stop=HID_UART.SHORT_STOP_BIT,
+                            flow=HID_UART.NO_FLOW_CONTROL):
+        return await self._call(self._ctl_executor, self.device.SetUartConfig,
+                                baud, data, parity, stop, flow)
+
+    async def SetTimeouts(self, rto=1000, wto=1000):
+        return await self._call(self._ctl_executor, self.device.SetTimeouts, rto, wto)
+
+    async def close(self):
+        """Aborts pending I/O and closes the device."""
+        try:
+            self.device.CancelIo()
+        except HidUartError:
+            pass
+        await self._call(self._ctl_executor, self.device.Close)
+        self.shutdown()
+
+    def shutdown(self):
+        for executor in (self._rx_executor, self._tx_executor, self._ctl_executor):
+            executor.shutdown(wait=False)
+
+
+class HidUartTransport(asyncio.Transport):
+    """
+    asyncio transport that pumps data between an AsyncHidUartDevice and a protocol.
+
+    The receive side issues back-to-back HidUart_Read calls into a reused
+    buffer; the transmit side writes whatever has been queued since the
+    previous HidUart_Write in a single call.
+    """
+
+    def __init__(self, loop, hid, protocol, read_size=4096, owns_device=True):
+        super().__init__({'hid_uart': hid, 'device': hid.device})
+        self._loop = loop
+        self._hid = hid
+        self._protocol = protocol
+        self._owns_device = owns_device
+        self._read_buffer = bytearray(read_size)
+        self._write_buffer = bytearray()
+        self._write_ready = asyncio.Event()
+        self._reading = asyncio.Event()
+        self._reading.set()
+        self._closing = False
+        self._paused = False
+        self._high_water = 64 * 1024
+        self._low_water = 16 * 1024
+        self._protocol.connection_made(self)
+        self._rx_task = loop.create_task(self._rx_loop())
+        self._tx_task = loop.create_task(self._tx_loop())
+
+    # ------------------------------------------------------------------
+    # Pumps
+
+    async def _rx_loop(self):
+        buffer = self._read_buffer
+        try:
+            while not self._closing:
+                await self._reading.wait()
+                count = await self._hid.readinto(buffer)
+                if count:
+                    self._protocol.data_received(bytes(memoryview(buffer)[:count]))
+        except asyncio.CancelledError:
+            pass
+        except HidUartError as e:
+            self._fatal(e)
+
+    async def _tx_loop(self):
+        try:
+            while True:
+                await self._write_ready.wait()
+                if not self._write_buffer:
+                    self._write_ready.clear()
+                    if self._closing:
+                        break
+                    continue
+                data = bytes(self._write_buffer)
+                del self._write_buffer[:]
+                self._maybe_resume_protocol()
+                offset = 0
+                while offset < len(data):
+                    offset += await self._hid.write(data[offset:])
+        except asyncio.CancelledError:
+            return
+        except HidUartError as e:
+            self._fatal(e)
+            return
+        if self._closing:
+            self._finish_close(None)
+
+    def _fatal(self, exc):
+        if not self._closing:
+            self._closing = True
+            self._rx_task.cancel()
+            self._tx_task.cancel()
+            self._finish_close(exc)
+
+    def _finish_close(self, exc):
+        self._loop.create_task(self._shutdown(exc))
+
+    async def _shutdown(self, exc):
+        self._rx_task.cancel()
+        if self._owns_device:
+            await self._hid.close()
+        else:
+            self._hid.shutdown()
+        self._protocol.connection_lost(exc)
+
+    # ------------------------------------------------------------------
+    # Flow control
+
+    def _maybe_pause_protocol(self):
+        if not self._paused and len(self._write_buffer) > self._high_water:
+            self._paused = True
+            self._protocol.pause_writing()
+
+    def _maybe_resume_protocol(self):
+        if self._paused and len(self._write_buffer) <= self._low_water:
+            self._paused = False
+            self._protocol.resume_writing()
+
+    def get_write_buffer_size(self):
+        return len(self._write_buffer)
+
+    def get_write_buffer_limits(self):
+        return (self._low_water, self._high_water)
+
+    def set_write_buffer_limits(self, high=None, low=None):
+        if high is None:
+            high = 64 * 1024 if low is None else 4 * low
+        if low is None:
+            low = high // 4
+        self._high_water, self._low_water = high, low
+        self._maybe_pause_protocol()
+
+    # ------------------------------------------------------------------
+    # Transport API
+
+    def is_reading(self):
+        return self._reading.is_set()
+
+    def pause_reading(self):
+        self._reading.clear()
+
+    def resume_reading(self):
+        self._reading.set()
+
+    def write(self, data):
+        if self._closing:
+            raise RuntimeError("Cannot write to a closing transport")
+        if data:
+            self._write_buffer += data
+            self._write_ready.set()
+            self._maybe_pause_protocol()
+
+    def can_write_eof(self):
+        return False
+
+    def is_closing(self):
+        return self._closing
+
+    def close(self):
+        """Flushes queued data, then cancels pending reads and closes the device."""
+        if self._closing:
+            return
+        self._closing = True
+        # The TX pump cancels the reader once the queue has drained (_shutdown);
+        # cancelling it here would CancelIo the write in progress as well
+        self._write_ready.set()
+
+    def abort(self):
+        """Discards queued data and closes immediately."""
+        if self._closing and self._tx_task.done():
+            return
+        self._closing = True
+        del self._write_buffer[:]
+        self._rx_task.cancel()
+        self._tx_task.cancel()
+        self._finish_close(None)
+
+
+def _open_device(device, vid, pid):
+    """Returns an open HidUartDevice for an index, a serial string or a device."""
+    if isinstance(device, HidUartDevice):
+        return device
+    if isinstance(device, str):
+        device = GetDeviceIndex(device, vid, pid)
+    hu = HidUartDevice()
+    hu.Open(device, vid, pid)
+    return hu
+
+
+async def open_hid_uart_connection(device=0, vid=HID_UART.VID, pid=HID_UART.PID,
+                                   baud=None, read_timeout=20, write_timeout=1000,
+                                   read_size=4096, limit=2 ** 16):
+    """
+    Opens a CP211x device and returns a (StreamReader, StreamWriter) pair.
+
+    device may be a device index, a serial number string or an already open
+    HidUartDevice (which is then left open when the writer is closed).
+    read_timeout (ms) bounds how long each background HidUart_Read waits, which
+    sets the latency for partially filled reads. If baud is given, the UART is
+    configured for 8N1 at that rate.
+    """
+    loop = asyncio.get_running_loop()
+    owns_device = not isinstance(device, HidUartDevice)
+    hu = await loop.run_in_executor(None, _open_device, device, vid, pid)
+    hid = AsyncHidUartDevice(hu, loop)
+    try:
+        await hid.SetTimeouts(read_timeout, write_timeout)
+        if baud is not None:
+            await hid.SetUartConfig(baud)
+    except BaseException:
+        if owns_device:
+            await hid.close()
+        else:
+            hid.shutdown()
+        raise
+
+    reader = asyncio.StreamReader(limit=limit, loop=loop)
+    protocol = asyncio.StreamReaderProtocol(reader, loop=loop)
+    transport = HidUartTransport(loop, hid, protocol, read_size, owns_device)
+    writer = asyncio.StreamWriter(transport, protocol, reader, loop)
+    return reader, writer
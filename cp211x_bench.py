@@ -0,0 +1,935 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks for the cp211x_HID_UART Python layer.
+
+The benchmarks run against a stubbed or simulated (cp211x_sim, with line
+timing disabled) library so they measure only the overhead added by the
+wrapper, not USB or device timing. --json writes all results in a
+machine-readable form for tracking across releases.
+
+Usage: python3 cp211x_bench.py [--mb N] [--calls N] [--json results.json]
+       python3 cp211x_bench.py --import-budget-ms [MS]
+"""
+
+import argparse
+import contextlib
+import ctypes as ct
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+
+# ==============================================================================
+# Stubbed SLABHIDtoUART library
+# ==============================================================================
+
+class _StubFunction(object):
+    """Callable standing in for a ctypes function pointer (accepts restype/errcheck)."""
+
+    def __init__(self, func):
+        self.func = func
+        self.restype = None
+        self.errcheck = None
+
+    def __call__(self, *args):
+        return self.func(*args)
+
+
+class StubLibrary(object):
+    """Minimal library stub: every call succeeds, Read/Write move the full request."""
+
+    def __init__(self):
+        def read(handle, buf, size, count):
+            count._obj.value = size
+            return 0
+
+        def write(handle, buf, size, count):
+            count._obj.value = size
+            return 0
+
+        def succeed(*args):
+            return 0
+
+        self.HidUart_Read = _StubFunction(read)
+        self.HidUart_Write = _StubFunction(write)
+        self._succeed = succeed
+
+    def __getattr__(self, name):
+        if not name.startswith("HidUart_"):
+            raise AttributeError(name)
+        fnc = _StubFunction(self._succeed)
+        setattr(self, name, fnc)
+        return fnc
+
+
+def import_with_stub():
+    """Imports cp211x_HID_UART and installs the stub in place of the shared libraries."""
+    import cp211x_HID_UART
+    cp211x_HID_UART.SetLibrary(StubLibrary())
+    return cp211x_HID_UART
+
+
+# ==============================================================================
+# Benchmarks
+# ==============================================================================
+
+def _allocated_per_call(func, calls):
+    """Returns total bytes transiently allocated by calls of func (sum of per-call peaks)."""
+    total = 0
+    tracemalloc.start()
+    try:
+        for _ in range(calls):
+            base = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            func()
+            total += tracemalloc.get_traced_memory()[1] - base
+    finally:
+        tracemalloc.stop()
+    return total
+
+
+def bench_read_allocations(mod, mb=1, size=4096):
+    """Compares allocated bytes per MB received: legacy Read vs ReadInto."""
+    hu = mod.HidUartDevice()
+    calls = (mb << 20) // size
+    count = ct.c_ulong(0)
+
+    def legacy_read():
+        # Equivalent of the previous HidUartDevice.Read implementation
+        buf = ct.create_string_buffer(size)
+        mod._DLL.HidUart_Read(hu.handle, buf, size, ct.byref(count))
+        return buf.value
+
+    rxbuf = bytearray(size)
+
+    def read_into():
+        return hu.ReadInto(rxbuf)
+
+    results = {}
+    for name, func in (("legacy Read", legacy_read), ("ReadInto", read_into)):
+        allocated = _allocated_per_call(func, calls)
+        start = time.perf_counter()
+        for _ in range(calls):
+            func()
+        elapsed = time.perf_counter() - start
+        results[name] = (allocated / mb, elapsed / calls * 1e6)
+    return results
+
+
+def bench_write_allocations(mod, mb=1, size=4096):
+    """Compares allocated bytes per MB sent: copied slices vs memoryview slices."""
+    hu = mod.HidUartDevice()
+    calls = (mb << 20) // size
+    data = bytearray(size * 4)
+    view = memoryview(data)
+
+    def write_copy():
+        return hu.Write(bytes(data[size:2 * size]))
+
+    def write_view():
+        return hu.Write(view[size:2 * size])
+
+    results = {}
+    for name, func in (("Write(bytes copy)", write_copy), ("Write(memoryview)", write_view)):
+        allocated = _allocated_per_call(func, calls)
+        start = time.perf_counter()
+        for _ in range(calls):
+            func()
+        elapsed = time.perf_counter() - start
+        results[name] = (allocated / mb, elapsed / calls * 1e6)
+    return results
+
+
+def bench_write_coalescing(mod, kb=16, command_size=8):
+    """Compares USB transactions and reports per KB: direct Write vs CoalescingWriter."""
+    from cp211x_tx import CoalescingWriter
+
+    hu = mod.HidUartDevice()
+    command = b"x" * command_size
+    commands = (kb << 10) // command_size
+    stub_write = mod._DLL.HidUart_Write.func
+    sizes = []
+
+    def counting_write(handle, buf, size, count):
+        sizes.append(size)
+        return stub_write(handle, buf, size, count)
+
+    mod._DLL.HidUart_Write.func = counting_write
+    results = {}
+    try:
+        for name in ("direct Write", "CoalescingWriter"):
+            del sizes[:]
+            start = time.perf_counter()
+            if name == "direct Write":
+                for _ in range(commands):
+                    hu.Write(command)
+            else:
+                with CoalescingWriter(hu, linger=0.002) as tx:
+                    for _ in range(commands):
+                        tx.write(command)
+            elapsed = time.perf_counter() - start
+            reports = sum(-(-size // mod.HID_UART_MAX_REPORT_PAYLOAD) for size in sizes)
+            results[name] = (len(sizes) / kb, reports / kb, elapsed / commands * 1e6)
+    finally:
+        mod._DLL.HidUart_Write.func = stub_write
+    return results
+
+
+def _latency_stats(name, samples, nbytes=0):
+    samples.sort()
+    mean = sum(samples) / len(samples)
+    result = {
+        'name': name,
+        'samples': len(samples),
+        'mean_us': mean * 1e6,
+        'min_us': samples[0] * 1e6,
+        'p50_us': samples[len(samples) // 2] * 1e6,
+        'p99_us': samples[min(len(samples) - 1, len(samples) * 99 // 100)] * 1e6,
+        'calls_per_s': 1.0 / mean if mean else 0.0,
+    }
+    if nbytes:
+        result['mb_per_s'] = nbytes / mean / (1 << 20) if mean else 0.0
+    return result
+
+
+def _time_calls(func, calls, batch=50):
+    """Returns per-call latencies (s), each averaged over a batch of calls."""
+    perf_counter = time.perf_counter
+    samples = []
+    for _ in range(max(calls // batch, 1)):
+        start = perf_counter()
+        for _ in range(batch):
+            func()
+        samples.append((perf_counter() - start) / batch)
+    return samples
+
+
+def bench_call_overhead(mod, calls=10000):
+    """Measures per-call latency of the main HidUartDevice entry points on the simulator."""
+    from cp211x_sim import SimulatedHidUart, SimulatedDevice
+
+    sim = SimulatedHidUart([SimulatedDevice(serial="BENCH0000", realtime=False,
+                                            source=bytes(range(256)), record_tx=False)])
+    hu = mod.HidUartDevice()
+    hu.Open(0, backend=sim)
+    small = b"x" * 64
+    large = bytearray(4096)
+
+    def open_close():
+        dev = mod.HidUartDevice()
+        dev.Open(0, backend=sim)
+        dev.Close()
+
+    cases = [
+        ("Read(64)", lambda: hu.Read(64), calls, 64),
+        ("ReadInto(4096)", lambda: hu.ReadInto(large), calls, 4096),
+        ("Write(64)", lambda: hu.Write(small), calls, 64),
+        ("Write(4096)", lambda: hu.Write(large), calls, 4096),
+        ("ReadLatch", hu.ReadLatch, calls, 0),
+        ("WriteLatch", lambda: hu.WriteLatch(0x0004, 0x0004), calls, 0),
+        ("GetUartStatus", hu.GetUartStatus, calls, 0),
+        ("GetUartConfig", hu.GetUartConfig, calls, 0),
+    ]
+    results = []
+    try:
+        for name, func, n, nbytes in cases:
+            results.append(_latency_stats(name, _time_calls(func, n), nbytes))
+        hu.Close()
+        results.append(_latency_stats("Open/Close", _time_calls(open_close, calls // 10)))
+        hu.Open(0, backend=sim)
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            samples = _time_calls(lambda: mod.print_hid_device_info(hu), calls // 100, batch=10)
+        results.append(_latency_stats("print_hid_device_info", samples))
+    finally:
+        hu.Close()
+    return results
+
+
+# 1 Mbaud 8N1 carries 100,000 bytes/s
+MBAUD_BYTES_PER_S = 100000
+
+
+def _console_capture(size, seed=1):
+    """Returns size bytes of boot-console-like text: short lines with some very long ones."""
+    import random
+    rng = random.Random(seed)
+    out = bytearray()
+    while len(out) < size:
+        if rng.random() < 0.02:
+            out += b"#" * rng.randint(2048, 16384) + b"\r\n"     # progress bar / hex dump
+        else:
+            out += b"[%8.6f] " % rng.random() + b"x" * rng.randint(10, 120) + b"\r\n"
+    return bytes(out[:size])
+
+
+def bench_framing(kb=1024, chunk=63, text=None, runs=3):
+    """Measures decoder throughput on chunked input (best of runs); returns {name: (MB/s, x 1 Mbaud)}."""
+    from cp211x_framing import (LineDecoder, SlipDecoder, CobsDecoder, LengthPrefixedDecoder,
+                                slip_encode, cobs_encode, length_prefix_encode)
+
+    if text is None:
+        text = _console_capture(kb << 10)
+    payloads = [text[i:i + 200] for i in range(0, len(text), 200)]
+    inputs = {
+        "naive str rescan": text,
+        "LineDecoder": text,
+        "SlipDecoder": b"".join(slip_encode(p) for p in payloads),
+        "CobsDecoder": b"".join(cobs_encode(p) for p in payloads),
+        "LengthPrefixed": b"".join(length_prefix_encode(p) for p in payloads),
+    }
+    decoders = {"LineDecoder": LineDecoder, "SlipDecoder": SlipDecoder,
+                "CobsDecoder": CobsDecoder, "LengthPrefixed": LengthPrefixedDecoder}
+
+    def naive(data):
+        # What ad-hoc scripts do: append to a str and search it from the start
+        buf = ""
+        lines = 0
+        for i in range(0, len(data), chunk):
+            buf += data[i:i + chunk].decode("ascii", "ignore")
+            while buf.find("\n") >= 0:
+                line, buf = buf.split("\n", 1)
+                lines += 1
+        return lines
+
+    results = {}
+    for name, data in inputs.items():
+        elapsed = None
+        for _ in range(runs):
+            start = time.perf_counter()
+            if name in decoders:
+                decode = decoders[name]().decode
+                for i in range(0, len(data), chunk):
+                    decode(data[i:i + chunk])
+            else:
+                naive(data)
+            run = time.perf_counter() - start
+            elapsed = run if elapsed is None else min(elapsed, run)
+        rate = len(data) / elapsed
+        results[name] = (rate / (1 << 20), rate / MBAUD_BYTES_PER_S)
+    return results
+
+
+def bench_framed_reader(mod, kb=1024):
+    """Measures FramedReader.readline() on the simulator; returns (MB/s, x 1 Mbaud)."""
+    from cp211x_framing import FramedReader
+    from cp211x_sim import SimulatedHidUart, SimulatedDevice
+
+    text = _console_capture(kb << 10)
+    sim = SimulatedHidUart([SimulatedDevice(serial="BENCH0000", realtime=False,
+                                            source=text, record_tx=False)])
+    hu = mod.HidUartDevice()
+    hu.Open(0, backend=sim)
+    try:
+        rx = FramedReader(hu, chunk_size=4096)
+        total = 0
+        start = time.perf_counter()
+        while total < len(text):
+            total += len(rx.readline())
+        elapsed = time.perf_counter() - start
+    finally:
+        hu.Close()
+    rate = total / elapsed
+    return rate / (1 << 20), rate / MBAUD_BYTES_PER_S
+
+
+def bench_io_modes(mod, baud=1000000, request=b"ping 0123456789\r\n", rounds=20,
+                   bulk_kb=16):
+    """
+    Measures request/response round trips and bulk transfers per I/O mode.
+
+    Runs on a simulated loopback device with real line timing, so each
+    response arrives at the configured baud rate. Reads ask for 4 KiB as
+    typical scripts do; the fixed mode is the legacy 1000 ms read timeout.
+    Returns {mode: {'rtt_ms', 'bulk_mb_per_s', 'bulk_reads', 'library_calls'}},
+    library_calls counting every library call the mode made (round trips and bulk).
+    """
+    from cp211x_sim import SimulatedHidUart, SimulatedDevice
+
+    sim = SimulatedHidUart([SimulatedDevice(serial="BENCH0000", loopback=True, record_tx=False)])
+    hu = mod.HidUartDevice()
+    hu.Open(0, backend=sim)
+    hu.SetUartConfig(baud)
+    buffer = bytearray(4096)
+    bulk = bytes(bulk_kb << 10)
+    results = {}
+    try:
+        for mode in ("fixed", mod.IO_MODE_LATENCY, mod.IO_MODE_THROUGHPUT, mod.IO_MODE_AUTO):
+            hu.SetIoMode(None)
+            hu.SetTimeouts(1000, 1000)
+            if mode != "fixed":
+                hu.SetIoMode(mode)
+            samples = []
+            for _ in range(rounds if mode != "fixed" else 3):
+                start = time.perf_counter()
+                hu.Write(request)
+                got = 0
+                while got < len(request):
+                    got += hu.ReadInto(buffer)
+                samples.append((time.perf_counter() - start) * 1e3)
+            samples.sort()
+            start = time.perf_counter()
+            hu.Write(bulk)
+            got = reads = 0
+            while got < len(bulk):
+                got += hu.ReadInto(buffer)
+                reads += 1
+            elapsed = time.perf_counter() - start
+            results[mode] = {
+                'rtt_ms': {'min': samples[0], 'mean': sum(samples) / len(samples),
+                           'max': samples[-1]},
+                'bulk_mb_per_s': len(bulk) / elapsed / (1 << 20),
+                'bulk_reads': reads,
+                'library_calls': sim.calls,
+            }
+            sim.calls = 0
+    finally:
+        hu.Close()
+    return results
+
+
+def bench_pty_bridge(mod, baud=1000000, request=b"ping 0123456789\r\n", rounds=20, bulk_kb=32):
+    """
+    Measures what PtyBridge adds to round trips and bulk transfers.
+
+    Runs on a simulated loopback at baud: RTT is compared with the same
+    request sent directly through the device in IO_MODE_AUTO, and bulk
+    throughput is reported as a fraction of the line rate.
+    """
+    import select
+    import threading
+    from cp211x_pty import PtyBridge
+    from cp211x_sim import SimulatedHidUart, SimulatedDevice
+
+    sim = SimulatedHidUart([SimulatedDevice(serial="BENCH0000", loopback=True, record_tx=False)])
+    hu = mod.HidUartDevice()
+    hu.Open(0, backend=sim)
+    hu.SetUartConfig(baud)
+    buffer = bytearray(4096)
+    try:
+        hu.SetIoMode(mod.IO_MODE_AUTO)
+        direct = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            hu.Write(request)
+            got = 0
+            while got < len(request):
+                got += hu.ReadInto(buffer)
+            direct.append((time.perf_counter() - start) * 1e3)
+        hu.SetIoMode(None)
+
+        with PtyBridge(hu) as bridge:
+            fd = os.open(bridge.slave_name, os.O_RDWR | os.O_NOCTTY)
+            try:
+                bridged = []
+                for _ in range(rounds):
+                    start = time.perf_counter()
+                    os.write(fd, request)
+                    got = 0
+                    while got < len(request):
+                        got += len(os.read(fd, 4096))
+                    bridged.append((time.perf_counter() - start) * 1e3)
+
+                bulk = bytes(bulk_kb << 10)
+                received = [0]
+
+                def drain():
+                    while received[0] < len(bulk) and select.select([fd], [], [], 2.0)[0]:
+                        received[0] += len(os.read(fd, 65536))
+
+                reader = threading.Thread(target=drain)
+                start = time.perf_counter()
+                reader.start()
+                view = memoryview(bulk)
+                sent = 0
+                while sent < len(bulk):
+                    sent += os.write(fd, view[sent:sent + 4096])
+                reader.join()
+                elapsed = time.perf_counter() - start
+            finally:
+                os.close(fd)
+    finally:
+        hu.Close()
+    line_rate = baud / 10.0
+    return {
+        'direct_rtt_ms': min(direct),
+        'bridged_rtt_ms': min(bridged),
+        'added_rtt_ms': min(bridged) - min(direct),
+        'bulk_bytes_per_s': received[0] / elapsed,
+        'bulk_line_rate_fraction': received[0] / elapsed / line_rate,
+    }
+
+
+def bench_trace_replay(mod, baud=1000000, kb=64):
+    """
+    Records a simulated loopback session and replays the trace offline.
+
+    kb of console text is written and read back in 4 KiB transfers at baud
+    with line timing on. The trace is then replayed as fast as possible,
+    strictly (the same calls) and as an RX stream read by FramedReader.
+    Speeds are reported as multiples of the recorded session's duration.
+    """
+    import tempfile
+    from cp211x_framing import FramedReader
+    from cp211x_sim import SimulatedHidUart, SimulatedDevice
+    from cp211x_trace import TraceExhausted, TraceReplay, TraceWriter, record_device
+
+    text = _console_capture(kb << 10)
+    chunk = 4096
+
+    def session(hu):
+        buffer = bytearray(chunk)
+        for i in range(0, len(text), chunk):
+            block = text[i:i + chunk]
+            hu.Write(block)
+            got = 0
+            while got < len(block):
+                got += hu.ReadInto(buffer, len(block) - got)
+
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "bench.trace")
+    try:
+        sim = SimulatedHidUart([SimulatedDevice(serial="BENCH0000", loopback=True,
+                                                record_tx=False)])
+        hu = mod.HidUartDevice()
+        hu.Open(0, backend=sim)
+        writer = TraceWriter(path)
+        record_device(hu, writer)
+        hu.SetUartConfig(baud)
+        hu.SetTimeouts(20, 1000)
+        start = time.perf_counter()
+        session(hu)
+        recorded = time.perf_counter() - start
+        hu.Close()
+        writer.close()
+        size = os.path.getsize(path)
+
+        replay = TraceReplay(path)
+        hu = mod.HidUartDevice()
+        hu.Open(0, backend=replay)
+        hu.SetUartConfig(baud)
+        hu.SetTimeouts(20, 1000)
+        start = time.perf_counter()
+        session(hu)
+        strict = time.perf_counter() - start
+        replay.close()
+
+        replay = TraceReplay(path, strict=False)
+        hu = mod.HidUartDevice()
+        hu.Open(0, backend=replay)
+        rx = FramedReader(hu, chunk_size=chunk)
+        lines = 0
+        start = time.perf_counter()
+        try:
+            while True:
+                rx.readline()
+                lines += 1
+        except TraceExhausted:
+            pass
+        loose = time.perf_counter() - start
+        replay.close()
+    finally:
+        for name in os.listdir(directory):
+            os.remove(os.path.join(directory, name))
+        os.rmdir(directory)
+    return {
+        'recorded_s': recorded,
+        'trace_bytes': size,
+        'strict_replay_s': strict,
+        'strict_x_realtime': recorded / strict,
+        'framed_replay_s': loose,
+        'framed_x_realtime': recorded / loose,
+        'framed_lines': lines,
+    }
+
+
+def bench_modem_transfer(mod, baud=1000000, kb=128):
+    """
+    Measures XMODEM-1K and YMODEM-g throughput against the line rate.
+
+    Two simulated devices are cross-connected at baud; one sends kb of
+    data while the other receives on a thread. YMODEM-g runs with RTS/CTS
+    enabled, so the receiver asks for streaming.
+    """
+    import threading
+    from cp211x_sim import SimulatedHidUart, SimulatedDevice
+    from cp211x_xmodem import ModemTransfer
+
+    a = SimulatedDevice(serial="BENCH0000", record_tx=False)
+    b = SimulatedDevice(serial="BENCH0001", record_tx=False)
+    a.connect(b)
+    sim = SimulatedHidUart([a, b])
+    sender, receiver = mod.HidUartDevice(), mod.HidUartDevice()
+    sender.Open(0, backend=sim)
+    receiver.Open(1, backend=sim)
+    data = _console_capture(kb << 10)
+    results = {}
+    try:
+        for name, flow in (("XMODEM-1K", mod.HID_UART.NO_FLOW_CONTROL),
+                           ("YMODEM-g", mod.HID_UART.RTS_CTS_FLOW_CONTROL)):
+            for hu in (sender, receiver):
+                hu.SetUartConfig(baud, mod.HID_UART.EIGHT_DATA_BITS, mod.HID_UART.NO_PARITY,
+                                 mod.HID_UART.SHORT_STOP_BIT, flow)
+            rx = ModemTransfer(receiver)
+            if name == "XMODEM-1K":
+                thread = threading.Thread(target=rx.receive_xmodem)
+                send = lambda: ModemTransfer(sender).send_xmodem(data)
+            else:
+                thread = threading.Thread(target=rx.receive_ymodem)
+                send = lambda: ModemTransfer(sender).send_ymodem([("bench.bin", data)])
+            thread.start()
+            stats = send()
+            thread.join()
+            results[name] = {'bytes_per_s': stats.bytes_per_s, 'line_rate_fraction': stats.efficiency,
+                             'retransmits': stats.retransmits}
+    finally:
+        sender.Close()
+        receiver.Close()
+    return results
+
+
+# C stand-in for libslabhidtouart: every entry point succeeds at once, so
+# timing it measures only the Python and ctypes dispatch cost per call.
+_STUB_C_SOURCE = r"""
+#include <string.h>
+typedef unsigned int DWORD; typedef unsigned short WORD; typedef unsigned char BYTE;
+typedef int BOOL; typedef void *HID_UART_DEVICE;
+#define OK return 0
+int HidUart_GetNumDevices(DWORD *n, WORD vid, WORD pid) { *n = 1; OK; }
+int HidUart_GetAttributes(DWORD i, WORD vid, WORD pid, WORD *v, WORD *p, WORD *r)
+    { *v = vid; *p = pid; *r = 0x0100; OK; }
+int HidUart_GetString(DWORD i, WORD vid, WORD pid, char *s, DWORD o) { strcpy(s, "STUB0001"); OK; }
+int HidUart_GetLibraryVersion(BYTE *a, BYTE *b, BOOL *c) { *a = 1; *b = 0; *c = 0; OK; }
+int HidUart_GetHidLibraryVersion(BYTE *a, BYTE *b, BOOL *c) { *a = 1; *b = 0; *c = 0; OK; }
+int HidUart_Open(HID_UART_DEVICE *d, DWORD i, WORD vid, WORD pid) { *d = (void *)0x1000; OK; }
+int HidUart_Close(HID_UART_DEVICE d) { OK; }
+int HidUart_IsOpened(HID_UART_DEVICE d, BOOL *o) { *o = 1; OK; }
+int HidUart_GetPartNumber(HID_UART_DEVICE d, BYTE *p, BYTE *v) { *p = 0x0A; *v = 1; OK; }
+int HidUart_GetOpenedAttributes(HID_UART_DEVICE d, WORD *v, WORD *p, WORD *r)
+    { *v = 0x10C4; *p = 0xEA80; *r = 0x0100; OK; }
+int HidUart_GetOpenedString(HID_UART_DEVICE d, char *s, DWORD o) { strcpy(s, "STUB0001"); OK; }
+int HidUart_SetUartEnable(HID_UART_DEVICE d, BOOL e) { OK; }
+int HidUart_GetUartEnable(HID_UART_DEVICE d, BOOL *e) { *e = 1; OK; }
+int HidUart_Read(HID_UART_DEVICE d, BYTE *b, DWORD n, DWORD *r) { *r = n; OK; }
+int HidUart_Write(HID_UART_DEVICE d, BYTE *b, DWORD n, DWORD *w) { *w = n; OK; }
+int HidUart_FlushBuffers(HID_UART_DEVICE d, BOOL t, BOOL r) { OK; }
+int HidUart_CancelIo(HID_UART_DEVICE d) { OK; }
+int HidUart_SetTimeouts(HID_UART_DEVICE d, DWORD r, DWORD w) { OK; }
+int HidUart_GetTimeouts(HID_UART_DEVICE d, DWORD *r, DWORD *w) { *r = 1000; *w = 1000; OK; }
+int HidUart_GetUartStatus(HID_UART_DEVICE d, WORD *t, WORD *r, BYTE *e, BYTE *l)
+    { *t = 0; *r = 0; *e = 0; *l = 0; OK; }
+int HidUart_SetUartConfig(HID_UART_DEVICE d, DWORD b, BYTE db, BYTE p, BYTE s, BYTE f) { OK; }
+int HidUart_GetUartConfig(HID_UART_DEVICE d, DWORD *b, BYTE *db, BYTE *p, BYTE *s, BYTE *f)
+    { *b = 115200; *db = 3; *p = 0; *s = 0; *f = 0; OK; }
+int HidUart_StartBreak(HID_UART_DEVICE d, BYTE t) { OK; }
+int HidUart_StopBreak(HID_UART_DEVICE d) { OK; }
+int HidUart_Reset(HID_UART_DEVICE d) { OK; }
+int HidUart_ReadLatch(HID_UART_DEVICE d, WORD *l) { *l = 0xFFFF; OK; }
+int HidUart_WriteLatch(HID_UART_DEVICE d, WORD l, WORD m) { OK; }
+"""
+
+
+def build_stub_library(directory):
+    """Compiles _STUB_C_SOURCE into directory; returns the .so path, or None without a C compiler."""
+    source = os.path.join(directory, "hiduart_stub.c")
+    target = os.path.join(directory, "libhiduart_stub.so")
+    with open(source, "w") as f:
+        f.write(_STUB_C_SOURCE)
+    compiler = os.environ.get("CC", "cc")
+    try:
+        subprocess.check_call([compiler, "-shared", "-fPIC", "-O2", "-o", target, source],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return target
+
+
+def bench_dispatch(mod, calls=100000):
+    """
+    Compares per-call cost of the hot entry points against a compiled stub library.
+
+    "legacy" repeats the previous call pattern (errcheck callback, fresh
+    out-parameters, attribute lookup on the library, no argtypes); "device"
+    calls the HidUartDevice methods as they are. Returns {name: {'legacy_us',
+    'device_us', 'delta_us'}} (delta = device - legacy), or None without a C
+    compiler.
+    """
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = build_stub_library(directory)
+        if path is None:
+            return None
+        previous = mod._DLL
+        lib = mod.SetLibrary(ct.CDLL(path))
+        try:
+            return _dispatch_cases(mod, lib, calls)
+        finally:
+            mod.SetLibrary(previous)
+
+
+def _dispatch_cases(mod, lib, calls):
+    class Legacy(object):
+        pass
+
+    # Function pointers configured the way _bind_prototypes used to configure them
+    legacy = Legacy()
+    for name in mod._HOT_FUNCTIONS:
+        fnc = lib[name]
+        fnc.restype = ct.c_int
+        if name not in ("HidUart_Read", "HidUart_Write"):
+            fnc.errcheck = mod.hiduart_errcheck
+        setattr(legacy, name, fnc)
+
+    class LegacyDevice(mod.HidUartDevice):
+        """The hot methods as they were before the fast path."""
+
+        def ReadInto(self, buffer, size=None):
+            cbuf, nbytes = mod._as_ctypes_buffer(buffer, writable=True)
+            if size is None or size > nbytes:
+                size = nbytes
+            status = self._dll.HidUart_Read(self.handle, cbuf, size, self._rx_count_ref)
+            if status == mod.HID_UART_SUCCESS or status == mod.HID_UART_READ_TIMED_OUT:
+                return self._rx_count.value
+            raise mod.HidUartError(status)
+
+        def Write(self, buffer, bytesToWrite=None, raiseOnTimeout=False):
+            cbuf, nbytes = mod._as_ctypes_buffer(buffer, writable=False)
+            status = self._dll.HidUart_Write(self.handle, cbuf, nbytes, self._tx_count_ref)
+            if status == mod.HID_UART_SUCCESS:
+                return self._tx_count.value
+            raise mod.HidUartError(status)
+
+        def ReadLatch(self, verify=False):
+            latch = ct.c_ushort()
+            self._dll.HidUart_ReadLatch(self.handle, ct.byref(latch))
+            known = self._latch_known
+            if (self._latch ^ latch.value) & known:
+                self.latch_drift += 1
+            self._latch = latch.value
+            self._latch_known = 0xFFFF
+            self._latch_verified_at = time.monotonic()
+            return latch.value
+
+        def WriteLatch(self, latch, mask):
+            self._dll.HidUart_WriteLatch(self.handle, latch, mask)
+            self._latch = (self._latch & ~mask) | (latch & mask)
+            self._latch_known |= mask & 0xFFFF
+
+        def GetUartStatus(self):
+            tx_fifo = ct.c_ushort(0)
+            rx_fifo = ct.c_ushort(0)
+            err_stat = ct.c_byte(0)
+            lbr_stat = ct.c_byte(0)
+            self._dll.HidUart_GetUartStatus(self.handle, ct.byref(tx_fifo), ct.byref(
+                rx_fifo), ct.byref(err_stat), ct.byref(lbr_stat))
+            return (tx_fifo.value, rx_fifo.value, err_stat.value, lbr_stat.value)
+
+        def GetTimeouts(self):
+            rto = ct.c_ulong(0)
+            wto = ct.c_ulong(0)
+            self._dll.HidUart_GetTimeouts(self.handle, ct.byref(rto), ct.byref(wto))
+            return (rto.value, wto.value)
+
+        def SetTimeouts(self, rto=1000, wto=1000):
+            self._dll.HidUart_SetTimeouts(self.handle, rto, wto)
+            self._rto, self._wto = rto, wto
+
+    old = LegacyDevice()
+    old.Open(0)
+    old._dll = legacy
+    hu = mod.HidUartDevice()
+    hu.Open(0)
+    rx = bytearray(64)
+    tx = b"x" * 64
+    cases = [
+        ("ReadLatch", lambda dev: dev.ReadLatch(verify=True)),
+        ("WriteLatch", lambda dev: dev.WriteLatch(0x0004, 0x0004)),
+        ("GetUartStatus", lambda dev: dev.GetUartStatus()),
+        ("GetTimeouts", lambda dev: dev.GetTimeouts()),
+        ("SetTimeouts", lambda dev: dev.SetTimeouts(1000, 1000)),
+        ("ReadInto(64)", lambda dev: dev.ReadInto(rx)),
+        ("Write(64)", lambda dev: dev.Write(tx)),
+    ]
+    results = {}
+    try:
+        for name, call in cases:
+            def before(call=call):
+                return call(old)
+
+            def after(call=call):
+                return call(hu)
+            assert before() == after()
+            # Alternate batches so both sides see the same machine load
+            legacy_s = device_s = float("inf")
+            for _ in range(max(calls // 1000, 1)):
+                legacy_s = min(legacy_s, _time_calls(before, 1000, batch=1000)[0])
+                device_s = min(device_s, _time_calls(after, 1000, batch=1000)[0])
+            legacy_us = legacy_s * 1e6
+            device_us = device_s * 1e6
+            results[name] = {'legacy_us': legacy_us, 'device_us': device_us,
+                             'delta_us': device_us - legacy_us}
+    finally:
+        old._dll = lib
+        old.Close()
+        hu.Close()
+    return results
+
+
+# Budget for importing cp211x_HID_UART, excluding the stdlib (tests/test_import.py)
+IMPORT_BUDGET_MS = 20.0
+
+
+def measure_import_time(runs=5):
+    """Returns the best-of-runs wall time (s) of importing cp211x_HID_UART in a fresh interpreter.
+
+    Bytecode is cached in a private pycache so source compilation is not
+    counted, and the cost of the stdlib modules it imports is subtracted.
+    """
+    import tempfile
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    code = ("import time; t = time.perf_counter(); {}"
+            "print(time.perf_counter() - t)")
+    env = dict(os.environ)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+
+    with tempfile.TemporaryDirectory() as cache:
+        def best(stmt):
+            cmd = [sys.executable, "-X", "pycache_prefix=" + cache, "-c", code.format(stmt)]
+            subprocess.check_output(cmd, cwd=here, env=env)     # warm the bytecode cache
+            return min(float(subprocess.check_output(cmd, cwd=here, env=env))
+                       for _ in range(runs))
+
+        baseline = best("import ctypes, os, struct, threading, time; ")
+        loaded = best("import cp211x_HID_UART as m; assert isinstance(m._DLL, m._LazyLibrary); ")
+    return max(loaded - baseline, 0.0), loaded
+
+
+def _print_results(title, results, out=sys.stdout):
+    print(title, file=out)
+    for name, (per_mb, usec) in results.items():
+        print("  {:<20} {:>12.0f} bytes allocated/MB  {:>8.2f} us/call".format(
+            name, per_mb, usec), file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--mb", type=int, default=1,
+                        help="megabytes transferred per benchmark (default: 1)")
+    parser.add_argument("--calls", type=int, default=10000,
+                        help="calls per entry point in the overhead suite (default: 10000)")
+    parser.add_argument("--json", metavar="PATH",
+                        help="also write the results as JSON to PATH ('-' for stdout)")
+    parser.add_argument("--import-budget-ms", type=float, nargs="?", const=IMPORT_BUDGET_MS,
+                        default=None,
+                        help="only check that importing the module stays within this budget "
+                             "(default: {:g} ms)".format(IMPORT_BUDGET_MS))
+    args = parser.parse_args(argv)
+
+    if args.import_budget_ms is not None:
+        module_cost, total = measure_import_time()
+        print("Import cp211x_HID_UART: {:.2f} ms ({:.2f} ms including stdlib imports), "
+              "budget {:.2f} ms".format(module_cost * 1e3, total * 1e3, args.import_budget_ms))
+        return 0 if module_cost * 1e3 <= args.import_budget_ms else 1
+
+    mod = import_with_stub()
+    report = {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'machine': platform.machine(),
+        'timestamp': time.time(),
+    }
+    out = sys.stderr if args.json == "-" else sys.stdout
+
+    overhead = bench_call_overhead(mod, args.calls)
+    report['overhead'] = overhead
+    print("Per-call overhead (simulated device):", file=out)
+    for r in overhead:
+        rate = "  {:>8.1f} MB/s".format(r['mb_per_s']) if 'mb_per_s' in r else ""
+        print("  {:<22} {:>8.2f} us mean  {:>8.2f} us p50  {:>8.2f} us p99{}".format(
+            r['name'], r['mean_us'], r['p50_us'], r['p99_us'], rate), file=out)
+
+    for key, title, bench in (("read_allocations", "Read path (4 KiB chunks):", bench_read_allocations),
+                              ("write_allocations", "Write path (4 KiB chunks):", bench_write_allocations)):
+        results = bench(mod, args.mb)
+        report[key] = {name: {'bytes_per_mb': per_mb, 'us_per_call': usec}
+                       for name, (per_mb, usec) in results.items()}
+        _print_results(title, results, out)
+
+    print("Write coalescing (8-byte commands):", file=out)
+    report['write_coalescing'] = {}
+    for name, (calls, reports, usec) in bench_write_coalescing(mod).items():
+        report['write_coalescing'][name] = {
+            'transactions_per_kb': calls, 'reports_per_kb': reports, 'us_per_command': usec}
+        print("  {:<20} {:>8.1f} transactions/KB  {:>8.1f} reports/KB  {:>8.2f} us/command".format(
+            name, calls, reports, usec), file=out)
+
+    report['framing'] = {}
+    long_lines = (b"#" * (256 << 10) + b"\n") * 4
+    for chunk, text, label in ((63, None, "console capture"), (4096, None, "console capture"),
+                               (63, long_lines, "256 KiB lines")):
+        print("Framing (1 MiB {}, {}-byte chunks):".format(label, chunk), file=out)
+        for name, (mbps, realtime) in bench_framing(chunk=chunk, text=text).items():
+            key = "{} [{}, {}]".format(name, label, chunk)
+            report['framing'][key] = {'mb_per_s': mbps, 'x_1mbaud': realtime}
+            print("  {:<22} {:>8.2f} MB/s  {:>8.1f}x 1 Mbaud".format(name, mbps, realtime), file=out)
+    mbps, realtime = bench_framed_reader(mod)
+    report['framing']['FramedReader.readline'] = {'mb_per_s': mbps, 'x_1mbaud': realtime}
+    print("FramedReader on the simulator:", file=out)
+    print("  {:<22} {:>8.2f} MB/s  {:>8.1f}x 1 Mbaud".format(
+        "readline()", mbps, realtime), file=out)
+
+    print("I/O modes (simulated loopback at 1 Mbaud, 4 KiB reads):", file=out)
+    report['io_modes'] = bench_io_modes(mod)
+    for mode, r in report['io_modes'].items():
+        print("  {:<12} RTT {:>8.2f} ms min {:>8.2f} ms mean   bulk {:>6.3f} MB/s"
+              " in {:>4} reads; {:>5} library calls total".format(
+                  mode, r['rtt_ms']['min'], r['rtt_ms']['mean'], r['bulk_mb_per_s'],
+                  r['bulk_reads'], r['library_calls']), file=out)
+
+    bridge = bench_pty_bridge(mod)
+    report['pty_bridge'] = bridge
+    print("PTY bridge (simulated loopback at 1 Mbaud):", file=out)
+    print("  RTT {:.2f} ms direct, {:.2f} ms bridged ({:+.2f} ms); bulk {:.1f} KB/s"
+          " ({:.1%} of line rate)".format(
+              bridge['direct_rtt_ms'], bridge['bridged_rtt_ms'], bridge['added_rtt_ms'],
+              bridge['bulk_bytes_per_s'] / 1e3, bridge['bulk_line_rate_fraction']), file=out)
+
+    trace = bench_trace_replay(mod)
+    report['trace_replay'] = trace
+    print("Trace replay (64 KiB loopback session at 1 Mbaud, {:.1f} s recorded, {} KiB trace):".format(
+        trace['recorded_s'], trace['trace_bytes'] >> 10), file=out)
+    print("  strict {:>8.1f}x real time   FramedReader.readline {:>8.1f}x real time".format(
+        trace['strict_x_realtime'], trace['framed_x_realtime']), file=out)
+
+    print("File transfer (128 KiB between cross-connected simulated devices at 1 Mbaud):", file=out)
+    report['modem_transfer'] = bench_modem_transfer(mod)
+    for name, r in report['modem_transfer'].items():
+        print("  {:<10} {:>8.1f} KB/s  {:>6.1%} of line rate  {} retransmits".format(
+            name, r['bytes_per_s'] / 1e3, r['line_rate_fraction'], r['retransmits']), file=out)
+
+    dispatch = bench_dispatch(mod, args.calls * 10)
+    report['dispatch'] = dispatch
+    if dispatch is None:
+        print("ctypes dispatch: skipped (no C compiler for the stub library)", file=out)
+    else:
+        print("ctypes dispatch (compiled stub library, best of batches):", file=out)
+        for name, r in dispatch.items():
+            print("  {:<22} {:>8.3f} us legacy  {:>8.3f} us device  {:>+8.3f} us".format(
+                name, r['legacy_us'], r['device_us'], r['delta_us']), file=out)
+
+    if args.json == "-":
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    elif args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,438 @@
+#!/usr/bin/env python3
+"""
+Streaming UART capture to rotating, indexed binary log files.
+
+A UartCapture thread drains a HidUartDevice (or RxPump) and appends every
+received chunk as a record to size-rotated files:
+
+    file header   b"CP2CAP1\\0" + <QQ (monotonic_ns, time_ns at file start)
+    record        <QI (monotonic_ns, length) + length bytes
+
+Records are batched in memory and written every flush_interval seconds or
+buffer_size bytes. Each capture file has a sidecar "<file>.idx" of
+<QQ (monotonic_ns, offset) entries, written every index_interval bytes, so
+readers can seek to a timestamp without scanning.
+
+    with CaptureWriter("logs", prefix="board7") as writer:
+        with UartCapture(hu, writer):
+            run_test()
+
+    reader = CaptureReader("logs", prefix="board7")
+    reader.export_text(sys.stdout, start=t0)
+
+Command line:
+    python3 cp211x_capture.py record logs --serial 0001A2B3 --baud 115200
+    python3 cp211x_capture.py export logs --serial 0001A2B3 [--from SECONDS] [--to SECONDS]
+"""
+
+import argparse
+import glob
+import os
+import struct
+import sys
+import threading
+import time
+
+from cp211x_HID_UART import HID_UART, HidUartDevice, HidUartError
+
+__all__ = ['CaptureWriter', 'CaptureReader', 'UartCapture', 'CaptureFormatError']
+
+MAGIC = b"CP2CAP1\0"
+FILE_HEADER = struct.Struct("<8sQQ")
+RECORD_HEADER = struct.Struct("<QI")
+INDEX_ENTRY = struct.Struct("<QQ")
+INDEX_SUFFIX = ".idx"
+
+
+class CaptureFormatError(Exception):
+    """Raised for files that are not capture files or have corrupt records."""
+
+
+class CaptureWriter(object):
+    """
+    Writes records to <directory>/<prefix>.<NNNN>.cap, rotating at max_bytes.
+
+    max_files keeps only the newest files (None keeps all). Records are
+    buffered until buffer_size bytes or flush_interval seconds accumulate.
+    """
+
+    def __init__(self, directory, prefix="capture", max_bytes=64 << 20, max_files=None,
+                 buffer_size=256 << 10, flush_interval=0.5, index_interval=64 << 10):
+        self.directory = directory
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.index_interval = index_interval
+        os.makedirs(directory, exist_ok=True)
+        existing = _capture_files(directory, prefix)
+        self._sequence = _file_sequence(existing[-1]) + 1 if existing else 0
+        self._file = None
+        self._index = None
+        self._size = 0
+        self._last_indexed = None
+        self._pending = bytearray()
+        self._pending_index = bytearray()
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self.path = None
+
+        # Counters
+        self.records = 0
+        self.bytes_captured = 0
+        self.files = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _open_next(self, timestamp):
+        self._close_file()
+        self.path = os.path.join(self.directory, "{}.{:04d}.cap".format(self.prefix, self._sequence))
+        self._sequence += 1
+        self._file = open(self.path, "wb")
+        self._index = open(self.path + INDEX_SUFFIX, "wb")
+        wall = time.time_ns() - (time.monotonic_ns() - timestamp)
+        self._file.write(FILE_HEADER.pack(MAGIC, timestamp, wall))
+        self._size = FILE_HEADER.size
+        self._last_indexed = None
+        self.files += 1
+        if self.max_files:
+            for old in _capture_files(self.directory, self.prefix)[:-self.max_files]:
+                for path in (old, old + INDEX_SUFFIX):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+
+    def write(self, data, timestamp=None):
+        """Appends data as one record stamped with timestamp (monotonic_ns, default now)."""
+        if timestamp is None:
+            timestamp = time.monotonic_ns()
+        with self._lock:
+            if self._file is None or self._size + len(self._pending) >= self.max_bytes:
+                self._flush_locked()
+                self._open_next(timestamp)
+            offset = self._size + len(self._pending)
+            if self._last_indexed is None or offset - self._last_indexed >= self.index_interval:
+                self._pending_index += INDEX_ENTRY.pack(timestamp, offset)
+                self._last_indexed = offset
+            self._pending += RECORD_HEADER.pack(timestamp, len(data))
+            self._pending += data
+            self.records += 1
+            self.bytes_captured += len(data)
+            if len(self._pending) >= self.buffer_size or \
+                    time.monotonic() - self._last_flush >= self.flush_interval:
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        self._last_flush = time.monotonic()
+        if self._file is None:
+            return
+        if self._pending:
+            self._file.write(self._pending)
+            self._size += len(self._pending)
+            del self._pending[:]
+        if self._pending_index:
+            self._index.write(self._pending_index)
+            del self._pending_index[:]
+        self._file.flush()
+        self._index.flush()
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.close()
+            self._index.close()
+            self._file = self._index = None
+
+    def close(self):
+        with self._lock:
+            self._flush_locked()
+            self._close_file()
+
+
+class UartCapture(object):
+    """
+    Reader thread that streams device RX chunks into a CaptureWriter.
+
+    The source is anything with ReadInto (HidUartDevice) or readinto
+    (RxPump). The writer is flushed at least every flush_interval seconds,
+    even while the line is idle. An RxPump is read with waits of at most
+    poll_interval seconds, since stop() cannot cancel them.
+    """
+
+    def __init__(self, source, writer, chunk_size=4096, poll_interval=0.1):
+        self.source = source
+        self.writer = writer
+        self._chunk = bytearray(chunk_size)
+        self._view = memoryview(self._chunk)
+        if hasattr(source, "ReadInto"):
+            self._read_into = source.ReadInto
+        else:
+            wait = min(poll_interval, writer.flush_interval)
+            self._read_into = lambda buffer: source.readinto(buffer, wait)
+        self._stopping = threading.Event()
+        self._thread = None
+        self.error = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stopping.clear()
+        self.error = None
+        self._thread = threading.Thread(target=self._run, name="UartCapture", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """Stops the thread (aborting a pending read) and flushes the writer.
+
+        Returns False if the thread is still running after timeout seconds;
+        it then stays referenced (running is True) until a later stop().
+        """
+        self._stopping.set()
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            cancel = getattr(self.source, "CancelIo", None)
+            if cancel is not None:
+                try:
+                    cancel()
+                except HidUartError:
+                    pass
+            thread.join(timeout)
+        stopped = thread is None or not thread.is_alive()
+        if stopped:
+            self._thread = None
+        self.writer.flush()
+        return stopped
+
+    def _run(self):
+        read_into = self._read_into
+        write = self.writer.write
+        view = self._view
+        interval = self.writer.flush_interval
+        last_flush = time.monotonic()
+        try:
+            while not self._stopping.is_set():
+                count = read_into(self._chunk)
+                if count:
+                    write(view[:count], time.monotonic_ns())
+                elif time.monotonic() - last_flush >= interval:
+                    self.writer.flush()
+                    last_flush = time.monotonic()
+        except HidUartError as e:
+            if not self._stopping.is_set():
+                self.error = e
+
+
+def _capture_files(directory, prefix):
+    paths = glob.glob(os.path.join(glob.escape(directory), glob.escape(prefix) + ".*.cap"))
+    return sorted((p for p in paths if _file_sequence(p) >= 0), key=_file_sequence)
+
+
+def _file_sequence(path):
+    try:
+        return int(os.path.basename(path).rsplit(".", 2)[-2])
+    except (ValueError, IndexError):
+        return -1
+
+
+class CaptureReader(object):
+    """
+    Streams records from a set of capture files in order.
+
+    Pass a directory and prefix, or a list of file paths. Nothing is loaded
+    beyond one record (and one index entry while seeking) at a time.
+    """
+
+    def __init__(self, directory=None, prefix="capture", paths=None):
+        if paths is None:
+            paths = _capture_files(directory, prefix)
+        self.paths = list(paths)
+        self._headers = {}
+
+    def header(self, path):
+        """Returns (start monotonic_ns, start time_ns) of a capture file."""
+        header = self._headers.get(path)
+        if header is None:
+            with open(path, "rb") as f:
+                raw = f.read(FILE_HEADER.size)
+            if len(raw) < FILE_HEADER.size or raw[:8] != MAGIC:
+                raise CaptureFormatError("not a capture file: " + path)
+            header = self._headers[path] = FILE_HEADER.unpack(raw)[1:]
+        return header
+
+    def wall_offset(self):
+        """Returns time_ns - monotonic_ns for the capture (from the first file)."""
+        if not self.paths:
+            return 0
+        mono, wall = self.header(self.paths[0])
+        return wall - mono
+
+    @staticmethod
+    def _seek_offset(path, timestamp):
+        """Returns the offset of the last indexed record at or before timestamp."""
+        offset = FILE_HEADER.size
+        try:
+            f = open(path + INDEX_SUFFIX, "rb")
+        except OSError:
+            return offset
+        with f:
+            lo, hi = 0, os.fstat(f.fileno()).st_size // INDEX_ENTRY.size
+            while lo < hi:
+                mid = (lo + hi) // 2
+                f.seek(mid * INDEX_ENTRY.size)
+                stamp, position = INDEX_ENTRY.unpack(f.read(INDEX_ENTRY.size))
+                if stamp <= timestamp:
+                    offset = position
+                    lo = mid + 1
+                else:
+                    hi = mid
+        return offset
+
+    def records(self, start=None, end=None):
+        """Yields (monotonic_ns, bytes) records with start <= timestamp < end."""
+        paths = self.paths
+        if start is not None:
+            # Skip whole files that end before start
+            first = 0
+            for i, path in enumerate(paths):
+                if self.header(path)[0] <= start:
+                    first = i
+            paths = paths[first:]
+        for path in paths:
+            if end is not None and self.header(path)[0] >= end:
+                return
+            with open(path, "rb") as f:
+                offset = FILE_HEADER.size
+                if start is not None:
+                    offset = self._seek_offset(path, start)
+                f.seek(offset)
+                while True:
+                    raw = f.read(RECORD_HEADER.size)
+                    if len(raw) < RECORD_HEADER.size:
+                        break           # end of file (or a record still being written)
+                    stamp, length = RECORD_HEADER.unpack(raw)
+                    data = f.read(length)
+                    if len(data) < length:
+                        break
+                    if end is not None and stamp >= end:
+                        return
+                    if start is None or stamp >= start:
+                        yield stamp, data
+
+    def export_text(self, out, start=None, end=None, wall=True, encoding="utf-8"):
+        """
+        Writes the capture as text, each line prefixed with the arrival time
+        of its first byte (wall-clock, or seconds since the capture start).
+        """
+        offset = self.wall_offset()
+        base = self.header(self.paths[0])[0] if self.paths else 0
+        at_line_start = True
+        lines = 0
+        for stamp, data in self.records(start, end):
+            if wall:
+                seconds = (stamp + offset) / 1e9
+                prefix = "{}.{:06d} ".format(
+                    time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(seconds)),
+                    int(seconds * 1e6) % 1000000)
+            else:
+                prefix = "{:12.6f} ".format((stamp - base) / 1e9)
+            pieces = data.decode(encoding, "replace").split("\n")
+            last = len(pieces) - 1
+            for i, piece in enumerate(pieces):
+                if i == last and not piece:
+                    break
+                if at_line_start:
+                    out.write(prefix)
+                    lines += 1
+                out.write(piece)
+                at_line_start = i < last
+                if at_line_start:
+                    out.write("\n")
+        if not at_line_start:
+            out.write("\n")
+        return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Capture CP211x UART output to rotating log files")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rec = sub.add_parser("record", help="capture a device until interrupted")
+    rec.add_argument("directory")
+    rec.add_argument("--prefix", default=None, help="file prefix (default: serial or 'capture')")
+    rec.add_argument("--index", type=int, default=0, help="device index (default: 0)")
+    rec.add_argument("--serial", help="open the device with this serial number")
+    rec.add_argument("--baud", type=int, default=None)
+    rec.add_argument("--max-mb", type=int, default=64, help="rotate files at this size")
+    rec.add_argument("--max-files", type=int, default=None)
+    exp = sub.add_parser("export", help="print a capture as timestamped text")
+    exp.add_argument("directory")
+    exp.add_argument("--prefix", default=None, help="file prefix (default: serial or 'capture')")
+    exp.add_argument("--serial", help="the serial number the capture was recorded with")
+    exp.add_argument("--from", dest="start", type=float, default=None,
+                     help="seconds since the capture start")
+    exp.add_argument("--to", dest="end", type=float, default=None,
+                     help="seconds since the capture start")
+    exp.add_argument("--relative", action="store_true",
+                     help="print seconds since the capture start instead of wall-clock time")
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        reader = CaptureReader(args.directory, args.prefix or args.serial or "capture")
+        if not reader.paths:
+            print("No capture files found", file=sys.stderr)
+            return 1
+        base = reader.header(reader.paths[0])[0]
+        start = None if args.start is None else base + int(args.start * 1e9)
+        end = None if args.end is None else base + int(args.end * 1e9)
+        reader.export_text(sys.stdout, start, end, wall=not args.relative)
+        return 0
+
+    hu = HidUartDevice()
+    if args.serial:
+        hu.Open(serial=args.serial, vid=HID_UART.VID, pid=HID_UART.PID)
+    else:
+        hu.Open(args.index)
+    try:
+        hu.SetTimeouts(50, 1000)
+        if args.baud:
+            hu.SetUartConfig(args.baud)
+        prefix = args.prefix or args.serial or "capture"
+        with CaptureWriter(args.directory, prefix, args.max_mb << 20, args.max_files) as writer:
+            capture = UartCapture(hu, writer)
+            capture.start()
+            try:
+                while capture.running:
+                    time.sleep(0.5)
+            except KeyboardInterrupt:
+                pass
+            capture.stop()
+            if capture.error:
+                print("Capture stopped: {}".format(capture.error), file=sys.stderr)
+            print("{} bytes in {} records, {} file(s)".format(
+                writer.bytes_captured, writer.records, writer.files), file=sys.stderr)
+    finally:
+        hu.Close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
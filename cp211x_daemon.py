@@ -0,0 +1,561 @@
+#!/usr/bin/env python3
+"""
+Long-lived CP211x device daemon with a local Unix-socket RPC.
+
+The daemon loads the libraries once and keeps devices open between
+requests. A power action from CI then costs about one socket round trip
+instead of a library load, enumeration and open:
+
+    python3 cp211x_daemon.py serve &
+    python3 cp211x_daemon.py power-cycle --device 0001A2B3 --off-time 0.5
+    python3 cp211x_daemon.py info --device 0001A2B3
+    python3 cp211x_daemon.py stream --device 0001A2B3      # console on stdin/stdout
+
+Protocol: one JSON object per line in each direction.
+    request   {"id": 1, "method": "power_cycle", "params": {"device": "0001A2B3"}}
+    response  {"id": 1, "result": ...} or {"id": 1, "error": {"status": 20, "message": "..."}}
+The "stream" method answers {"result": "streaming"} and then turns the
+connection into a raw byte pipe to the device UART until either side closes.
+
+Devices are addressed by serial number (any JSON string, digits included)
+or index (JSON integer); the default is index 0. On the command line
+--device takes a serial number, and --index N or --device '#N' an index.
+"""
+
+import argparse
+import json
+import os
+import select
+import socket
+import socketserver
+import sys
+import threading
+import time
+
+from cp211x_HID_UART import (HID_UART, HID_UART_INVALID_PARAMETER, HID_UART_DEVICE_IO_FAILED,
+                             HID_UART_DEVICE_ACCESS_ERROR, HID_UART_DEVICE_NOT_FOUND,
+                             STALE_HANDLE_STATUSES,
+                             HidUartDevice, HidUartError, close_quietly,
+                             DeviceIndex, POWER_PIN_MASK, POWER_ON_LATCH, POWER_OFF_LATCH)
+from cp211x_sequencer import sleep_until_ns
+
+__all__ = ['DeviceDaemon', 'DaemonClient', 'DaemonError', 'default_socket_path']
+
+SOCKET_ENV = "CP211X_SOCKET"
+
+
+def default_socket_path():
+    """Returns $CP211X_SOCKET, else cp211x.sock in $XDG_RUNTIME_DIR or /tmp."""
+    if os.environ.get(SOCKET_ENV):
+        return os.environ[SOCKET_ENV]
+    runtime = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime:
+        return os.path.join(runtime, "cp211x.sock")
+    return "/tmp/cp211x-{}.sock".format(os.getuid())
+
+
+class DaemonError(HidUartError):
+    """Error reported by the daemon; status is the library status (if any)."""
+
+    def __init__(self, status, message):
+        HidUartError.__init__(self, status)
+        self.message = message
+
+    def __str__(self):
+        return self.message
+
+
+class _Slot(object):
+    """A device (None until opened), its index when opened and the lock serialising requests to it."""
+
+    def __init__(self):
+        self.device = None
+        self.index = None
+        self.lock = threading.Lock()
+        self.streaming = False
+
+
+class DeviceDaemon(object):
+    """
+    Keeps CP211x devices open and serves RPC requests on a Unix socket.
+
+    Devices are opened on first use and kept open, one per serial number
+    whether they are addressed by serial or index; a handle that fails with
+    an I/O, handle or not-found status is closed and reopened on the next
+    request.
+    """
+
+    def __init__(self, socket_path=None, vid=HID_UART.VID, pid=HID_UART.PID):
+        self.socket_path = socket_path or default_socket_path()
+        self.vid = vid
+        self.pid = pid
+        self._slots = {}
+        self._lock = threading.Lock()
+        self._server = None
+        self.requests = 0
+        self.started = time.time()
+
+    # ------------------------------------------------------------------
+    # Devices
+
+    def _key(self, device):
+        # Strings are serial numbers, even all-digit ones; only integers are indexes
+        if device is None:
+            return 0
+        if isinstance(device, bool) or not isinstance(device, (int, str)):
+            raise TypeError("device must be a serial string or an index, not {!r}".format(device))
+        return device
+
+    def _serial(self, device):
+        """Returns the serial number slots are keyed by for a serial or an index."""
+        key = self._key(device)
+        if not isinstance(key, int):
+            return key
+        entries = list(DeviceIndex.shared(self.vid, self.pid))
+        if not 0 <= key < len(entries):
+            raise HidUartError(HID_UART_DEVICE_NOT_FOUND)
+        entry = entries[key]
+        if entry.serial is not None:
+            return entry.serial
+        # Open devices cannot be queried: ours are known by their index at open time
+        with self._lock:
+            for serial, slot in self._slots.items():
+                if slot.index == key and slot.device is not None:
+                    return serial
+        raise HidUartError(entry.status)
+
+    def _slot(self, device):
+        serial = self._serial(device)
+        while True:
+            with self._lock:
+                slot = self._slots.get(serial)
+                if slot is None:
+                    slot = self._slots[serial] = _Slot()
+            # Opening takes the slot's lock only, so other devices are not held up
+            with slot.lock:
+                if slot.device is not None:
+                    return slot
+                if self._slots.get(serial) is not slot:
+                    continue        # the open failed in another thread
+                hu = HidUartDevice()
+                try:
+                    slot.index = DeviceIndex.shared(self.vid, self.pid).lookup(serial).index
+                    hu.Open(vid=self.vid, pid=self.pid, serial=serial)
+                except HidUartError:
+                    with self._lock:
+                        if self._slots.get(serial) is slot:
+                            del self._slots[serial]
+                    raise
+                slot.device = hu
+                return slot
+
+    def _drop(self, serial):
+        with self._lock:
+            slot = self._slots.pop(serial, None)
+        if slot is not None and slot.device is not None:
+            close_quietly(slot.device)
+
+    def _with_device(self, params, func):
+        serial = self._serial(params.get("device"))
+        slot = self._slot(serial)
+        try:
+            with slot.lock:
+                return func(slot.device)
+        except HidUartError as e:
+            if e.status in STALE_HANDLE_STATUSES:
+                self._drop(serial)
+            raise
+
+    def close(self):
+        with self._lock:
+            slots = list(self._slots.values())
+            self._slots.clear()
+        for slot in slots:
+            if slot.device is not None:
+                close_quietly(slot.device)
+
+    # ------------------------------------------------------------------
+    # RPC methods (params dict -> JSON-serialisable result)
+
+    def rpc_ping(self, params):
+        return {'pid': os.getpid(), 'uptime': time.time() - self.started,
+                'requests': self.requests, 'open': [str(k) for k in self._slots]}
+
+    def rpc_list(self, params):
+        with self._lock:
+            opened = set(self._slots)
+            opened_indexes = set(slot.index for slot in self._slots.values())
+        return [{'index': e.index, 'serial': e.serial, 'path': e.path, 'status': e.status,
+                 'open': e.serial in opened if e.serial is not None else e.index in opened_indexes}
+                for e in DeviceIndex.shared(self.vid, self.pid)]
+
+    def rpc_info(self, params):
+        return self._with_device(params, lambda hu: hu.GetDeviceInfo(
+            verify_latch=bool(params.get("verify_latch"))).to_dict())
+
+    def rpc_read_latch(self, params):
+        return self._with_device(params, lambda hu: hu.ReadLatch(bool(params.get("verify"))))
+
+    def rpc_write_latch(self, params):
+        latch = int(params["latch"])
+        mask = int(params.get("mask", 0xFFFF))
+
+        def write(hu):
+            hu.WriteLatch(latch, mask)
+            return hu.ReadLatch()
+        return self._with_device(params, write)
+
+    def rpc_power_off(self, params):
+        params = dict(params, latch=POWER_OFF_LATCH, mask=POWER_PIN_MASK)
+        return self.rpc_write_latch(params)
+
+    def rpc_power_on(self, params):
+        params = dict(params, latch=POWER_ON_LATCH, mask=POWER_PIN_MASK)
+        return self.rpc_write_latch(params)
+
+    def rpc_power_cycle(self, params):
+        off_time = float(params.get("off_time", 0.0))
+
+        def cycle(hu):
+            hu.WriteLatch(POWER_OFF_LATCH, POWER_PIN_MASK)
+            sleep_until_ns(time.monotonic_ns() + int(off_time * 1e9))
+            hu.WriteLatch(POWER_ON_LATCH, POWER_PIN_MASK)
+            return hu.ReadLatch()
+        return self._with_device(params, cycle)
+
+    def rpc_get_uart_config(self, params):
+        return self._with_device(params, lambda hu: list(hu.GetUartConfig()))
+
+    def rpc_set_uart_config(self, params):
+        config = [int(params.get("baud", 115200)),
+                  int(params.get("data", HID_UART.EIGHT_DATA_BITS)),
+                  int(params.get("parity", HID_UART.NO_PARITY)),
+                  int(params.get("stop", HID_UART.SHORT_STOP_BIT)),
+                  int(params.get("flow", HID_UART.NO_FLOW_CONTROL))]
+
+        def configure(hu):
+            hu.SetUartConfig(*config)
+            return list(hu.GetUartConfig())
+        return self._with_device(params, configure)
+
+    def rpc_close(self, params):
+        self._drop(self._serial(params.get("device")))
+        return True
+
+    def rpc_shutdown(self, params):
+        threading.Thread(target=self.shutdown, daemon=True).start()
+        return True
+
+    # ------------------------------------------------------------------
+    # Streaming
+
+    def stream(self, params, sock):
+        """
+        Pipes bytes between sock and the device UART until either side closes.
+
+        Clients must wait for the "streaming" reply before sending UART data.
+        """
+        slot = self._slot(params.get("device"))
+        hu = slot.device
+        with slot.lock:
+            if slot.streaming:
+                raise DaemonError(HID_UART_DEVICE_ACCESS_ERROR, "device is already streaming")
+            saved = hu.GetTimeouts()
+            hu.SetTimeouts(20, saved[1])
+            slot.streaming = True
+        stop = threading.Event()
+
+        def rx_loop():
+            buffer = bytearray(4096)
+            view = memoryview(buffer)
+            try:
+                while not stop.is_set():
+                    count = hu.ReadInto(buffer)
+                    if count:
+                        sock.sendall(view[:count])
+            except (OSError, HidUartError):
+                pass
+            finally:
+                stop.set()
+                try:
+                    sock.shutdown(socket.SHUT_WR)
+                except OSError:
+                    pass
+
+        _send(sock, {'id': params.get("_id"), 'result': 'streaming'})
+        reader = threading.Thread(target=rx_loop, name="cp211x-stream", daemon=True)
+        reader.start()
+        try:
+            while not stop.is_set():
+                ready, _, _ = select.select([sock], [], [], 0.2)
+                if not ready:
+                    continue
+                data = sock.recv(4096)
+                if not data:
+                    break
+                with slot.lock:
+                    hu.Write(data)
+        except (OSError, HidUartError):
+            pass
+        finally:
+            stop.set()
+            try:
+                hu.CancelIo()
+            except HidUartError:
+                pass
+            reader.join()
+            with slot.lock:
+                slot.streaming = False
+                hu.SetTimeouts(*saved)
+
+    # ------------------------------------------------------------------
+    # Server
+
+    def handle(self, request):
+        """Dispatches one request dict and returns the response dict."""
+        self.requests += 1
+        rid = request.get("id")
+        method = request.get("method")
+        func = getattr(self, "rpc_" + str(method), None)
+        if func is None:
+            return {'id': rid, 'error': {'status': HID_UART_INVALID_PARAMETER,
+                                         'message': "unknown method: {}".format(method)}}
+        try:
+            return {'id': rid, 'result': func(request.get("params") or {})}
+        except HidUartError as e:
+            return {'id': rid, 'error': {'status': e.status, 'message': str(e)}}
+        except (KeyError, ValueError, TypeError) as e:
+            return {'id': rid, 'error': {'status': HID_UART_INVALID_PARAMETER,
+                                         'message': "invalid parameters: {}".format(e)}}
+
+    def serve_forever(self):
+        """Binds the socket (replacing a stale one) and serves until shutdown()."""
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    try:
+                        request = json.loads(line)
+                    except ValueError:
+                        _send(self.connection, {'id': None, 'error': {
+                            'status': HID_UART_INVALID_PARAMETER, 'message': "malformed request"}})
+                        continue
+                    if request.get("method") == "stream":
+                        params = dict(request.get("params") or {}, _id=request.get("id"))
+                        try:
+                            daemon.stream(params, self.connection)
+                        except HidUartError as e:
+                            _send(self.connection, {'id': request.get("id"), 'error': {
+                                'status': e.status, 'message': str(e)}})
+                            continue
+                        return
+                    _send(self.connection, daemon.handle(request))
+
+        self._remove_stale_socket()
+        server = socketserver.ThreadingUnixStreamServer(self.socket_path, Handler)
+        server.daemon_threads = True
+        os.chmod(self.socket_path, 0o600)
+        self._server = server
+        try:
+            server.serve_forever()
+        finally:
+            server.server_close()
+            try:
+                os.unlink(self.socket_path)
+            except OSError:
+                pass
+            self.close()
+
+    def shutdown(self):
+        if self._server is not None:
+            self._server.shutdown()
+
+    def _remove_stale_socket(self):
+        if not os.path.exists(self.socket_path):
+            return
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.socket_path)
+        except OSError:
+            os.unlink(self.socket_path)
+        else:
+            raise OSError("daemon already running on " + self.socket_path)
+        finally:
+            probe.close()
+
+
+def _send(sock, message):
+    sock.sendall(json.dumps(message).encode() + b"\n")
+
+
+class DaemonClient(object):
+    """
+    Client for a DeviceDaemon; keeps one connection open for many calls.
+
+        with DaemonClient() as client:
+            client.power_cycle("0001A2B3", off_time=0.5)
+    """
+
+    def __init__(self, socket_path=None, timeout=30.0):
+        self.socket_path = socket_path or default_socket_path()
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.settimeout(timeout)
+        self._sock.connect(self.socket_path)
+        self._rfile = self._sock.makefile("rb")
+        self._next_id = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self._rfile.close()
+        self._sock.close()
+
+    def call(self, method, **params):
+        """Sends one request and returns its result, raising DaemonError on failure."""
+        self._next_id += 1
+        _send(self._sock, {'id': self._next_id, 'method': method, 'params': params})
+        line = self._rfile.readline()
+        if not line:
+            raise DaemonError(HID_UART_DEVICE_IO_FAILED, "daemon closed the connection")
+        response = json.loads(line)
+        error = response.get("error")
+        if error:
+            raise DaemonError(error.get("status", HID_UART_DEVICE_IO_FAILED), error.get("message"))
+        return response.get("result")
+
+    def info(self, device=None):
+        return self.call("info", device=device)
+
+    def read_latch(self, device=None, verify=False):
+        return self.call("read_latch", device=device, verify=verify)
+
+    def write_latch(self, latch, mask, device=None):
+        return self.call("write_latch", device=device, latch=latch, mask=mask)
+
+    def power_off(self, device=None):
+        return self.call("power_off", device=device)
+
+    def power_on(self, device=None):
+        return self.call("power_on", device=device)
+
+    def power_cycle(self, device=None, off_time=0.0):
+        return self.call("power_cycle", device=device, off_time=off_time)
+
+    def set_uart_config(self, device=None, **config):
+        return self.call("set_uart_config", device=device, **config)
+
+    def stream(self, device=None):
+        """Switches the connection to a raw UART pipe and returns the socket."""
+        self.call("stream", device=device)
+        return self._sock
+
+
+def _pipe_stdio(sock):
+    """Copies stdin to the socket and the socket to stdout until either closes."""
+    stdin = sys.stdin.buffer.raw if hasattr(sys.stdin.buffer, "raw") else sys.stdin.buffer
+    stdout = sys.stdout.buffer
+    sock.settimeout(None)
+    inputs = [sock, stdin]
+    while True:
+        ready, _, _ = select.select(inputs, [], [])
+        if sock in ready:
+            data = sock.recv(4096)
+            if not data:
+                return
+            stdout.write(data)
+            stdout.flush()
+        if stdin in ready:
+            data = os.read(stdin.fileno(), 4096)
+            if not data:
+                sock.shutdown(socket.SHUT_WR)
+                inputs.remove(stdin)
+            else:
+                sock.sendall(data)
+
+
+def _device_arg(value):
+    """--device: '#N' selects index N; anything else is a serial number."""
+    if value.startswith("#"):
+        try:
+            return int(value[1:])
+        except ValueError:
+            raise argparse.ArgumentTypeError("invalid index: {!r}".format(value))
+    return value
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="CP211x device daemon and client")
+    parser.add_argument("--socket", default=None, help="socket path (default: %s)" % default_socket_path())
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("serve", help="run the daemon in the foreground")
+    for name in ("ping", "list", "shutdown"):
+        sub.add_parser(name)
+    for name in ("info", "power-off", "power-on", "power-cycle", "latch", "write-latch",
+                 "uart-config", "close", "stream"):
+        p = sub.add_parser(name)
+        target = p.add_mutually_exclusive_group()
+        target.add_argument("--device", default=None, type=_device_arg,
+                            help="serial number, or #N for index N (default: index 0)")
+        target.add_argument("--index", dest="device", type=int, metavar="N", help="device index")
+        if name == "power-cycle":
+            p.add_argument("--off-time", type=float, default=0.0, help="seconds to stay off")
+        elif name == "latch":
+            p.add_argument("--verify", action="store_true", help="read the device, not the cache")
+        elif name == "write-latch":
+            p.add_argument("latch", type=lambda v: int(v, 0))
+            p.add_argument("mask", type=lambda v: int(v, 0))
+        elif name == "uart-config":
+            p.add_argument("--baud", type=int, default=None, help="set 8N1 at this baud rate")
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        daemon = DeviceDaemon(args.socket)
+        try:
+            daemon.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    try:
+        client = DaemonClient(args.socket)
+    except OSError as e:
+        print("Cannot connect to daemon: {}".format(e), file=sys.stderr)
+        return 2
+    with client:
+        try:
+            if args.command == "stream":
+                _pipe_stdio(client.stream(args.device))
+                return 0
+            if args.command == "uart-config":
+                if args.baud:
+                    result = client.set_uart_config(args.device, baud=args.baud)
+                else:
+                    result = client.call("get_uart_config", device=args.device)
+            elif args.command == "latch":
+                result = client.read_latch(args.device, args.verify)
+            elif args.command == "write-latch":
+                result = client.write_latch(args.latch, args.mask, args.device)
+            elif args.command == "power-cycle":
+                result = client.power_cycle(args.device, args.off_time)
+            elif args.command in ("ping", "list", "shutdown"):
+                result = client.call(args.command)
+            else:
+                result = client.call(args.command.replace("-", "_"), device=args.device)
+        except DaemonError as e:
+            print("Error: {}".format(e), file=sys.stderr)
+            return 1
+    if isinstance(result, int) and args.command in ("latch", "write-latch", "power-off",
+                                                    "power-on", "power-cycle"):
+        print("0x{:04X}".format(result))
+    else:
+        print(json.dumps(result, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
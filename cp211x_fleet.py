@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Parallel power control for racks of CP211x boards.
+
+A Fleet opens every CP211x device matching VID/PID (or a given list of
+serial numbers) and runs power operations on all or some of them in parallel
+on a thread pool. With barrier=True every worker waits at a common barrier
+and then spins until a shared start time, so all boards switch within a
+small, measured skew.
+
+    with Fleet() as fleet:
+        results = fleet.power_cycle(off_time=0.5, barrier=True)
+        print(summary_table(results))
+"""
+
+import concurrent.futures
+import threading
+import time
+
+from cp211x_HID_UART import (HID_UART, HID_UART_DEVICE_NOT_FOUND, DeviceIndex,
+                             HidUartDevice, HidUartError,
+                             POWER_PIN_MASK, POWER_ON_LATCH, POWER_OFF_LATCH)
+
+__all__ = ['Fleet', 'FleetResult', 'summary_table', 'switch_skew']
+
+
+class FleetResult(object):
+    """Outcome of one fleet operation on one device."""
+
+    __slots__ = ('serial', 'ok', 'latch', 'elapsed', 'switched_at', 'error')
+
+    def __init__(self, serial):
+        self.serial = serial
+        self.ok = False
+        self.latch = None           # latch readback after the operation
+        self.elapsed = None         # seconds spent on the device
+        self.switched_at = None     # perf_counter() right after the last WriteLatch
+        self.error = None
+
+    def __repr__(self):
+        return "FleetResult({!r}, ok={}, latch={}, elapsed={}, error={!r})".format(
+            self.serial, self.ok, self.latch, self.elapsed, self.error)
+
+
+class _StartGate(object):
+    """Reusable barrier whose workers all start at the same perf_counter() instant."""
+
+    def __init__(self, parties, lead, timeout):
+        self.lead = lead
+        self.start_at = 0.0
+        self._barrier = threading.Barrier(parties, self._set_start, timeout)
+
+    def _set_start(self):
+        self.start_at = time.perf_counter() + self.lead
+
+    def abort(self):
+        self._barrier.abort()
+
+    def wait(self):
+        self._barrier.wait()
+        start_at = self.start_at
+        while time.perf_counter() < start_at:
+            pass
+
+
+class Fleet(object):
+    """
+    Set of open CP211x devices keyed by serial number.
+
+    serials restricts the fleet to the given serial numbers; by default every
+    device matching vid/pid is opened.
+    """
+
+    def __init__(self, serials=None, vid=HID_UART.VID, pid=HID_UART.PID, max_workers=None):
+        self.vid = vid
+        self.pid = pid
+        self.wanted = list(serials) if serials is not None else None
+        self.max_workers = max_workers
+        self.devices = {}
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return len(self.devices)
+
+    def open(self):
+        """Enumerates and opens the fleet's devices; returns the list of serials."""
+        indexes = {}
+        for entry in DeviceIndex.shared(self.vid, self.pid):
+            if entry.serial is None:
+                continue
+            if self.wanted is None or entry.serial in self.wanted:
+                indexes[entry.serial] = entry.index
+        if self.wanted is not None:
+            missing = [s for s in self.wanted if s not in indexes]
+            if missing:
+                raise HidUartError(HID_UART_DEVICE_NOT_FOUND)
+        try:
+            for serial, index in indexes.items():
+                hu = HidUartDevice()
+                hu.Open(index, self.vid, self.pid)
+                self.devices[serial] = hu
+        except BaseException:
+            self.close()
+            raise
+        return list(self.devices)
+
+    def close(self):
+        for hu in self.devices.values():
+            hu.Close()
+        self.devices.clear()
+
+    # ------------------------------------------------------------------
+
+    def run(self, operation, serials=None, timeout=None, barrier=False,
+            barrier_lead=0.002, barrier_timeout=10.0):
+        """
+        Runs operation(hu, gate, result) on the selected devices in parallel.
+
+        gate is a start gate shared by all workers when barrier is set (None
+        otherwise); operations call gate.wait() right before each switching
+        WriteLatch. Devices that do not finish within timeout seconds are
+        reported with error 'timeout'; their workers may still be running but
+        no longer touch the returned results. Returns FleetResults in serial
+        order.
+        """
+        selected = sorted(self.devices if serials is None else serials)
+        results = [FleetResult(serial) for serial in selected]
+        if not selected:
+            return results
+        gate = _StartGate(len(selected), barrier_lead, barrier_timeout) if barrier else None
+
+        def worker(hu, result):
+            start = time.perf_counter()
+            try:
+                operation(hu, gate, result)
+                result.ok = True
+            except threading.BrokenBarrierError:
+                result.error = "barrier broken"
+            except Exception as e:
+                result.error = str(e)
+                if gate is not None:
+                    gate.abort()
+            finally:
+                result.elapsed = time.perf_counter() - start
+
+        workers = len(selected) if barrier else (self.max_workers or len(selected))
+        executor = concurrent.futures.ThreadPoolExecutor(workers, "fleet")
+        try:
+            futures = [executor.submit(worker, self.devices[serial], result)
+                       for serial, result in zip(selected, results)]
+            done, pending = concurrent.futures.wait(futures, timeout)
+            if pending and gate is not None:
+                gate.abort()
+            for i, future in enumerate(futures):
+                if future in pending:
+                    # The late worker keeps its own result object
+                    results[i] = FleetResult(selected[i])
+                    results[i].error = "timeout"
+        finally:
+            executor.shutdown(wait=False)
+        return results
+
+    @staticmethod
+    def _switch(hu, gate, result, latch, mask):
+        if gate is not None:
+            gate.wait()
+        hu.WriteLatch(latch, mask)
+        result.switched_at = time.perf_counter()
+
+    def write_latch(self, latch, mask, serials=None, **kwargs):
+        """Writes latch/mask on the selected devices and reads the latch back."""
+        def operation(hu, gate, result):
+            self._switch(hu, gate, result, latch, mask)
+            result.latch = hu.ReadLatch()
+        return self.run(operation, serials, **kwargs)
+
+    def power_off(self, serials=None, **kwargs):
+        return self.write_latch(POWER_OFF_LATCH, POWER_PIN_MASK, serials, **kwargs)
+
+    def power_on(self, serials=None, **kwargs):
+        return self.write_latch(POWER_ON_LATCH, POWER_PIN_MASK, serials, **kwargs)
+
+    def power_cycle(self, serials=None, off_time=0.0, **kwargs):
+        """Powers the selected devices off, holds for off_time seconds, then on."""
+        def operation(hu, gate, result):
+            self._switch(hu, gate, result, POWER_OFF_LATCH, POWER_PIN_MASK)
+            if off_time:
+                time.sleep(off_time)
+            self._switch(hu, gate, result, POWER_ON_LATCH, POWER_PIN_MASK)
+            result.latch = hu.ReadLatch()
+        return self.run(operation, serials, **kwargs)
+
+
+def switch_skew(results):
+    """Returns the spread in seconds between the first and last device switch."""
+    times = [r.switched_at for r in results if r.switched_at is not None]
+    return (max(times) - min(times)) if len(times) > 1 else 0.0
+
+
+def summary_table(results):
+    """Formats FleetResults as a plain-text table with latch readback and timing."""
+    lines = ["{:<20} {:<6} {:<8} {:>10} {:>10}".format(
+        "Serial", "Result", "Latch", "Time (ms)", "Skew (ms)")]
+    first = min([r.switched_at for r in results if r.switched_at is not None] or [0.0])
+    for r in results:
+        latch = "0x{:04X}".format(r.latch) if r.latch is not None else "-"
+        elapsed = "{:.2f}".format(r.elapsed * 1e3) if r.elapsed is not None else "-"
+        skew = "{:.3f}".format((r.switched_at - first) * 1e3) if r.switched_at is not None else "-"
+        lines.append("{:<20} {:<6} {:<8} {:>10} {:>10}".format(
+            r.serial, "OK" if r.ok else "FAIL", latch, elapsed, skew))
+        if r.error:
+            lines.append("    error: {}".format(r.error))
+    ok = sum(1 for r in results if r.ok)
+    lines.append("{}/{} OK, switch skew {:.3f} ms".format(ok, len(results), switch_skew(results) * 1e3))
+    return "\n".join(lines)
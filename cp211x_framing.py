@@ -0,0 +1,442 @@
+#!/usr/bin/env python3
+"""
+Incremental framing for CP211x UART streams.
+
+Decoders accumulate received bytes and split them into frames. Each one
+keeps a scan offset, so every byte is examined once no matter how the
+input is chunked. That keeps line splitting linear on chatty consoles.
+
+    LineDecoder / DelimiterDecoder   newline or any delimiter
+    SlipDecoder                      RFC 1055 SLIP
+    CobsDecoder                      COBS with 0x00 delimiter
+    LengthPrefixedDecoder            struct-formatted length header
+
+FramedReader puts them on top of a HidUartDevice (or an RxPump):
+
+    rx = FramedReader(hu)
+    banner = rx.readline(timeout=2.0)
+    prompt = rx.read_until(b"login: ", timeout=10.0)
+    for frame in rx.iter_frames(SlipDecoder()):
+        handle(frame)
+
+Malformed or oversized frames are dropped and counted in the decoder's
+errors counter.
+"""
+
+import collections
+import struct
+import time
+
+__all__ = ['FrameDecoder', 'DelimiterDecoder', 'LineDecoder', 'SlipDecoder',
+           'CobsDecoder', 'LengthPrefixedDecoder', 'FramedReader',
+           'slip_encode', 'cobs_encode', 'length_prefix_encode']
+
+DEFAULT_MAX_FRAME = 64 * 1024
+
+SLIP_ESC = 0xDB
+
+
+class FrameDecoder(object):
+    """
+    Base class: buffers fed data and returns complete frames from next_frame().
+
+    Subclasses implement _extract(), which moves every complete frame from
+    the buffer to the ready queue, scanning from the saved scan offset.
+    """
+
+    def __init__(self, max_frame=DEFAULT_MAX_FRAME):
+        self.max_frame = max_frame
+        self._buffer = bytearray()
+        self._scan = 0
+        self._ready = collections.deque()
+        self.frames = 0
+        self.errors = 0
+
+    def feed(self, data):
+        self._buffer += data
+
+    def pending(self):
+        """Returns the number of buffered bytes not yet part of a returned frame."""
+        return len(self._buffer)
+
+    def clear(self):
+        del self._buffer[:]
+        self._scan = 0
+
+    def take_buffer(self):
+        """Removes and returns the unconsumed bytes (to hand them to another decoder).
+
+        Frames that are complete but not yet returned are lost.
+        """
+        data = bytes(self._buffer)
+        self.clear()
+        self._ready.clear()
+        return data
+
+    def next_frame(self):
+        """Returns the next complete frame, or None when more data is needed."""
+        if not self._ready:
+            self._extract()
+            if not self._ready:
+                if len(self._buffer) > self.max_frame:
+                    self.errors += 1
+                    self.clear()
+                return None
+        return self._ready.popleft()
+
+    def __iter__(self):
+        """Yields all frames that are complete in the buffered data."""
+        frame = self.next_frame()
+        while frame is not None:
+            yield frame
+            frame = self.next_frame()
+
+    def decode(self, data):
+        """Feeds data and returns the list of frames it completed."""
+        self._buffer += data
+        self._extract()
+        frames = list(self._ready)
+        self._ready.clear()
+        if not frames and len(self._buffer) > self.max_frame:
+            self.errors += 1
+            self.clear()
+        return frames
+
+    def _check_frames(self, frames):
+        """Drops (and counts) oversized frames; returns the rest and counts them as frames."""
+        max_frame = self.max_frame
+        if frames and max(map(len, frames)) > max_frame:
+            count = len(frames)
+            frames = [frame for frame in frames if len(frame) <= max_frame]
+            self.errors += count - len(frames)
+        self.frames += len(frames)
+        return frames
+
+    def _add_frames(self, frames):
+        self._ready.extend(self._check_frames(frames))
+
+    def _extract(self):
+        raise NotImplementedError
+
+
+class DelimiterDecoder(FrameDecoder):
+    """Frames terminated by delimiter; include_delimiter keeps it on the frame."""
+
+    def __init__(self, delimiter=b"\n", include_delimiter=True, max_frame=DEFAULT_MAX_FRAME):
+        FrameDecoder.__init__(self, max_frame)
+        if not delimiter:
+            raise ValueError("empty delimiter")
+        self.delimiter = bytes(delimiter)
+        self.include_delimiter = include_delimiter
+        # Bytes at the end of the buffer a straddling delimiter may start in
+        self._overlap = len(self.delimiter) - 1
+        # Frames are returned as split, so decode() can cut single frames directly
+        self._plain = include_delimiter and self._decode_frame is None
+
+    # Per-frame hook: returns the decoded payload, or None to drop the frame
+    _decode_frame = None
+
+    def decode(self, data):
+        """Feeds data and returns the list of frames it completed."""
+        if self._ready:
+            return FrameDecoder.decode(self, data)
+        # Search the buffer, not data: data may be a memoryview, whose "in"
+        # compares integers, and a delimiter may straddle two chunks
+        buffer = self._buffer
+        buffer += data
+        last = buffer.rfind(self.delimiter, self._scan)
+        if last < 0:
+            size = len(buffer)
+            if size > self.max_frame:
+                self.errors += 1
+                self.clear()
+            elif size > self._overlap:
+                self._scan = size - self._overlap
+            return []
+        if self._plain and buffer.find(self.delimiter, self._scan) == last:
+            # A single plain frame, the usual case for small reads
+            end = last + self._overlap + 1
+            frame = bytes(buffer[:end])
+            del buffer[:end]
+            self._scan = 0
+            if len(frame) > self.max_frame:
+                self.errors += 1
+                return []
+            self.frames += 1
+            return [frame]
+        return self._take_frames(last)
+
+    def _extract(self):
+        buffer = self._buffer
+        last = buffer.rfind(self.delimiter, self._scan)
+        if last < 0:
+            # A delimiter may straddle the end of the buffer
+            self._scan = max(len(buffer) - self._overlap, 0)
+            return
+        self._ready.extend(self._take_frames(last))
+
+    def _take_frames(self, last):
+        """Removes every frame up to the delimiter at offset last and returns them, checked."""
+        buffer = self._buffer
+        delimiter = self.delimiter
+        end = last + len(delimiter)
+        if end == len(buffer):
+            block = bytes(buffer)
+            buffer.clear()
+        else:
+            block = bytes(buffer[:end])
+            del buffer[:end]
+        self._scan = 0
+        decode = self._decode_frame
+        if block.find(delimiter) == last:
+            # One frame: the usual case for small reads
+            frame = block if self.include_delimiter else block[:last]
+            if decode is not None:
+                frame = decode(frame)
+                if frame is None:
+                    return []
+            if len(frame) > self.max_frame:
+                self.errors += 1
+                return []
+            self.frames += 1
+            return [frame]
+        # Everything before the last delimiter is complete; split it in one pass
+        frames = block.split(delimiter)
+        frames.pop()
+        if self.include_delimiter:
+            frames = [frame + delimiter for frame in frames]
+        if decode is not None:
+            frames = [frame for frame in map(decode, frames) if frame is not None]
+        return self._check_frames(frames)
+
+
+class LineDecoder(DelimiterDecoder):
+    """Newline-terminated lines; strip=True removes the line ending (\\n or \\r\\n)."""
+
+    def __init__(self, include_newline=True, strip=False, max_frame=DEFAULT_MAX_FRAME):
+        DelimiterDecoder.__init__(self, b"\n", include_newline and not strip, max_frame)
+        if strip:
+            self._decode_frame = self._strip
+
+    @staticmethod
+    def _strip(frame):
+        return frame[:-1] if frame.endswith(b"\r") else frame
+
+
+class SlipDecoder(DelimiterDecoder):
+    """RFC 1055 SLIP frames delimited by 0xC0; empty frames are skipped."""
+
+    def __init__(self, max_frame=DEFAULT_MAX_FRAME):
+        DelimiterDecoder.__init__(self, b"\xc0", False, max_frame)
+
+    def _decode_frame(self, frame):
+        if not frame:
+            return None
+        if SLIP_ESC not in frame:
+            return frame
+        decoded = frame.replace(b"\xdb\xdc", b"\xc0").replace(b"\xdb\xdd", b"\xdb")
+        # Any ESC left over was not followed by a valid escape code
+        if decoded.count(SLIP_ESC) != frame.count(b"\xdb\xdd"):
+            self.errors += 1
+            return None
+        return decoded
+
+
+class CobsDecoder(DelimiterDecoder):
+    """Consistent Overhead Byte Stuffing frames delimited by 0x00."""
+
+    def __init__(self, max_frame=DEFAULT_MAX_FRAME):
+        DelimiterDecoder.__init__(self, b"\0", False, max_frame)
+
+    def _decode_frame(self, frame):
+        if not frame:
+            return None
+        end = len(frame)
+        code = frame[0]
+        if code == end:
+            return frame[1:]            # no zeros in the payload
+        out = bytearray()
+        pos = 0
+        while pos < end:
+            code = frame[pos]
+            block_end = pos + code
+            if code == 0 or block_end > end:
+                self.errors += 1
+                return None
+            out += frame[pos + 1:block_end]
+            pos = block_end
+            if code < 0xFF and pos < end:
+                out.append(0)
+        return bytes(out)
+
+
+class LengthPrefixedDecoder(FrameDecoder):
+    """
+    Binary frames preceded by a length field.
+
+    header is a struct format for the length (default big-endian 16 bit);
+    include_header means the length counts the header bytes too.
+    """
+
+    def __init__(self, header=">H", include_header=False, max_frame=DEFAULT_MAX_FRAME):
+        FrameDecoder.__init__(self, max_frame)
+        self._header = struct.Struct(header)
+        self.include_header = include_header
+
+    def _extract(self):
+        buffer = self._buffer
+        size = self._header.size
+        unpack_from = self._header.unpack_from
+        pos = 0
+        frames = []
+        while len(buffer) - pos >= size:
+            length, = unpack_from(buffer, pos)
+            if self.include_header:
+                length -= size
+            if length < 0 or length > self.max_frame:
+                # Unrecoverable without a delimiter: drop everything buffered
+                self.errors += 1
+                self.clear()
+                pos = 0
+                break
+            end = pos + size + length
+            if len(buffer) < end:
+                break
+            frames.append(bytes(buffer[pos + size:end]))
+            pos = end
+        if pos:
+            del buffer[:pos]
+        self._add_frames(frames)
+
+
+def slip_encode(payload):
+    """Returns payload as a SLIP frame (with leading and trailing END)."""
+    escaped = bytes(payload).replace(b"\xdb", b"\xdb\xdd").replace(b"\xc0", b"\xdb\xdc")
+    return b"\xc0" + escaped + b"\xc0"
+
+
+def cobs_encode(payload):
+    """Returns payload COBS-encoded and terminated with 0x00."""
+    out = bytearray()
+    for segment in bytes(payload).split(b"\0"):
+        while len(segment) >= 254:
+            out.append(0xFF)
+            out += segment[:254]
+            segment = segment[254:]
+        out.append(len(segment) + 1)
+        out += segment
+    out.append(0)
+    return bytes(out)
+
+
+def length_prefix_encode(payload, header=">H", include_header=False):
+    """Returns payload preceded by its length packed with header."""
+    fmt = struct.Struct(header)
+    length = len(payload) + (fmt.size if include_header else 0)
+    return fmt.pack(length) + bytes(payload)
+
+
+class FramedReader(object):
+    """
+    Frame-oriented reads on a HidUartDevice or RxPump.
+
+    Data is read in chunks of up to chunk_size bytes. With a bare
+    HidUartDevice each read waits up to the device read timeout for a full
+    chunk, so set a short read timeout (SetTimeouts) or read through an
+    RxPump for low latency. timeout arguments are in seconds; None waits
+    indefinitely.
+    """
+
+    def __init__(self, source, chunk_size=4096, max_frame=DEFAULT_MAX_FRAME):
+        self.source = source
+        self.max_frame = max_frame
+        self._chunk = bytearray(chunk_size)
+        self._chunk_view = memoryview(self._chunk)
+        self._buffer = bytearray()
+        self._scan = 0
+        self._scan_delimiter = None
+        if hasattr(source, "ReadInto"):
+            self._read_into = source.ReadInto
+        else:
+            self._read_into = source.readinto
+
+    def _fill(self, deadline):
+        """Reads one chunk into the buffer; returns False once deadline has passed."""
+        if deadline is not None and time.monotonic() >= deadline:
+            return False
+        count = self._read_into(self._chunk)
+        if count:
+            self._buffer += self._chunk_view[:count]
+        return True
+
+    def read_until(self, delimiter=b"\n", timeout=None, size=None):
+        """
+        Returns data up to and including delimiter.
+
+        Returns b"" on timeout (the partial data stays buffered). If size
+        bytes arrive without a delimiter, they are returned as they are.
+        """
+        limit = size or self.max_frame
+        if delimiter != self._scan_delimiter:
+            self._scan_delimiter = delimiter
+            self._scan = 0
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            buffer = self._buffer
+            index = buffer.find(delimiter, self._scan, limit + len(delimiter))
+            if index >= 0:
+                end = min(index + len(delimiter), limit)
+                break
+            if len(buffer) >= limit:
+                end = limit
+                break
+            self._scan = max(len(buffer) - len(delimiter) + 1, 0)
+            if not self._fill(deadline):
+                return b""
+        data = bytes(self._buffer[:end])
+        del self._buffer[:end]
+        self._scan = 0
+        return data
+
+    def readline(self, timeout=None, size=None):
+        return self.read_until(b"\n", timeout, size)
+
+    def read(self, size, timeout=None):
+        """Returns up to size bytes, waiting until size bytes are buffered or timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while len(self._buffer) < size and self._fill(deadline):
+            pass
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        self._scan = 0
+        return data
+
+    def iter_frames(self, decoder=None, timeout=None):
+        """
+        Yields frames decoded from the stream (newline frames by default).
+
+        With timeout, iteration ends when no frame completes within timeout
+        seconds. Bytes left in the decoder go back into the reader's buffer
+        when the iteration ends.
+        """
+        if decoder is None:
+            decoder = LineDecoder(max_frame=self.max_frame)
+        decoder.feed(self._buffer)
+        del self._buffer[:]
+        self._scan = 0
+        try:
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while True:
+                frame = decoder.next_frame()
+                if frame is not None:
+                    yield frame
+                    if timeout is not None:
+                        deadline = time.monotonic() + timeout
+                    continue
+                if deadline is not None and time.monotonic() >= deadline:
+                    return
+                count = self._read_into(self._chunk)
+                if count:
+                    decoder.feed(self._chunk_view[:count])
+        finally:
+            self._buffer[:0] = decoder.take_buffer()
@@ -0,0 +1,666 @@
+#!/usr/bin/env python3
+"""
+Pure-Python CP2110 backend speaking the HID report protocol on /dev/hidrawN.
+
+HidrawBackend implements the HidUart_* entry points used by HidUartDevice,
+so it can be selected per device at open time without going through the
+vendor libraries:
+
+    hu = HidUartDevice()
+    hu.Open(0, backend=HidrawBackend())
+
+UART data moves in interrupt reports whose report ID is the payload length
+(1-63). Everything else is a feature report (AN434):
+
+    0x40 Reset Device            0x46 Get Version Information
+    0x41 Get/Set UART Enable     0x50 Get/Set UART Config
+    0x42 Get UART Status         0x51 Set Transmit Line Break
+    0x43 Purge FIFOs             0x52 Set Stop Line Break
+    0x44 Get GPIO Values         0x45 Set GPIO Values
+
+Device I/O uses os.read/os.write with poll(). The feature reports carry the
+latch word exactly as the device reports it.
+
+For testing without hardware, Cp2110ReportEmulator serves the same report
+protocol over a pair of local sockets (see SocketTransport).
+"""
+
+import fcntl
+import glob
+import itertools
+import os
+import select
+import socket
+import struct
+import threading
+import time
+
+from cp211x_HID_UART import (
+    HID_UART, HidUartError, _deref, HID_UART_MAX_REPORT_PAYLOAD,
+    HID_UART_SUCCESS, HID_UART_DEVICE_NOT_FOUND, HID_UART_INVALID_HANDLE,
+    HID_UART_INVALID_PARAMETER, HID_UART_READ_TIMED_OUT, HID_UART_WRITE_TIMED_OUT,
+    HID_UART_DEVICE_IO_FAILED, HID_UART_DEVICE_ACCESS_ERROR)
+
+__all__ = ['HidrawBackend', 'HidrawTransport', 'SocketTransport', 'Cp2110ReportEmulator']
+
+# Feature report IDs (AN434)
+RESET_DEVICE = 0x40
+UART_ENABLE = 0x41
+UART_STATUS = 0x42
+PURGE_FIFOS = 0x43
+GET_GPIO_VALUES = 0x44
+SET_GPIO_VALUES = 0x45
+VERSION_INFO = 0x46
+UART_CONFIG = 0x50
+START_LINE_BREAK = 0x51
+STOP_LINE_BREAK = 0x52
+
+PURGE_TRANSMIT = 0x01
+PURGE_RECEIVE = 0x02
+
+# Payload sizes of the feature reports, excluding the report ID
+FEATURE_SIZES = {
+    UART_ENABLE: 1, UART_STATUS: 6, PURGE_FIFOS: 1, GET_GPIO_VALUES: 2,
+    SET_GPIO_VALUES: 4, VERSION_INFO: 2, UART_CONFIG: 8, START_LINE_BREAK: 1,
+    STOP_LINE_BREAK: 1, RESET_DEVICE: 1,
+}
+
+_UART_CONFIG = struct.Struct(">IBBBB")     # baud, parity, flow, data bits, stop bits
+_UART_STATUS = struct.Struct(">HHBB")      # TX FIFO, RX FIFO, error status, break status
+_LATCH = struct.Struct(">H")
+_LATCH_MASK = struct.Struct(">HH")
+
+REPORT_SIZE = HID_UART_MAX_REPORT_PAYLOAD + 1
+
+
+def _ioc(direction, kind, number, size):
+    return (direction << 30) | (size << 16) | (ord(kind) << 8) | number
+
+
+def HIDIOCSFEATURE(size):
+    return _ioc(3, 'H', 0x06, size)
+
+
+def HIDIOCGFEATURE(size):
+    return _ioc(3, 'H', 0x07, size)
+
+
+# ==============================================================================
+# Transports
+# ==============================================================================
+
+class HidrawTransport(object):
+    """Report I/O on a /dev/hidrawN node."""
+
+    def __init__(self, path):
+        self.path = path
+        try:
+            self._fd = os.open(path, os.O_RDWR | os.O_NONBLOCK | os.O_CLOEXEC)
+        except PermissionError:
+            raise HidUartError(HID_UART_DEVICE_ACCESS_ERROR)
+        except OSError:
+            raise HidUartError(HID_UART_DEVICE_NOT_FOUND)
+
+    def fileno(self):
+        return self._fd
+
+    def read_report(self, buffer):
+        """Reads one input report into buffer; returns its length (0 if none is pending)."""
+        try:
+            return os.readv(self._fd, [buffer])
+        except BlockingIOError:
+            return 0
+
+    def write_report(self, report):
+        try:
+            return os.write(self._fd, report)
+        except BlockingIOError:
+            return 0
+
+    def get_feature(self, report_id):
+        buf = bytearray(FEATURE_SIZES[report_id] + 1)
+        buf[0] = report_id
+        fcntl.ioctl(self._fd, HIDIOCGFEATURE(len(buf)), buf, True)
+        return bytes(buf[1:])
+
+    def set_feature(self, report):
+        fcntl.ioctl(self._fd, HIDIOCSFEATURE(len(report)), bytes(report))
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class SocketTransport(object):
+    """
+    Report I/O tunnelled over two SOCK_SEQPACKET sockets.
+
+    The data socket carries interrupt reports unchanged. The control socket
+    carries feature requests: b'G' + report ID for a get (answered with the
+    report payload) and b'S' + report for a set (answered with b'').
+    """
+
+    def __init__(self, data_sock, ctrl_sock):
+        self._data = data_sock
+        self._data.setblocking(False)
+        self._ctrl = ctrl_sock
+        self._ctrl_lock = threading.Lock()
+
+    def fileno(self):
+        return self._data.fileno()
+
+    def read_report(self, buffer):
+        try:
+            return self._data.recv_into(buffer)
+        except BlockingIOError:
+            return 0
+
+    def write_report(self, report):
+        try:
+            return self._data.send(report)
+        except BlockingIOError:
+            return 0
+
+    def get_feature(self, report_id):
+        with self._ctrl_lock:
+            self._ctrl.sendall(b"G" + bytes((report_id,)))
+            return self._ctrl.recv(REPORT_SIZE)
+
+    def set_feature(self, report):
+        with self._ctrl_lock:
+            self._ctrl.sendall(b"S" + bytes(report))
+            self._ctrl.recv(REPORT_SIZE)
+
+    def close(self):
+        self._data.close()
+        self._ctrl.close()
+
+
+# ==============================================================================
+# Backend
+# ==============================================================================
+
+def enumerate_hidraw(vid=HID_UART.VID, pid=HID_UART.PID):
+    """Returns descriptors (dicts) for hidraw nodes with matching VID/PID, in node order."""
+    devices = []
+    nodes = glob.glob("/sys/class/hidraw/hidraw*")
+    nodes.sort(key=lambda p: int(p.rsplit("hidraw", 1)[1]))
+    for node in nodes:
+        try:
+            with open(os.path.join(node, "device", "uevent")) as f:
+                uevent = dict(line.rstrip("\n").split("=", 1) for line in f if "=" in line)
+        except OSError:
+            continue
+        try:
+            bus, dev_vid, dev_pid = (int(x, 16) for x in uevent.get("HID_ID", "").split(":"))
+        except ValueError:
+            continue
+        if (vid and dev_vid != vid) or (pid and dev_pid != pid):
+            continue
+        usb_dev = os.path.realpath(os.path.join(node, "device", "..", ".."))
+
+        def attr(name, usb_dev=usb_dev):
+            try:
+                with open(os.path.join(usb_dev, name)) as f:
+                    return f.read().strip()
+            except OSError:
+                return ""
+
+        path = os.path.join("/dev", os.path.basename(node))
+        devices.append({
+            'path': path,
+            'vid': dev_vid,
+            'pid': dev_pid,
+            'release': int(attr("bcdDevice") or "0", 16),
+            'serial': uevent.get("HID_UNIQ", ""),
+            'manufacturer': attr("manufacturer"),
+            'product': attr("product"),
+            'open': (lambda path=path: HidrawTransport(path)),
+        })
+    return devices
+
+
+class _Handle(object):
+    """Per-open-device state of the hidraw backend."""
+
+    def __init__(self, transport, info):
+        self.transport = transport
+        self.info = info
+        self.read_timeout = 1000
+        self.write_timeout = 1000
+        self.pending = bytearray()      # payload of a partly consumed input report
+        self.report = bytearray(REPORT_SIZE)
+        self.out_report = bytearray(REPORT_SIZE)
+        self.cancel_r, self.cancel_w = os.pipe()
+        os.set_blocking(self.cancel_r, False)
+        self.poll_in = select.poll()
+        self.poll_in.register(transport.fileno(), select.POLLIN)
+        self.poll_in.register(self.cancel_r, select.POLLIN)
+        self.poll_out = select.poll()
+        self.poll_out.register(transport.fileno(), select.POLLOUT)
+        self.poll_out.register(self.cancel_r, select.POLLIN)
+
+    def cancelled(self):
+        try:
+            return bool(os.read(self.cancel_r, 64))
+        except BlockingIOError:
+            return False
+
+    def close(self):
+        self.transport.close()
+        os.close(self.cancel_r)
+        os.close(self.cancel_w)
+
+
+class HidrawBackend(object):
+    """
+    HidUart_* entry points implemented on the CP2110 HID report protocol.
+
+    enumerate is a callable(vid, pid) returning device descriptors (see
+    enumerate_hidraw); each descriptor's 'open' callable returns a transport.
+    Like the vendor library, HidUart_Read/HidUart_Write return their status and
+    the remaining entry points raise HidUartError on failure.
+    """
+
+    def __init__(self, enumerate=enumerate_hidraw, enable_uart=True):
+        self._enumerate = enumerate
+        self._enable_uart = enable_uart
+        self._devices = {}
+        self._handles = {}
+        self._next_handle = itertools.count(1)
+
+    # ------------------------------------------------------------------
+    # Helpers
+
+    def _device(self, index, vid, pid):
+        devices = self._devices.get((vid, pid))
+        if devices is None:
+            devices = self._devices[(vid, pid)] = self._enumerate(vid, pid)
+        if not 0 <= index < len(devices):
+            raise HidUartError(HID_UART_DEVICE_NOT_FOUND)
+        return devices[index]
+
+    def _handle(self, device):
+        handle = self._handles.get(getattr(device, 'value', device))
+        if handle is None:
+            raise HidUartError(HID_UART_INVALID_HANDLE)
+        return handle
+
+    @staticmethod
+    def _get_feature(handle, report_id):
+        try:
+            return handle.transport.get_feature(report_id)
+        except OSError:
+            raise HidUartError(HID_UART_DEVICE_IO_FAILED)
+
+    @staticmethod
+    def _set_feature(handle, report_id, payload):
+        try:
+            handle.transport.set_feature(bytes((report_id,)) + payload)
+        except OSError:
+            raise HidUartError(HID_UART_DEVICE_IO_FAILED)
+
+    @staticmethod
+    def _string(info, opt):
+        if opt == HID_UART.VID_STR:
+            return "{:04X}".format(info['vid'])
+        if opt == HID_UART.PID_STR:
+            return "{:04X}".format(info['pid'])
+        if opt == HID_UART.PATH_STR:
+            return info['path']
+        if opt == HID_UART.SERIAL_STR:
+            return info['serial']
+        if opt == HID_UART.MANUFACTURER_STR:
+            return info['manufacturer']
+        if opt == HID_UART.PRODUCT_STR:
+            return info['product']
+        raise HidUartError(HID_UART_INVALID_PARAMETER)
+
+    @staticmethod
+    def _copy_string(buf, value):
+        data = value.encode()[:511] + b"\0"
+        memoryview(buf).cast('B')[:len(data)] = data
+
+    # ------------------------------------------------------------------
+    # Enumeration
+
+    def HidUart_GetNumDevices(self, numDevices, vid, pid):
+        self._devices[(vid, pid)] = self._enumerate(vid, pid)
+        _deref(numDevices).value = len(self._devices[(vid, pid)])
+        return HID_UART_SUCCESS
+
+    def HidUart_GetAttributes(self, deviceNum, vid, pid, deviceVid, devicePid, deviceRelease):
+        info = self._device(deviceNum, vid, pid)
+        _deref(deviceVid).value = info['vid']
+        _deref(devicePid).value = info['pid']
+        _deref(deviceRelease).value = info['release']
+        return HID_UART_SUCCESS
+
+    def HidUart_GetString(self, deviceNum, vid, pid, deviceString, options):
+        self._copy_string(deviceString, self._string(self._device(deviceNum, vid, pid), options))
+        return HID_UART_SUCCESS
+
+    def HidUart_GetLibraryVersion(self, major, minor, release):
+        _deref(major).value, _deref(minor).value, _deref(release).value = 1, 0, 1
+        return HID_UART_SUCCESS
+
+    HidUart_GetHidLibraryVersion = HidUart_GetLibraryVersion
+
+    # ------------------------------------------------------------------
+    # Open / close
+
+    def HidUart_Open(self, device, deviceNum, vid, pid):
+        info = self._device(deviceNum, vid, pid)
+        handle = _Handle(info['open'](), info)
+        key = next(self._next_handle)
+        self._handles[key] = handle
+        _deref(device).value = key
+        if self._enable_uart:
+            self._set_feature(handle, UART_ENABLE, b"\x01")
+        return HID_UART_SUCCESS
+
+    def HidUart_Close(self, device):
+        handle = self._handle(device)
+        del self._handles[getattr(device, 'value', device)]
+        handle.close()
+        return HID_UART_SUCCESS
+
+    def HidUart_IsOpened(self, device, opened):
+        _deref(opened).value = int(getattr(device, 'value', device) in self._handles)
+        return HID_UART_SUCCESS
+
+    def HidUart_GetPartNumber(self, device, partNumber, version):
+        part, ver = self._get_feature(self._handle(device), VERSION_INFO)[:2]
+        _deref(partNumber).value = part
+        _deref(version).value = ver
+        return HID_UART_SUCCESS
+
+    def HidUart_GetOpenedAttributes(self, device, deviceVid, devicePid, deviceRelease):
+        info = self._handle(device).info
+        _deref(deviceVid).value = info['vid']
+        _deref(devicePid).value = info['pid']
+        _deref(deviceRelease).value = info['release']
+        return HID_UART_SUCCESS
+
+    def HidUart_GetOpenedString(self, device, deviceString, options):
+        self._copy_string(deviceString, self._string(self._handle(device).info, options))
+        return HID_UART_SUCCESS
+
+    # ------------------------------------------------------------------
+    # UART control
+
+    def HidUart_SetUartEnable(self, device, enable):
+        self._set_feature(self._handle(device), UART_ENABLE, b"\x01" if enable else b"\x00")
+        return HID_UART_SUCCESS
+
+    def HidUart_GetUartEnable(self, device, enable):
+        _deref(enable).value = self._get_feature(self._handle(device), UART_ENABLE)[0]
+        return HID_UART_SUCCESS
+
+    def HidUart_FlushBuffers(self, device, flushTransmit, flushReceive):
+        handle = self._handle(device)
+        flags = (PURGE_TRANSMIT if flushTransmit else 0) | (PURGE_RECEIVE if flushReceive else 0)
+        if flags:
+            self._set_feature(handle, PURGE_FIFOS, bytes((flags,)))
+        if flushReceive:
+            del handle.pending[:]
+            while handle.transport.read_report(handle.report):
+                pass
+        return HID_UART_SUCCESS
+
+    def HidUart_CancelIo(self, device):
+        os.write(self._handle(device).cancel_w, b"\x01")
+        return HID_UART_SUCCESS
+
+    def HidUart_SetTimeouts(self, device, readTimeout, writeTimeout):
+        handle = self._handle(device)
+        handle.read_timeout = readTimeout
+        handle.write_timeout = writeTimeout
+        return HID_UART_SUCCESS
+
+    def HidUart_GetTimeouts(self, device, readTimeout, writeTimeout):
+        handle = self._handle(device)
+        _deref(readTimeout).value = handle.read_timeout
+        _deref(writeTimeout).value = handle.write_timeout
+        return HID_UART_SUCCESS
+
+    def HidUart_SetUartConfig(self, device, baudRate, dataBits, parity, stopBits, flowControl):
+        payload = _UART_CONFIG.pack(baudRate, parity, flowControl, dataBits, stopBits)
+        self._set_feature(self._handle(device), UART_CONFIG, payload)
+        return HID_UART_SUCCESS
+
+    def HidUart_GetUartConfig(self, device, baudRate, dataBits, parity, stopBits, flowControl):
+        report = self._get_feature(self._handle(device), UART_CONFIG)
+        baud, par, flow, data, stop = _UART_CONFIG.unpack_from(report)
+        _deref(baudRate).value = baud
+        _deref(dataBits).value = data
+        _deref(parity).value = par
+        _deref(stopBits).value = stop
+        _deref(flowControl).value = flow
+        return HID_UART_SUCCESS
+
+    def HidUart_GetUartStatus(self, device, transmitFifoSize, receiveFifoSize,
+                              errorStatus, lineBreakStatus):
+        report = self._get_feature(self._handle(device), UART_STATUS)
+        tx, rx, err, lbr = _UART_STATUS.unpack_from(report)
+        _deref(transmitFifoSize).value = tx
+        _deref(receiveFifoSize).value = rx
+        _deref(errorStatus).value = err
+        _deref(lineBreakStatus).value = lbr
+        return HID_UART_SUCCESS
+
+    def HidUart_Reset(self, device):
+        self._set_feature(self._handle(device), RESET_DEVICE, b"\x00")
+        return HID_UART_SUCCESS
+
+    def HidUart_StartBreak(self, device, duration):
+        self._set_feature(self._handle(device), START_LINE_BREAK, bytes((duration,)))
+        return HID_UART_SUCCESS
+
+    def HidUart_StopBreak(self, device):
+        self._set_feature(self._handle(device), STOP_LINE_BREAK, b"\x00")
+        return HID_UART_SUCCESS
+
+    def HidUart_ReadLatch(self, device, latchValue):
+        report = self._get_feature(self._handle(device), GET_GPIO_VALUES)
+        _deref(latchValue).value = _LATCH.unpack_from(report)[0]
+        return HID_UART_SUCCESS
+
+    def HidUart_WriteLatch(self, device, latchValue, latchMask):
+        self._set_feature(self._handle(device), SET_GPIO_VALUES,
+                          _LATCH_MASK.pack(latchValue, latchMask))
+        return HID_UART_SUCCESS
+
+    # ------------------------------------------------------------------
+    # Data
+
+    def HidUart_Read(self, device, buffer, numBytesToRead, numBytesRead):
+        count = _deref(numBytesRead)
+        count.value = 0
+        try:
+            handle = self._handle(device)
+        except HidUartError as e:
+            return e.status
+        if not numBytesToRead:
+            return HID_UART_SUCCESS
+        out = memoryview(buffer).cast('B')
+        got = 0
+        if handle.pending:
+            got = min(len(handle.pending), numBytesToRead)
+            out[:got] = handle.pending[:got]
+            del handle.pending[:got]
+        deadline = time.monotonic() + handle.read_timeout / 1000.0
+        report = handle.report
+        transport = handle.transport
+        try:
+            while got < numBytesToRead:
+                length = transport.read_report(report)
+                if length:
+                    size = min(report[0], length - 1)
+                    take = min(size, numBytesToRead - got)
+                    out[got:got + take] = report[1:1 + take]
+                    got += take
+                    if take < size:
+                        handle.pending += report[1 + take:1 + size]
+                    continue
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                handle.poll_in.poll(remaining * 1000.0)
+                if handle.cancelled():
+                    break
+        except OSError:
+            count.value = got
+            return HID_UART_DEVICE_IO_FAILED
+        count.value = got
+        return HID_UART_SUCCESS if got == numBytesToRead else HID_UART_READ_TIMED_OUT
+
+    def HidUart_Write(self, device, buffer, numBytesToWrite, numBytesWritten):
+        count = _deref(numBytesWritten)
+        count.value = 0
+        try:
+            handle = self._handle(device)
+        except HidUartError as e:
+            return e.status
+        data = memoryview(buffer).cast('B')
+        report = handle.out_report
+        transport = handle.transport
+        deadline = time.monotonic() + handle.write_timeout / 1000.0
+        sent = 0
+        try:
+            while sent < numBytesToWrite:
+                size = min(HID_UART_MAX_REPORT_PAYLOAD, numBytesToWrite - sent)
+                report[0] = size
+                report[1:1 + size] = data[sent:sent + size]
+                if transport.write_report(memoryview(report)[:1 + size]):
+                    sent += size
+                    continue
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                handle.poll_out.poll(remaining * 1000.0)
+                if handle.cancelled():
+                    break
+        except OSError:
+            count.value = sent
+            return HID_UART_DEVICE_IO_FAILED
+        count.value = sent
+        return HID_UART_SUCCESS if sent == numBytesToWrite else HID_UART_WRITE_TIMED_OUT
+
+
+# ==============================================================================
+# Report protocol emulator
+# ==============================================================================
+
+class Cp2110ReportEmulator(object):
+    """
+    Local stand-in for a CP2110 speaking the report protocol over sockets.
+
+    Transmitted UART data is looped back to the receive side. UART enable,
+    configuration, latch, purge, break and version reports are modelled.
+
+        emu = Cp2110ReportEmulator(serial="EMU0")
+        backend = HidrawBackend(enumerate=emu.enumerate)
+        hu.Open(0, backend=backend)
+    """
+
+    def __init__(self, serial="EMU0001", vid=HID_UART.VID, pid=HID_UART.PID,
+                 release=0x0100, loopback=True):
+        self.serial = serial
+        self.vid = vid
+        self.pid = pid
+        self.release = release
+        self.loopback = loopback
+        self.enabled = 0
+        self.config = (115200, 0, 0, 3, 0)     # baud, parity, flow, data bits, stop bits
+        self.latch = 0xFFFF
+        self.in_break = 0
+        self.resets = 0
+        self._threads = []
+
+    def descriptor(self):
+        return {
+            'path': "emulator:" + self.serial,
+            'vid': self.vid,
+            'pid': self.pid,
+            'release': self.release,
+            'serial': self.serial,
+            'manufacturer': "Silicon Labs",
+            'product': "CP2110 HID USB-to-UART Bridge (emulated)",
+            'open': self.connect,
+        }
+
+    def enumerate(self, vid, pid):
+        if (vid and vid != self.vid) or (pid and pid != self.pid):
+            return []
+        return [self.descriptor()]
+
+    def connect(self):
+        """Returns a SocketTransport wired to a fresh emulator session."""
+        data_host, data_dev = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        ctrl_host, ctrl_dev = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        for target, sock in ((self._serve_data, data_dev), (self._serve_ctrl, ctrl_dev)):
+            thread = threading.Thread(target=target, args=(sock,), daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return SocketTransport(data_host, ctrl_host)
+
+    def _serve_data(self, sock):
+        with sock:
+            while True:
+                try:
+                    report = sock.recv(REPORT_SIZE)
+                except OSError:
+                    return
+                if not report:
+                    return
+                if self.enabled and self.loopback and report[0] <= HID_UART_MAX_REPORT_PAYLOAD:
+                    try:
+                        sock.send(report[:1 + report[0]])
+                    except OSError:
+                        return
+
+    def _serve_ctrl(self, sock):
+        with sock:
+            while True:
+                try:
+                    request = sock.recv(REPORT_SIZE + 1)
+                except OSError:
+                    return
+                if not request:
+                    return
+                if request[:1] == b"G":
+                    reply = self._get_feature(request[1])
+                else:
+                    self._set_feature(request[1], request[2:])
+                    reply = b""
+                sock.send(reply or b"\0")
+
+    def _get_feature(self, report_id):
+        if report_id == UART_ENABLE:
+            return bytes((self.enabled,))
+        if report_id == UART_STATUS:
+            return _UART_STATUS.pack(0, 0, 0, self.in_break)
+        if report_id == GET_GPIO_VALUES:
+            return _LATCH.pack(self.latch)
+        if report_id == VERSION_INFO:
+            return b"\x0a\x01"
+        if report_id == UART_CONFIG:
+            return _UART_CONFIG.pack(*self.config)
+        return bytes(FEATURE_SIZES.get(report_id, 1))
+
+    def _set_feature(self, report_id, payload):
+        if report_id == UART_ENABLE:
+            self.enabled = payload[0]
+        elif report_id == UART_CONFIG:
+            self.config = _UART_CONFIG.unpack_from(payload)
+        elif report_id == SET_GPIO_VALUES:
+            latch, mask = _LATCH_MASK.unpack_from(payload)
+            self.latch = (self.latch & ~mask) | (latch & mask)
+        elif report_id == START_LINE_BREAK:
+            self.in_break = 1
+        elif report_id == STOP_LINE_BREAK:
+            self.in_break = 0
+        elif report_id == RESET_DEVICE:
+            self.resets += 1
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Opt-in call instrumentation for the SLABHIDtoUART entry points.
+
+enable() wraps the loaded library (or an installed stand-in) so every
+HidUart_* call records its count, status codes, bytes moved (Read/Write)
+and a log2-bucketed latency histogram, per function and per device.
+Nothing is wrapped until enable() is called, so the disabled cost is zero:
+device methods call the library functions directly.
+
+    metrics = cp211x_metrics.enable()
+    hu = HidUartDevice()
+    hu.Open(0)
+    ...
+    print(metrics.to_json())
+    metrics.write_prometheus("/var/lib/node_exporter/cp211x.prom")
+
+Devices opened with Open(backend=...) keep their own library; wrap them
+with instrument(hu).
+"""
+
+import ctypes as ct
+import json
+import os
+import threading
+import time
+
+import cp211x_HID_UART
+from cp211x_HID_UART import (HID_UART, HID_UART_STATUS_DESC, HID_UART_SUCCESS,
+                             HidUartError, SetLibrary, _deref)
+
+__all__ = ['Metrics', 'InstrumentedLibrary', 'enable', 'disable', 'instrument', 'get_metrics']
+
+# Bucket k counts calls faster than 2**(k + 10) ns (~1 us, 2 us, ... ~17 s);
+# the last bucket is +Inf.
+BUCKET_COUNT = 26
+_BUCKET_SHIFT = 10
+
+# Entry points that take no device handle
+_UNBOUND_FUNCTIONS = frozenset([
+    "HidUart_GetNumDevices", "HidUart_GetAttributes", "HidUart_GetString",
+    "HidUart_GetLibraryVersion", "HidUart_GetHidLibraryVersion", "HidUart_Open"])
+
+_NO_DEVICE = "-"
+
+
+def status_name(status):
+    return HID_UART_STATUS_DESC.get(status, "0x{:02X}".format(status))
+
+
+def bucket_bounds():
+    """Returns the upper bounds (seconds) of the finite histogram buckets."""
+    return [(1 << (k + _BUCKET_SHIFT)) / 1e9 for k in range(BUCKET_COUNT - 1)]
+
+
+class CallStats(object):
+    """Counters for one (function, device) pair."""
+
+    __slots__ = ('calls', 'statuses', 'bytes', 'total_ns', 'max_ns', 'buckets')
+
+    def __init__(self):
+        self.calls = 0
+        self.statuses = {}
+        self.bytes = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.buckets = [0] * BUCKET_COUNT
+
+    def merge(self, other):
+        self.calls += other.calls
+        for status, count in other.statuses.items():
+            self.statuses[status] = self.statuses.get(status, 0) + count
+        self.bytes += other.bytes
+        self.total_ns += other.total_ns
+        self.max_ns = max(self.max_ns, other.max_ns)
+        self.buckets = [a + b for a, b in zip(self.buckets, other.buckets)]
+
+    def to_dict(self):
+        return {
+            'calls': self.calls,
+            'statuses': {status_name(s): n for s, n in sorted(self.statuses.items())},
+            'bytes': self.bytes,
+            'total_seconds': self.total_ns / 1e9,
+            'mean_us': self.total_ns / self.calls / 1e3 if self.calls else 0.0,
+            'max_us': self.max_ns / 1e3,
+            'buckets': list(self.buckets),
+        }
+
+
+class Metrics(object):
+    """Thread-safe store of CallStats keyed by function and device label."""
+
+    def __init__(self):
+        self._stats = {}
+        self._lock = threading.Lock()
+        self.started = time.time()
+
+    def record(self, function, device, status, ns, nbytes=0):
+        bucket = (ns >> _BUCKET_SHIFT).bit_length()
+        if bucket >= BUCKET_COUNT:
+            bucket = BUCKET_COUNT - 1
+        with self._lock:
+            stats = self._stats.get((function, device))
+            if stats is None:
+                stats = self._stats[(function, device)] = CallStats()
+            stats.calls += 1
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+            stats.bytes += nbytes
+            stats.total_ns += ns
+            if ns > stats.max_ns:
+                stats.max_ns = ns
+            stats.buckets[bucket] += 1
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self.started = time.time()
+
+    def _copy(self):
+        with self._lock:
+            copy = {}
+            for key, stats in self._stats.items():
+                clone = CallStats()
+                clone.merge(stats)
+                copy[key] = clone
+            return copy
+
+    def by_function(self):
+        """Returns {function: CallStats} aggregated over all devices."""
+        totals = {}
+        for (function, device), stats in self._copy().items():
+            totals.setdefault(function, CallStats()).merge(stats)
+        return totals
+
+    def to_dict(self):
+        stats = self._copy()
+        devices = {}
+        for (function, device), s in sorted(stats.items()):
+            devices.setdefault(device, {})[function] = s.to_dict()
+        return {
+            'started': self.started,
+            'bucket_bounds_seconds': bucket_bounds(),
+            'functions': {f: s.to_dict() for f, s in sorted(self.by_function().items())},
+            'devices': devices,
+        }
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.to_dict(), **kwargs)
+
+    def to_prometheus(self, prefix="cp211x"):
+        """Returns the metrics in the Prometheus text exposition format."""
+        stats = sorted(self._copy().items())
+        bounds = bucket_bounds()
+        lines = [
+            "# HELP {}_calls_total Library calls by function, device and status.".format(prefix),
+            "# TYPE {}_calls_total counter".format(prefix),
+        ]
+        for (function, device), s in stats:
+            for status, count in sorted(s.statuses.items()):
+                lines.append('{}_calls_total{{function="{}",device="{}",status="{}"}} {}'.format(
+                    prefix, function, device, status_name(status), count))
+        lines += [
+            "# HELP {}_bytes_total Bytes moved by HidUart_Read/HidUart_Write.".format(prefix),
+            "# TYPE {}_bytes_total counter".format(prefix),
+        ]
+        for (function, device), s in stats:
+            if s.bytes:
+                lines.append('{}_bytes_total{{function="{}",device="{}"}} {}'.format(
+                    prefix, function, device, s.bytes))
+        lines += [
+            "# HELP {}_call_duration_seconds Library call latency.".format(prefix),
+            "# TYPE {}_call_duration_seconds histogram".format(prefix),
+        ]
+        for (function, device), s in stats:
+            labels = 'function="{}",device="{}"'.format(function, device)
+            cumulative = 0
+            for bound, count in zip(bounds, s.buckets):
+                cumulative += count
+                lines.append('{}_call_duration_seconds_bucket{{{},le="{:.9g}"}} {}'.format(
+                    prefix, labels, bound, cumulative))
+            lines.append('{}_call_duration_seconds_bucket{{{},le="+Inf"}} {}'.format(
+                prefix, labels, s.calls))
+            lines.append('{}_call_duration_seconds_sum{{{}}} {:.9f}'.format(
+                prefix, labels, s.total_ns / 1e9))
+            lines.append('{}_call_duration_seconds_count{{{}}} {}'.format(
+                prefix, labels, s.calls))
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path, prefix="cp211x"):
+        """Writes a node_exporter textfile atomically (write to a temp file, then rename)."""
+        tmp = "{}.{}.tmp".format(path, os.getpid())
+        with open(tmp, "w") as f:
+            f.write(self.to_prometheus(prefix))
+        os.replace(tmp, path)
+
+
+class InstrumentedLibrary(object):
+    """
+    Library proxy whose HidUart_* functions record into a Metrics instance.
+
+    Devices are labelled by serial number, looked up once when HidUart_Open
+    returns a handle; calls without a handle are recorded under "-".
+    """
+
+    def __init__(self, lib, metrics):
+        self.library = lib
+        self.metrics = metrics
+        self._labels = {}
+
+    def __getattr__(self, name):
+        if not name.startswith("HidUart_"):
+            raise AttributeError(name)
+        wrapper = self._wrap(name, getattr(self.library, name))
+        setattr(self, name, wrapper)
+        return wrapper
+
+    def _label(self, device):
+        handle = getattr(device, 'value', device)
+        label = self._labels.get(handle)
+        if label is None:
+            label = "0x{:X}".format(handle or 0)
+        return label
+
+    def _learn_label(self, device_ref):
+        handle = _deref(device_ref).value
+        label = "0x{:X}".format(handle or 0)
+        try:
+            buf = ct.create_string_buffer(512)
+            self.library.HidUart_GetOpenedString(_deref(device_ref), buf, HID_UART.SERIAL_STR)
+            label = buf.value.decode() or label
+        except (HidUartError, AttributeError):
+            pass
+        self._labels[handle] = label
+
+    def _wrap(self, name, fn):
+        record = self.metrics.record
+        perf_counter_ns = time.perf_counter_ns
+
+        if name in ("HidUart_Read", "HidUart_Write"):
+            label = self._label
+
+            def transfer(device, buffer, size, count):
+                start = perf_counter_ns()
+                status = fn(device, buffer, size, count)
+                record(name, label(device), status, perf_counter_ns() - start, _deref(count).value)
+                return status
+            return transfer
+
+        if name in _UNBOUND_FUNCTIONS:
+            learn = self._learn_label if name == "HidUart_Open" else None
+
+            def unbound(*args):
+                start = perf_counter_ns()
+                try:
+                    result = fn(*args)
+                except HidUartError as e:
+                    record(name, _NO_DEVICE, e.status, perf_counter_ns() - start)
+                    raise
+                record(name, _NO_DEVICE, HID_UART_SUCCESS, perf_counter_ns() - start)
+                if learn is not None:
+                    learn(args[0])
+                return result
+            return unbound
+
+        label = self._label
+
+        def bound(device, *args):
+            start = perf_counter_ns()
+            try:
+                result = fn(device, *args)
+            except HidUartError as e:
+                record(name, label(device), e.status, perf_counter_ns() - start)
+                raise
+            record(name, label(device), HID_UART_SUCCESS, perf_counter_ns() - start)
+            return result
+        return bound
+
+
+_metrics = None
+
+
+def get_metrics():
+    """Returns the Metrics installed by enable(), or None."""
+    return _metrics
+
+
+def enable(metrics=None):
+    """
+    Instruments the process-wide library and returns the Metrics it records into.
+
+    Loads the vendor libraries if nothing is installed yet. Devices opened
+    before enable() keep calling the uninstrumented library.
+    """
+    global _metrics
+    lib = cp211x_HID_UART._library()
+    if isinstance(lib, InstrumentedLibrary):
+        if metrics is None or metrics is lib.metrics:
+            return lib.metrics
+        lib = lib.library
+    _metrics = metrics or _metrics or Metrics()
+    SetLibrary(InstrumentedLibrary(lib, _metrics))
+    return _metrics
+
+
+def disable():
+    """Restores the uninstrumented library for devices opened from now on."""
+    lib = cp211x_HID_UART._DLL
+    if isinstance(lib, InstrumentedLibrary):
+        SetLibrary(lib.library)
+
+
+def instrument(device, metrics=None):
+    """Instruments one open HidUartDevice (e.g. one using a custom backend)."""
+    global _metrics
+    if metrics is None:
+        metrics = _metrics = _metrics or Metrics()
+    if not isinstance(device._dll, InstrumentedLibrary):
+        device._bind_library(InstrumentedLibrary(device._dll, metrics))
+        handle = device.handle.value
+        if handle:
+            device._dll._learn_label(ct.byref(device.handle))
+    return metrics
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Pool of open CP211x handles keyed by serial number.
+
+Tools lease a handle instead of opening and closing their own. A lease is
+exclusive: other threads asking for the same serial wait until it is
+returned. Before a pooled handle is handed out again it is checked with
+HidUart_IsOpened; a handle closed by Reset() or lost to a USB error is
+reopened transparently. Handles idle for longer than max_idle seconds are
+closed.
+
+    pool = DevicePool.shared()
+    with pool.lease("0001A2B3") as hu:
+        PowerCycle(hu, off_time=0.5)
+    print(pool.stats())
+"""
+
+import contextlib
+import threading
+import time
+
+from cp211x_HID_UART import (HID_UART, HID_UART_DEVICE_NOT_FOUND, HID_UART_DEVICE_ACCESS_ERROR,
+                             STALE_HANDLE_STATUSES, DeviceIndex, HidUartDevice, HidUartError,
+                             close_quietly)
+
+__all__ = ['DevicePool', 'PoolStats']
+
+DEFAULT_MAX_IDLE = 30.0
+
+
+class PoolStats(object):
+    """
+    Pool counters.
+
+    hits      - leases served by a pooled handle that passed the health check
+    misses    - leases that had to open a device not in the pool
+    reopens   - pooled handles found closed (Reset, unplug) and opened again
+    evictions - handles closed for idling longer than max_idle
+    discards  - handles closed after a lease ended with an I/O or handle error
+    waits     - leases that had to wait for another holder of the same serial
+    """
+
+    __slots__ = ('hits', 'misses', 'reopens', 'evictions', 'discards', 'waits')
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.reopens = 0
+        self.evictions = 0
+        self.discards = 0
+        self.waits = 0
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        return "PoolStats({})".format(", ".join(
+            "{}={}".format(name, getattr(self, name)) for name in self.__slots__))
+
+
+class _Entry(object):
+    __slots__ = ('device', 'lock', 'last_used')
+
+    def __init__(self):
+        self.device = None
+        self.lock = threading.Lock()
+        self.last_used = 0.0
+
+
+class DevicePool(object):
+    """
+    Leases open HidUartDevice handles by serial number.
+
+    max_idle is the time in seconds after which an unused handle is closed
+    (None keeps handles open until close()). backend is passed to
+    HidUartDevice.Open for every handle the pool opens.
+    """
+
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, vid=HID_UART.VID, pid=HID_UART.PID, max_idle=DEFAULT_MAX_IDLE,
+                 backend=None):
+        self.vid = vid
+        self.pid = pid
+        self.max_idle = max_idle
+        self.backend = backend
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._stats = PoolStats()
+        # Serial chosen for lease(None); a pooled open device no longer
+        # reports its serial when enumerated, so the choice is kept
+        self._default_serial = None
+
+    @classmethod
+    def shared(cls, vid=HID_UART.VID, pid=HID_UART.PID):
+        """Returns the process-wide DevicePool for vid/pid."""
+        with cls._shared_lock:
+            pool = cls._shared.get((vid, pid))
+            if pool is None:
+                pool = cls._shared[(vid, pid)] = cls(vid, pid)
+            return pool
+
+    def _first_serial(self):
+        index = DeviceIndex(self.vid, self.pid, library=self.backend) if self.backend \
+            else DeviceIndex.shared(self.vid, self.pid)
+        for entry in index:
+            if entry.serial:
+                return entry.serial
+        raise HidUartError(HID_UART_DEVICE_NOT_FOUND)
+
+    def _default(self):
+        with self._lock:
+            if self._default_serial is None:
+                self._default_serial = self._first_serial()
+            return self._default_serial
+
+    def _open(self, serial):
+        hu = HidUartDevice()
+        try:
+            hu.Open(vid=self.vid, pid=self.pid, serial=serial, backend=self.backend)
+        except HidUartError as e:
+            if e.status == HID_UART_DEVICE_NOT_FOUND and serial == self._default_serial:
+                self._default_serial = None         # gone: choose again next time
+            raise
+        return hu
+
+    @staticmethod
+    def _healthy(hu):
+        if not hu.handle.value:
+            return False                # closed by Reset() or a discarded lease
+        try:
+            return hu.IsOpened()
+        except HidUartError:
+            return False
+
+    @contextlib.contextmanager
+    def lease(self, serial=None, timeout=None):
+        """
+        Context manager yielding an open HidUartDevice for serial.
+
+        serial None leases the first enumerated device, and keeps leasing
+        that one while it is present. Waits up to timeout
+        seconds (None: forever) while another thread holds the same serial,
+        then raises HidUartError(HID_UART_DEVICE_ACCESS_ERROR).
+        """
+        if serial is None:
+            serial = self._default()
+        self.prune()
+        with self._lock:
+            entry = self._entries.get(serial)
+            if entry is None:
+                entry = self._entries[serial] = _Entry()
+        if not entry.lock.acquire(blocking=False):
+            self._stats.waits += 1
+            if not entry.lock.acquire(timeout=-1 if timeout is None else timeout):
+                raise HidUartError(HID_UART_DEVICE_ACCESS_ERROR)
+        try:
+            hu = entry.device
+            if hu is None:
+                self._stats.misses += 1
+                hu = entry.device = self._open(serial)
+            elif self._healthy(hu):
+                self._stats.hits += 1
+            else:
+                self._stats.reopens += 1
+                close_quietly(hu)
+                entry.device = None
+                hu = entry.device = self._open(serial)
+            try:
+                yield hu
+            except HidUartError as e:
+                if e.status in STALE_HANDLE_STATUSES:
+                    self._stats.discards += 1
+                    close_quietly(hu)
+                    entry.device = None
+                raise
+        finally:
+            entry.last_used = time.monotonic()
+            entry.lock.release()
+
+    def prune(self):
+        """Closes handles idle for longer than max_idle; returns how many were closed."""
+        if self.max_idle is None:
+            return 0
+        limit = time.monotonic() - self.max_idle
+        closed = 0
+        with self._lock:
+            entries = [e for e in self._entries.values()
+                       if e.device is not None and e.last_used < limit]
+        for entry in entries:
+            if entry.lock.acquire(blocking=False):
+                try:
+                    if entry.device is not None and entry.last_used < limit:
+                        close_quietly(entry.device)
+                        entry.device = None
+                        self._stats.evictions += 1
+                        closed += 1
+                finally:
+                    entry.lock.release()
+        return closed
+
+    def open_serials(self):
+        """Returns the serial numbers that currently have an open pooled handle."""
+        with self._lock:
+            return sorted(s for s, e in self._entries.items() if e.device is not None)
+
+    def stats(self):
+        """Returns a copy of the pool counters."""
+        copy = PoolStats()
+        for name in PoolStats.__slots__:
+            setattr(copy, name, getattr(self._stats, name))
+        return copy
+
+    def reset_stats(self):
+        self._stats = PoolStats()
+
+    def close(self):
+        """Closes every pooled handle (waiting for outstanding leases)."""
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+        for entry in entries:
+            with entry.lock:
+                if entry.device is not None:
+                    close_quietly(entry.device)
+                    entry.device = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
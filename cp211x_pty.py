@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""
+Pseudo-terminal bridge for CP211x devices.
+
+A PtyBridge creates a pty and pumps data between it and a HidUartDevice
+on two threads (device RX -> pty, pty -> device TX), each with a
+preallocated buffer. Standard serial tools then open the pty like any
+tty:
+
+    python3 cp211x_pty.py --serial 0001A2B3 --link /tmp/ttyCP2110 &
+    picocom -b 115200 /tmp/ttyCP2110
+
+Baud rate, stop bits and RTS/CTS set on the pty (tcsetattr, stty, the
+tool's own settings) are polled every poll_interval seconds and applied
+with SetUartConfig. Linux ptys force CS8 and clear PARENB, so data bits
+and parity cannot be set through the pty; they keep the device's setting
+(--data/--parity on the CLI). Nor do ptys report tcsendbreak() to the
+master side, so a break has to be requested with PtyBridge.send_break()
+(or SIGUSR1 to the CLI), which maps to StartBreak/StopBreak.
+"""
+
+import argparse
+import errno
+import fcntl
+import os
+import pty
+import select
+import signal
+import sys
+import termios
+import threading
+import time
+import tty
+
+from cp211x_HID_UART import HID_UART, IO_MODE_AUTO, HidUartDevice, HidUartError
+
+__all__ = ['PtyBridge', 'termios_to_uart_config', 'uart_config_to_termios']
+
+# termios speed constants (B9600, ...) <-> baud rates
+_SPEEDS = {getattr(termios, name): int(name[1:]) for name in dir(termios)
+           if name.startswith("B") and name[1:].isdigit()}
+_SPEED_CONSTANTS = {baud: const for const, baud in _SPEEDS.items()}
+
+_CMSPAR = getattr(termios, "CMSPAR", 0o10000000000)   # Linux value; not exported by Python
+_DATA_BITS = {termios.CS5: HID_UART.FIVE_DATA_BITS, termios.CS6: HID_UART.SIX_DATA_BITS,
+              termios.CS7: HID_UART.SEVEN_DATA_BITS, termios.CS8: HID_UART.EIGHT_DATA_BITS}
+_CSIZE = {bits: cs for cs, bits in _DATA_BITS.items()}
+
+_PARITIES = {"none": HID_UART.NO_PARITY, "odd": HID_UART.ODD_PARITY, "even": HID_UART.EVEN_PARITY,
+             "mark": HID_UART.MARK_PARITY, "space": HID_UART.SPACE_PARITY}
+
+# Maximum StartBreak duration in ms; longer breaks are timed here
+_MAX_BREAK_MS = 255
+
+
+def termios_to_uart_config(attrs):
+    """Returns the SetUartConfig arguments (baud, data, parity, stop, flow) for tcgetattr() attrs.
+
+    baud is None for B0 (hang up) or a speed the termios module does not name.
+    """
+    cflag = attrs[2]
+    baud = _SPEEDS.get(attrs[5]) or None
+    data = _DATA_BITS[cflag & termios.CSIZE]
+    if not cflag & termios.PARENB:
+        parity = HID_UART.NO_PARITY
+    elif cflag & _CMSPAR:
+        parity = HID_UART.MARK_PARITY if cflag & termios.PARODD else HID_UART.SPACE_PARITY
+    else:
+        parity = HID_UART.ODD_PARITY if cflag & termios.PARODD else HID_UART.EVEN_PARITY
+    stop = HID_UART.LONG_STOP_BIT if cflag & termios.CSTOPB else HID_UART.SHORT_STOP_BIT
+    flow = HID_UART.RTS_CTS_FLOW_CONTROL if cflag & termios.CRTSCTS else HID_UART.NO_FLOW_CONTROL
+    return (baud, data, parity, stop, flow)
+
+
+def uart_config_to_termios(attrs, config):
+    """Returns a copy of tcgetattr() attrs with the cflag and speeds of a GetUartConfig tuple."""
+    baud, data, parity, stop, flow = config
+    attrs = list(attrs)
+    cflag = attrs[2] & ~(termios.CSIZE | termios.PARENB | termios.PARODD | _CMSPAR |
+                         termios.CSTOPB | termios.CRTSCTS)
+    cflag |= _CSIZE.get(data, termios.CS8)
+    if parity != HID_UART.NO_PARITY:
+        cflag |= termios.PARENB
+        if parity in (HID_UART.ODD_PARITY, HID_UART.MARK_PARITY):
+            cflag |= termios.PARODD
+        if parity in (HID_UART.MARK_PARITY, HID_UART.SPACE_PARITY):
+            cflag |= _CMSPAR
+    if stop == HID_UART.LONG_STOP_BIT:
+        cflag |= termios.CSTOPB
+    if flow == HID_UART.RTS_CTS_FLOW_CONTROL:
+        cflag |= termios.CRTSCTS
+    attrs[2] = cflag
+    speed = _SPEED_CONSTANTS.get(baud)
+    if speed is not None:
+        attrs[4] = attrs[5] = speed
+    return attrs
+
+
+class PtyBridge(object):
+    """
+    Bridges a pty to an open HidUartDevice.
+
+    slave_name is the tty path for serial tools; link optionally creates a
+    symlink to it. The pty starts in raw mode with the device's current UART
+    configuration. io_mode is passed to SetIoMode for the RX thread (None
+    keeps the device's timeouts). The bridge keeps the slave side open
+    itself, so tools can close and reopen the pty freely.
+    """
+
+    def __init__(self, device, link=None, poll_interval=0.1, chunk_size=4096,
+                 io_mode=IO_MODE_AUTO):
+        self.device = device
+        self.link = link
+        self.poll_interval = poll_interval
+        self.io_mode = io_mode
+        self._rx_buffer = bytearray(chunk_size)
+        self._tx_buffer = bytearray(chunk_size)
+        self._stopping = threading.Event()
+        self._threads = []
+        self._master = self._slave = None
+        self.slave_name = None
+        self.config = None
+        self.rx_bytes = 0
+        self.tx_bytes = 0
+        self.config_changes = 0
+        self.breaks = 0
+        self.error = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    @property
+    def running(self):
+        return any(t.is_alive() for t in self._threads)
+
+    def start(self):
+        """Creates the pty and starts the RX and TX threads; returns slave_name."""
+        master, slave = pty.openpty()
+        self._master, self._slave = master, slave
+        self.slave_name = os.ttyname(slave)
+        tty.setraw(slave)
+        self.config = tuple(self.device.GetUartConfig())
+        termios.tcsetattr(slave, termios.TCSANOW,
+                          uart_config_to_termios(termios.tcgetattr(slave), self.config))
+        self._termios = termios.tcgetattr(slave)
+        fcntl.fcntl(master, fcntl.F_SETFL, fcntl.fcntl(master, fcntl.F_GETFL) | os.O_NONBLOCK)
+        if self.link:
+            if os.path.islink(self.link):
+                os.unlink(self.link)
+            os.symlink(self.slave_name, self.link)
+        if self.io_mode is not None:
+            self.device.SetIoMode(self.io_mode)
+        self._stopping.clear()
+        self._threads = [threading.Thread(target=self._rx_loop, name="PtyBridge-rx", daemon=True),
+                         threading.Thread(target=self._tx_loop, name="PtyBridge-tx", daemon=True)]
+        for thread in self._threads:
+            thread.start()
+        return self.slave_name
+
+    def stop(self, timeout=None):
+        """Stops both threads, aborting a pending device read, and closes the pty."""
+        self._stopping.set()
+        if any(t.is_alive() for t in self._threads):
+            try:
+                self.device.CancelIo()
+            except HidUartError:
+                pass
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        if self.io_mode is not None:
+            try:
+                self.device.SetIoMode(None)
+            except HidUartError:
+                pass
+        if self.link and os.path.islink(self.link):
+            os.unlink(self.link)
+        for fd in (self._master, self._slave):
+            if fd is not None:
+                os.close(fd)
+        self._master = self._slave = None
+
+    def send_break(self, duration=0.25):
+        """Holds the device TX line in break for duration seconds."""
+        ms = int(duration * 1000)
+        if 0 < ms <= _MAX_BREAK_MS:
+            self.device.StartBreak(ms)
+        else:
+            self.device.StartBreak(0)
+            time.sleep(duration)
+            self.device.StopBreak()
+        self.breaks += 1
+
+    def stats(self):
+        return {
+            'slave': self.slave_name,
+            'rx_bytes': self.rx_bytes,
+            'tx_bytes': self.tx_bytes,
+            'config_changes': self.config_changes,
+            'breaks': self.breaks,
+            'config': list(self.config) if self.config else None,
+            'error': str(self.error) if self.error else None,
+        }
+
+    # ------------------------------------------------------------------
+    # Threads
+
+    def _rx_loop(self):
+        read_into = self.device.ReadInto
+        buffer = self._rx_buffer
+        view = memoryview(buffer)
+        master = self._master
+        stopping = self._stopping
+        try:
+            while not stopping.is_set():
+                count = read_into(buffer)
+                if not count:
+                    continue
+                self.rx_bytes += count
+                sent = 0
+                while sent < count and not stopping.is_set():
+                    try:
+                        sent += os.write(master, view[sent:count])
+                    except BlockingIOError:
+                        # Nobody is reading the pty: hold the data (the device FIFO
+                        # fills up as it would on a real port without flow control)
+                        select.select([], [master], [], 0.1)
+        except (HidUartError, OSError) as e:
+            if not stopping.is_set():
+                self.error = e
+                stopping.set()
+
+    def _tx_loop(self):
+        write = self.device.Write
+        buffer = self._tx_buffer
+        view = memoryview(buffer)
+        master = self._master
+        stopping = self._stopping
+        poll_interval = self.poll_interval
+        next_poll = time.monotonic() + poll_interval
+        try:
+            while not stopping.is_set():
+                ready, _, _ = select.select([master], [], [], poll_interval)
+                if ready:
+                    try:
+                        count = os.readv(master, [buffer])
+                    except BlockingIOError:
+                        count = 0
+                    except OSError as e:
+                        if e.errno != errno.EIO:
+                            raise
+                        count = 0
+                    if count:
+                        sent = 0
+                        while sent < count:
+                            sent += write(view[sent:count])
+                        self.tx_bytes += count
+                now = time.monotonic()
+                if now >= next_poll:
+                    next_poll = now + poll_interval
+                    self._poll_termios()
+        except (HidUartError, OSError) as e:
+            if not stopping.is_set():
+                self.error = e
+                stopping.set()
+
+    def _poll_termios(self):
+        attrs = termios.tcgetattr(self._slave)
+        if attrs == self._termios:
+            return
+        self._termios = attrs
+        baud, _, _, stop, flow = termios_to_uart_config(attrs)
+        if baud is None:
+            return
+        # The pty driver masks CSIZE/PARENB: keep the device's data bits and parity
+        config = (baud, self.config[1], self.config[2], stop, flow)
+        if config != self.config:
+            self.device.SetUartConfig(*config)
+            self.config = config
+            self.config_changes += 1
+
+
+def _cli_config(config, args):
+    """Returns GetUartConfig tuple config with the --baud/--data/--parity given on the CLI."""
+    baud, data, parity, stop, flow = config
+    if args.baud:
+        baud = args.baud
+    if args.data is not None:
+        data = args.data - 5
+    if args.parity is not None:
+        parity = _PARITIES[args.parity]
+    return (baud, data, parity, stop, flow)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bridge a CP211x UART to a pseudo-terminal")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--serial", help="device serial number")
+    group.add_argument("--index", type=int, default=0, help="device index (default: 0)")
+    parser.add_argument("--link", help="create a symlink to the pty at this path")
+    parser.add_argument("--baud", type=int, default=None, help="initial baud rate")
+    parser.add_argument("--data", type=int, choices=(5, 6, 7, 8), default=None,
+                        help="data bits (default: keep the device's)")
+    parser.add_argument("--parity", choices=sorted(_PARITIES), default=None,
+                        help="parity (default: keep the device's)")
+    args = parser.parse_args(argv)
+
+    hu = HidUartDevice()
+    try:
+        if args.serial:
+            hu.Open(serial=args.serial)
+        else:
+            hu.Open(args.index)
+        config = tuple(hu.GetUartConfig())
+        wanted = _cli_config(config, args)
+        if wanted != config:
+            hu.SetUartConfig(*wanted)
+        bridge = PtyBridge(hu, link=args.link)
+        name = bridge.start()
+        print("CP211x bridged to {}{}; SIGUSR1 sends a break, Ctrl-C stops".format(
+            name, " ({})".format(args.link) if args.link else ""), flush=True)
+        signal.signal(signal.SIGUSR1, lambda signum, frame: bridge.send_break())
+        try:
+            while bridge.running:
+                time.sleep(0.5)
+        except KeyboardInterrupt:
+            pass
+        bridge.stop()
+        if bridge.error:
+            print("Bridge stopped: {}".format(bridge.error), file=sys.stderr)
+            return 1
+        return 0
+    except HidUartError as e:
+        print("Device Error:", e, "-", hex(e.status), file=sys.stderr)
+        return 1
+    finally:
+        hu.Close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
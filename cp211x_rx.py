@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Background receive pump for CP211x devices.
+
+An RxPump owns a thread that continuously drains HidUart_Read into a
+preallocated ring buffer, so bytes leave the CP2110 FIFO while the caller is
+busy with other work. ctypes releases the GIL for the duration of the library
+call, so capture overlaps with Python code running in other threads.
+
+    pump = RxPump(hu, capacity=1 << 20, overflow=RxPump.DROP_OLDEST)
+    pump.start()
+    ...
+    data = pump.read(4096, timeout=0.5)
+    pump.stop()
+"""
+
+import threading
+import time
+
+from cp211x_HID_UART import HidUartError
+
+__all__ = ['RxPump', 'RxOverflowError']
+
+
+class RxOverflowError(Exception):
+    """Raised to consumers when the ring fills up under the RAISE overflow policy."""
+
+    def __init__(self, dropped):
+        self.dropped = dropped
+
+    def __str__(self):
+        return "RX ring buffer overflow ({} bytes dropped)".format(self.dropped)
+
+
+class RxPump(object):
+    """
+    Reader thread that pumps device RX data into a bounded ring buffer.
+
+    Overflow policies, applied when the ring is full:
+      BLOCK       - the reader stops draining the device until space is freed
+      DROP_OLDEST - the oldest buffered bytes are discarded to make room
+      RAISE       - incoming bytes that do not fit are discarded, the pump
+                    stops and the next read()/peek() raises RxOverflowError
+    """
+
+    BLOCK = "block"
+    DROP_OLDEST = "drop_oldest"
+    RAISE = "raise"
+
+    def __init__(self, device, capacity=65536, chunk_size=4096, overflow=BLOCK):
+        if overflow not in (self.BLOCK, self.DROP_OLDEST, self.RAISE):
+            raise ValueError("Invalid overflow policy: %r" % (overflow,))
+        self.device = device
+        self.capacity = capacity
+        self.overflow = overflow
+        self._ring = bytearray(capacity)
+        self._ring_view = memoryview(self._ring)
+        self._scratch = bytearray(min(chunk_size, capacity))
+        self._scratch_view = memoryview(self._scratch)
+        self._head = 0
+        self._count = 0
+        self._cond = threading.Condition()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._error = None
+
+        # Counters
+        self.bytes_received = 0
+        self.overruns = 0
+        self.bytes_dropped = 0
+        self.high_water = 0
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    # ------------------------------------------------------------------
+    # Thread control
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stopping.clear()
+        self._error = None
+        self._thread = threading.Thread(
+            target=self._run, name="RxPump", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """Stops the reader thread, aborting a pending HidUart_Read."""
+        self._stopping.set()
+        with self._cond:
+            self._cond.notify_all()
+        thread = self._thread
+        if thread is None:
+            return
+        if thread.is_alive():
+            try:
+                self.device.CancelIo()
+            except HidUartError:
+                pass
+        thread.join(timeout)
+        self._thread = None
+
+    def _run(self):
+        read_into = self.device.ReadInto
+        scratch = self._scratch
+        view = self._scratch_view
+        try:
+            while not self._stopping.is_set():
+                count = read_into(scratch)
+                if count:
+                    self._put(view, count)
+        except (HidUartError, RxOverflowError) as e:
+            if not self._stopping.is_set():
+                self._error = e
+        finally:
+            with self._cond:
+                self._cond.notify_all()
+
+    # ------------------------------------------------------------------
+    # Ring buffer
+
+    def _copy_in(self, data, count):
+        """Appends count bytes of data; caller guarantees they fit. Holds _cond."""
+        tail = (self._head + self._count) % self.capacity
+        first = min(count, self.capacity - tail)
+        self._ring_view[tail:tail + first] = data[:first]
+        if first < count:
+            self._ring_view[:count - first] = data[first:count]
+        self._count += count
+        if self._count > self.high_water:
+            self.high_water = self._count
+
+    def _copy_out(self, buffer, count, consume):
+        """Copies count buffered bytes into buffer. Holds _cond."""
+        head = self._head
+        first = min(count, self.capacity - head)
+        buffer[:first] = self._ring_view[head:head + first]
+        if first < count:
+            buffer[first:count] = self._ring_view[:count - first]
+        if consume:
+            self._head = (head + count) % self.capacity
+            self._count -= count
+            self._cond.notify_all()
+
+    def _put(self, data, count):
+        with self._cond:
+            self.bytes_received += count
+            free = self.capacity - self._count
+            if count <= free:
+                self._copy_in(data, count)
+                self._cond.notify_all()
+                return
+
+            self.overruns += 1
+            if self.overflow == self.DROP_OLDEST:
+                if count > self.capacity:
+                    data = data[count - self.capacity:count]
+                    self.bytes_dropped += count - self.capacity
+                    count = self.capacity
+                drop = count - (self.capacity - self._count)
+                self._head = (self._head + drop) % self.capacity
+                self._count -= drop
+                self.bytes_dropped += drop
+                self._copy_in(data, count)
+            elif self.overflow == self.RAISE:
+                self._copy_in(data, free)
+                self.bytes_dropped += count - free
+                raise RxOverflowError(count - free)
+            else:
+                offset = 0
+                while offset < count and not self._stopping.is_set():
+                    free = self.capacity - self._count
+                    if not free:
+                        self._cond.wait()
+                        continue
+                    chunk = min(free, count - offset)
+                    self._copy_in(data[offset:offset + chunk], chunk)
+                    offset += chunk
+                    self._cond.notify_all()
+            self._cond.notify_all()
+
+    def _check_error(self):
+        error = self._error
+        if error is not None:
+            self._error = None
+            raise error
+
+    def _wait_for_data(self, timeout):
+        """Waits until data is buffered or the pump stops. Holds _cond."""
+        if timeout is None:
+            deadline = None
+        else:
+            deadline = time.monotonic() + timeout
+        while not self._count and self._error is None and self.running:
+            if deadline is None:
+                self._cond.wait()
+            else:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+    # ------------------------------------------------------------------
+    # Consumer API
+
+    def available(self):
+        """Returns the number of bytes buffered and ready to read."""
+        return self._count
+
+    def readinto(self, buffer, timeout=None):
+        """Moves up to len(buffer) buffered bytes into buffer and returns the count.
+
+        Waits up to timeout seconds (None: forever, 0: no wait) for at least
+        one byte to arrive.
+        """
+        view = memoryview(buffer).cast('B')
+        with self._cond:
+            self._check_error()
+            self._wait_for_data(timeout)
+            if not self._count:
+                self._check_error()
+            count = min(len(view), self._count)
+            self._copy_out(view, count, consume=True)
+        return count
+
+    def read(self, size=-1, timeout=None):
+        """Returns up to size buffered bytes (all if size < 0).
+
+        Waits up to timeout seconds (None: forever, 0: no wait) for at least
+        one byte to arrive.
+        """
+        with self._cond:
+            self._check_error()
+            self._wait_for_data(timeout)
+            if not self._count:
+                self._check_error()
+            count = self._count if size < 0 else min(size, self._count)
+            data = bytearray(count)
+            self._copy_out(data, count, consume=True)
+        return bytes(data)
+
+    def peek(self, size=-1):
+        """Returns up to size buffered bytes (all if size < 0) without consuming them."""
+        with self._cond:
+            self._check_error()
+            count = self._count if size < 0 else min(size, self._count)
+            data = bytearray(count)
+            self._copy_out(data, count, consume=False)
+        return bytes(data)
+
+    def clear(self):
+        """Discards all buffered data."""
+        with self._cond:
+            self._head = 0
+            self._count = 0
+            self._cond.notify_all()
+
+    def stats(self):
+        """Returns the pump counters as a dict."""
+        return {
+            'bytes_received': self.bytes_received,
+            'bytes_buffered': self._count,
+            'bytes_dropped': self.bytes_dropped,
+            'overruns': self.overruns,
+            'high_water': self.high_water,
+            'capacity': self.capacity,
+        }
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Precisely timed GPIO waveforms for CP211x devices.
+
+A Sequencer plays a list of steps (pin, level, hold) on the GPIO latch.
+Every step is scheduled against an absolute time.monotonic_ns() deadline,
+so timing errors do not accumulate. The wait sleeps until shortly before
+the deadline and spins for the rest. The report compares achieved and
+requested timings:
+
+    seq = Sequencer(hu)
+    seq.add_mask(POWER_OFF_LATCH, POWER_PIN_MASK, hold=0.5)   # off for 500 ms
+    seq.add_mask(POWER_ON_LATCH, POWER_PIN_MASK, hold=2.0)    # then on for 2 s
+    report = seq.run(repeat=1000)
+    print(report.format())
+"""
+
+import time
+
+from cp211x_HID_UART import HidUartError, POWER_PIN_MASK, POWER_ON_LATCH, POWER_OFF_LATCH
+
+__all__ = ['Sequencer', 'SequenceReport', 'sleep_until_ns', 'power_cycle_sequence']
+
+# Sleep until this close to a deadline, then spin (covers typical scheduler wakeup latency)
+DEFAULT_SPIN_NS = 2000000
+
+
+def sleep_until_ns(deadline, spin_ns=DEFAULT_SPIN_NS):
+    """Waits until time.monotonic_ns() reaches deadline; returns the time it did."""
+    monotonic_ns = time.monotonic_ns
+    now = monotonic_ns()
+    remaining = deadline - now - spin_ns
+    if remaining > 0:
+        time.sleep(remaining / 1e9)
+    now = monotonic_ns()
+    while now < deadline:
+        now = monotonic_ns()
+    return now
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def _stats(values):
+    if not values:
+        return None
+    return {
+        'min': min(values),
+        'mean': sum(values) / len(values),
+        'p99': _percentile(values, 0.99),
+        'max': max(values),
+    }
+
+
+class Step(object):
+    """One waveform step: write latch/mask, then hold for hold_ns."""
+
+    __slots__ = ('latch', 'mask', 'hold_ns', 'label')
+
+    def __init__(self, latch, mask, hold_ns, label=None):
+        self.latch = latch
+        self.mask = mask
+        self.hold_ns = hold_ns
+        self.label = label or "latch=0x{:04X}/0x{:04X}".format(latch, mask)
+
+    def __repr__(self):
+        return "Step({}, hold={:.6f}s)".format(self.label, self.hold_ns / 1e9)
+
+
+class SequenceReport(object):
+    """
+    Timings of a Sequencer run.
+
+    start_error_ns[i] - per step, lateness of each WriteLatch start vs its deadline
+    hold_ns[i]        - per step, achieved time from this step's write to the next
+    write_ns[i]       - per step, duration of each WriteLatch call
+    """
+
+    def __init__(self, steps):
+        self.steps = list(steps)
+        self.repetitions = 0
+        self.start_error_ns = [[] for _ in steps]
+        self.hold_ns = [[] for _ in steps]
+        self.write_ns = [[] for _ in steps]
+        self.elapsed_ns = 0
+        self.error = None
+
+    def jitter(self):
+        """Returns min/mean/p99/max start lateness in ns over all steps."""
+        return _stats([e for errors in self.start_error_ns for e in errors])
+
+    def to_dict(self):
+        return {
+            'repetitions': self.repetitions,
+            'elapsed_seconds': self.elapsed_ns / 1e9,
+            'error': str(self.error) if self.error else None,
+            'jitter_ns': self.jitter(),
+            'steps': [{
+                'label': step.label,
+                'requested_hold_ns': step.hold_ns,
+                'achieved_hold_ns': _stats(self.hold_ns[i]),
+                'start_error_ns': _stats(self.start_error_ns[i]),
+                'write_ns': _stats(self.write_ns[i]),
+            } for i, step in enumerate(self.steps)],
+        }
+
+    def format(self):
+        """Formats the report as a plain-text table (times in ms)."""
+        def ms(value):
+            return "{:.3f}".format(value / 1e6)
+
+        lines = ["{:<28} {:>10} {:>10} {:>10} {:>10} {:>10}".format(
+            "Step", "Req (ms)", "Min", "Mean", "P99", "Max")]
+        for i, step in enumerate(self.steps):
+            hold = _stats(self.hold_ns[i])
+            if hold is None:
+                cells = ["-"] * 4
+            else:
+                cells = [ms(hold['min']), ms(hold['mean']), ms(hold['p99']), ms(hold['max'])]
+            lines.append("{:<28} {:>10} {:>10} {:>10} {:>10} {:>10}".format(
+                step.label, ms(step.hold_ns), *cells))
+        jitter = self.jitter()
+        if jitter is not None:
+            lines.append("Start jitter: min {} ms, mean {} ms, p99 {} ms, max {} ms".format(
+                ms(jitter['min']), ms(jitter['mean']), ms(jitter['p99']), ms(jitter['max'])))
+        lines.append("{} repetitions in {:.3f} s{}".format(
+            self.repetitions, self.elapsed_ns / 1e9,
+            ", stopped: {}".format(self.error) if self.error else ""))
+        return "\n".join(lines)
+
+
+class Sequencer(object):
+    """
+    Plays GPIO waveforms on a HidUartDevice with scheduled step times.
+
+    spin is how long (seconds) before each deadline the sequencer stops
+    sleeping and busy-waits; larger values trade CPU for accuracy.
+    """
+
+    def __init__(self, device, steps=None, spin=DEFAULT_SPIN_NS / 1e9):
+        self.device = device
+        self.steps = list(steps or [])
+        self.spin_ns = int(spin * 1e9)
+
+    def add(self, pin, level, hold, label=None):
+        """Appends a step that drives GPIO pin high (level true) or low, then holds."""
+        bit = 1 << pin
+        return self.add_mask(bit if level else 0, bit, hold,
+                             label or "GPIO{}={}".format(pin, "HIGH" if level else "LOW"))
+
+    def add_mask(self, latch, mask, hold, label=None):
+        """Appends a step writing latch/mask (several pins at once), then holds."""
+        self.steps.append(Step(latch, mask, int(hold * 1e9), label))
+        return self
+
+    def duration(self):
+        """Returns the requested duration of one repetition in seconds."""
+        return sum(step.hold_ns for step in self.steps) / 1e9
+
+    def run(self, repeat=1, stop=None, on_repetition=None):
+        """
+        Plays the steps repeat times and returns a SequenceReport.
+
+        stop is an optional threading.Event that ends the run after the
+        current step; on_repetition(n, report) is called after each
+        repetition. A HidUartError ends the run and is kept in report.error.
+        """
+        report = SequenceReport(self.steps)
+        if not self.steps:
+            return report
+        monotonic_ns = time.monotonic_ns
+        write_latch = self.device.WriteLatch
+        spin_ns = self.spin_ns
+        steps = self.steps
+        started = deadline = monotonic_ns()
+        previous = None                      # (step index, write start) of the last step
+        try:
+            for n in range(repeat):
+                for i, step in enumerate(steps):
+                    start = sleep_until_ns(deadline, spin_ns)
+                    write_latch(step.latch, step.mask)
+                    done = monotonic_ns()
+                    report.start_error_ns[i].append(start - deadline)
+                    report.write_ns[i].append(done - start)
+                    if previous is not None:
+                        report.hold_ns[previous[0]].append(start - previous[1])
+                    previous = (i, start)
+                    deadline += step.hold_ns
+                    if stop is not None and stop.is_set():
+                        break
+                else:
+                    report.repetitions += 1
+                    if on_repetition is not None:
+                        on_repetition(n + 1, report)
+                    continue
+                break
+            # Honour the final hold so back-to-back runs keep their timing
+            end = sleep_until_ns(deadline, spin_ns)
+            if previous is not None:
+                report.hold_ns[previous[0]].append(end - previous[1])
+        except HidUartError as e:
+            report.error = e
+        report.elapsed_ns = monotonic_ns() - started
+        return report
+
+
+def power_cycle_sequence(device, off_time, on_time=0.0, mask=POWER_PIN_MASK,
+                         off_latch=POWER_OFF_LATCH, on_latch=POWER_ON_LATCH):
+    """Returns a Sequencer that switches power off for off_time and on for on_time seconds."""
+    seq = Sequencer(device)
+    seq.add_mask(off_latch, mask, off_time, "power off")
+    seq.add_mask(on_latch, mask, on_time, "power on")
+    return seq
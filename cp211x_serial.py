@@ -0,0 +1,578 @@
+#!/usr/bin/env python3
+"""
+pyserial-compatible Serial class for CP211x devices.
+
+Serial implements the commonly used part of pyserial's interface on top of
+HidUartDevice, so tooling written against pyserial runs unchanged:
+
+    from cp211x_serial import Serial
+    with Serial("0001A2B3", baudrate=115200, timeout=1) as ser:
+        ser.write(b"version\\r")
+        line = ser.read_until(b"\\n")
+        rest = ser.read(ser.in_waiting)
+
+The port is a serial number (a string, digits included), optionally prefixed
+with "cp211x://", or a device index: an int, or "cp211x://#N". in_waiting reports the RX FIFO count from
+GetUartStatus, so read(ser.in_waiting) returns at once instead of waiting for
+the timeout. Setting baudrate, bytesize, parity, stopbits or rtscts only
+sends SetUartConfig when the resulting configuration differs from the one
+last applied; timeouts are handed to the library only when they change.
+
+pyserial itself is not required.
+"""
+
+import io
+import time
+
+from cp211x_HID_UART import (HID_UART, HID_UART_MAX_REPORT_PAYLOAD, HidUartDevice, HidUartError,
+                             HidUartWriteTimeoutError)
+
+__all__ = ['Serial', 'SerialException', 'SerialTimeoutException', 'PortNotOpenError',
+           'PARITY_NONE', 'PARITY_EVEN', 'PARITY_ODD', 'PARITY_MARK', 'PARITY_SPACE',
+           'STOPBITS_ONE', 'STOPBITS_ONE_POINT_FIVE', 'STOPBITS_TWO',
+           'FIVEBITS', 'SIXBITS', 'SEVENBITS', 'EIGHTBITS']
+
+PARITY_NONE, PARITY_EVEN, PARITY_ODD, PARITY_MARK, PARITY_SPACE = 'N', 'E', 'O', 'M', 'S'
+STOPBITS_ONE, STOPBITS_ONE_POINT_FIVE, STOPBITS_TWO = (1, 1.5, 2)
+FIVEBITS, SIXBITS, SEVENBITS, EIGHTBITS = (5, 6, 7, 8)
+
+PORT_PREFIX = "cp211x://"
+
+_PARITIES = {PARITY_NONE: HID_UART.NO_PARITY, PARITY_EVEN: HID_UART.EVEN_PARITY,
+             PARITY_ODD: HID_UART.ODD_PARITY, PARITY_MARK: HID_UART.MARK_PARITY,
+             PARITY_SPACE: HID_UART.SPACE_PARITY}
+_BYTESIZES = {FIVEBITS: HID_UART.FIVE_DATA_BITS, SIXBITS: HID_UART.SIX_DATA_BITS,
+              SEVENBITS: HID_UART.SEVEN_DATA_BITS, EIGHTBITS: HID_UART.EIGHT_DATA_BITS}
+# The CP2110 long stop bit is 1.5 bits with 5 data bits and 2 bits otherwise
+_STOPBITS = {STOPBITS_ONE: HID_UART.SHORT_STOP_BIT, STOPBITS_ONE_POINT_FIVE: HID_UART.LONG_STOP_BIT,
+             STOPBITS_TWO: HID_UART.LONG_STOP_BIT}
+
+# Library timeout (ms) used while blocking without a timeout (timeout=None)
+_BLOCKING_SLICE_MS = 1000
+_MAX_TIMEOUT_MS = 0xFFFFFFFF
+
+
+class SerialException(IOError):
+    """Serial port error; status is the HidUart status when a library call failed."""
+
+    def __init__(self, message, status=None):
+        IOError.__init__(self, message)
+        self.status = status
+
+
+class SerialTimeoutException(SerialException):
+    """Write timeout (raised only when write_timeout is set)."""
+
+
+class PortNotOpenError(SerialException):
+    def __init__(self):
+        SerialException.__init__(self, "Attempting to use a port that is not open")
+
+
+def _wrap(error):
+    return SerialException(str(error), error.status)
+
+
+def _timeout_ms(seconds):
+    return min(int(seconds * 1000 + 0.999), _MAX_TIMEOUT_MS)
+
+
+class Serial(io.RawIOBase):
+    """
+    pyserial-style serial port on a CP211x device.
+
+    timeout follows pyserial: None blocks until size bytes arrived, 0 returns
+    what is available immediately, x waits at most x seconds. xonxoff and
+    dsrdtr are not supported by the CP2110 and must stay False.
+    backend is passed to HidUartDevice.Open (e.g. a simulator).
+    """
+
+    def __init__(self, port=None, baudrate=9600, bytesize=EIGHTBITS, parity=PARITY_NONE,
+                 stopbits=STOPBITS_ONE, timeout=None, xonxoff=False, rtscts=False,
+                 write_timeout=None, dsrdtr=False, inter_byte_timeout=None,
+                 exclusive=None, backend=None, **kwargs):
+        io.RawIOBase.__init__(self)
+        if kwargs:
+            raise ValueError("unexpected keyword arguments: {!r}".format(kwargs))
+        self._device = None
+        self._own_device = True
+        self._port = port
+        self._backend = backend
+        self._baudrate = baudrate
+        self._bytesize = bytesize
+        self._parity = parity
+        self._stopbits = stopbits
+        self._rtscts = rtscts
+        self._timeout = timeout
+        self._write_timeout = write_timeout
+        self.inter_byte_timeout = inter_byte_timeout
+        self.xonxoff = xonxoff
+        self.dsrdtr = dsrdtr
+        self._applied_config = None
+        self._break_state = False
+        self._buffer = bytearray(4096)
+        self._pending = bytearray()         # bytes read past a read_until() match
+        self._config()                      # validate the settings early
+        if port is not None:
+            self.open()
+
+    @classmethod
+    def from_device(cls, device, **settings):
+        """Wraps an already open HidUartDevice; close() leaves it open."""
+        ser = cls(**settings)
+        ser._device = device
+        ser._own_device = False
+        ser._port = device.GetString(HID_UART.SERIAL_STR)
+        ser._apply_config()
+        return ser
+
+    # ------------------------------------------------------------------
+    # Opening and closing
+
+    @property
+    def is_open(self):
+        return self._device is not None
+
+    @property
+    def device(self):
+        """The underlying HidUartDevice (None while closed)."""
+        return self._device
+
+    def open(self):
+        if self._device is not None:
+            raise SerialException("Port is already open.")
+        if self._port is None:
+            raise SerialException("Port must be configured before it can be used.")
+        index, serial = self._parse_port(self._port)
+        hu = HidUartDevice()
+        try:
+            if serial is None:
+                hu.Open(index, backend=self._backend)
+            else:
+                hu.Open(serial=serial, backend=self._backend)
+        except HidUartError as e:
+            raise SerialException("could not open port {}: {}".format(self._port, e), e.status)
+        self._device = hu
+        self._own_device = True
+        self._applied_config = None
+        try:
+            self._apply_config()
+        except SerialException:
+            self.close()
+            raise
+
+    @staticmethod
+    def _parse_port(port):
+        """Returns (index, None) for an int or "cp211x://#N", else (None, serial)."""
+        if isinstance(port, int) and not isinstance(port, bool):
+            return port, None
+        port = str(port)
+        if port.startswith(PORT_PREFIX):
+            port = port[len(PORT_PREFIX):]
+            if port.startswith("#"):
+                try:
+                    return int(port[1:]), None
+                except ValueError:
+                    raise SerialException("invalid device index in port {!r}".format(port))
+        return None, port
+
+    def close(self):
+        hu = self._device
+        if hu is not None:
+            self._device = None
+            del self._pending[:]
+            if self._own_device:
+                try:
+                    hu.Close()
+                except HidUartError:
+                    pass
+        io.RawIOBase.close(self)
+
+    @property
+    def closed(self):
+        return self._device is None
+
+    def __enter__(self):
+        if self._device is None and self._port is not None:
+            self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __repr__(self):
+        return "{}<id=0x{:x}, open={}>(port={!r}, baudrate={!r}, bytesize={!r}, parity={!r}, " \
+               "stopbits={!r}, timeout={!r}, rtscts={!r}, write_timeout={!r})".format(
+                   self.__class__.__name__, id(self), self.is_open, self._port, self._baudrate,
+                   self._bytesize, self._parity, self._stopbits, self._timeout, self._rtscts,
+                   self._write_timeout)
+
+    # ------------------------------------------------------------------
+    # Settings
+
+    def _config(self):
+        if self.xonxoff or self.dsrdtr:
+            raise ValueError("CP2110 supports neither XON/XOFF nor DSR/DTR flow control")
+        try:
+            return (int(self._baudrate), _BYTESIZES[self._bytesize], _PARITIES[self._parity],
+                    _STOPBITS[self._stopbits],
+                    HID_UART.RTS_CTS_FLOW_CONTROL if self._rtscts else HID_UART.NO_FLOW_CONTROL)
+        except KeyError as e:
+            raise ValueError("Not a valid setting: {!r}".format(e.args[0]))
+
+    def _apply_config(self):
+        config = self._config()
+        if self._device is None or config == self._applied_config:
+            return
+        try:
+            if self._applied_config is None:
+                # Freshly opened: the device may already be configured this way
+                self._applied_config = tuple(self._device.GetUartConfig())
+                if config == self._applied_config:
+                    return
+            self._device.SetUartConfig(*config)
+        except HidUartError as e:
+            raise _wrap(e)
+        self._applied_config = config
+
+    def _setting(name):
+        attr = "_" + name
+
+        def get(self):
+            return getattr(self, attr)
+
+        def set(self, value):
+            if value == getattr(self, attr):
+                return
+            previous = getattr(self, attr)
+            setattr(self, attr, value)
+            try:
+                self._apply_config()
+            except ValueError:
+                setattr(self, attr, previous)
+                raise
+        return property(get, set)
+
+    baudrate = _setting("baudrate")
+    bytesize = _setting("bytesize")
+    parity = _setting("parity")
+    stopbits = _setting("stopbits")
+    rtscts = _setting("rtscts")
+    del _setting
+
+    @property
+    def timeout(self):
+        return self._timeout
+
+    @timeout.setter
+    def timeout(self, value):
+        if value is not None and value < 0:
+            raise ValueError("Not a valid timeout: {!r}".format(value))
+        self._timeout = value
+
+    @property
+    def write_timeout(self):
+        return self._write_timeout
+
+    @write_timeout.setter
+    def write_timeout(self, value):
+        if value is not None and value < 0:
+            raise ValueError("Not a valid timeout: {!r}".format(value))
+        self._write_timeout = value
+
+    @property
+    def port(self):
+        return self._port
+
+    @port.setter
+    def port(self, value):
+        was_open = self.is_open
+        if was_open:
+            self.close()
+        self._port = value
+        if was_open:
+            self.open()
+
+    @property
+    def name(self):
+        return self._port
+
+    def get_settings(self):
+        return {
+            'baudrate': self._baudrate, 'bytesize': self._bytesize, 'parity': self._parity,
+            'stopbits': self._stopbits, 'xonxoff': self.xonxoff, 'dsrdtr': self.dsrdtr,
+            'rtscts': self._rtscts, 'timeout': self._timeout,
+            'write_timeout': self._write_timeout, 'inter_byte_timeout': self.inter_byte_timeout,
+        }
+
+    def apply_settings(self, d):
+        """Applies a get_settings() dict with at most one SetUartConfig."""
+        for key in ('baudrate', 'bytesize', 'parity', 'stopbits', 'rtscts'):
+            if key in d:
+                setattr(self, "_" + key, d[key])
+        for key in ('xonxoff', 'dsrdtr', 'inter_byte_timeout'):
+            if key in d:
+                setattr(self, key, d[key])
+        if 'timeout' in d:
+            self.timeout = d['timeout']
+        if 'write_timeout' in d:
+            self.write_timeout = d['write_timeout']
+        self._apply_config()
+
+    def _set_timeouts(self, rto, wto):
+        """Hands the timeouts (ms) to the library unless the device already uses them."""
+        hu = self._device
+        if rto != hu._rto or wto != hu._wto:
+            hu.SetTimeouts(rto, wto)
+
+    def _write_timeout_ms(self):
+        if self._write_timeout is None:
+            return _BLOCKING_SLICE_MS
+        return _timeout_ms(self._write_timeout)
+
+    # ------------------------------------------------------------------
+    # Status
+
+    @property
+    def in_waiting(self):
+        """Bytes that can be read without waiting (RX FIFO count plus bytes buffered here)."""
+        if self._device is None:
+            raise PortNotOpenError()
+        try:
+            return len(self._pending) + self._device.GetUartStatus()[1]
+        except HidUartError as e:
+            raise _wrap(e)
+
+    @property
+    def out_waiting(self):
+        """Bytes in the TX FIFO."""
+        if self._device is None:
+            raise PortNotOpenError()
+        try:
+            return self._device.GetUartStatus()[0]
+        except HidUartError as e:
+            raise _wrap(e)
+
+    def inWaiting(self):
+        return self.in_waiting
+
+    # ------------------------------------------------------------------
+    # Reading
+
+    def readable(self):
+        return True
+
+    def writable(self):
+        return True
+
+    def seekable(self):
+        return False
+
+    def _read_device(self, size, rto):
+        """Reads up to size bytes with a library read timeout of rto ms."""
+        if len(self._buffer) < size:
+            self._buffer = bytearray(size)
+        try:
+            self._set_timeouts(rto, self._write_timeout_ms())
+            count = self._device.ReadInto(self._buffer, size)
+        except HidUartError as e:
+            raise _wrap(e)
+        return memoryview(self._buffer)[:count]
+
+    def read(self, size=1):
+        """Reads size bytes, returning fewer only when the timeout expires."""
+        if self._device is None:
+            raise PortNotOpenError()
+        if size is None or size < 0:
+            size = self.in_waiting
+        if size <= 0:
+            return b""
+        data = bytearray()
+        if self._pending:
+            data += self._pending[:size]
+            del self._pending[:size]
+            if len(data) == size:
+                return bytes(data)
+        timeout = self._timeout
+        if timeout == 0:
+            size = min(size - len(data), self.in_waiting)
+            if size > 0:
+                # The bytes are already on the device: allow one USB frame per report
+                data += self._read_device(size, -(-size // HID_UART_MAX_REPORT_PAYLOAD) + 1)
+            return bytes(data)
+        if timeout is None:
+            while len(data) < size:
+                data += self._read_device(size - len(data), _BLOCKING_SLICE_MS)
+            return bytes(data)
+        # HidUart_Read returns when size bytes arrived or the read timeout expired
+        deadline = time.monotonic() + timeout
+        while len(data) < size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            data += self._read_device(size - len(data), _timeout_ms(remaining))
+        return bytes(data)
+
+    def readinto(self, b):
+        data = self.read(len(b))
+        n = len(data)
+        memoryview(b).cast('B')[:n] = data
+        return n
+
+    def read_all(self):
+        return self.read(self.in_waiting)
+
+    def read_until(self, expected=b"\n", size=None):
+        """Reads until expected is found, size bytes were read, or the timeout expires."""
+        if self._device is None:
+            raise PortNotOpenError()
+        expected = bytes(expected)
+        data = self._pending
+        scan = 0
+        timeout = self._timeout
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            index = data.find(expected, scan)
+            if index >= 0:
+                end = index + len(expected)
+                break
+            if size is not None and len(data) >= size:
+                end = size
+                break
+            scan = max(len(data) - len(expected) + 1, 0)
+            if deadline is None:
+                rto = _BLOCKING_SLICE_MS
+            else:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 and timeout != 0:
+                    end = len(data)
+                    break
+                rto = _timeout_ms(max(remaining, 0))
+            # Take everything that is already there, or wait for the next byte
+            try:
+                want = max(self._device.GetUartStatus()[1], 1)
+            except HidUartError as e:
+                raise _wrap(e)
+            if size is not None:
+                want = min(want, size - len(data))
+            chunk = self._read_device(want, rto if timeout != 0 else 1)
+            if not chunk and timeout == 0:
+                end = len(data)
+                break
+            data += chunk
+        if size is not None:
+            end = min(end, size)
+        result = bytes(data[:end])
+        del data[:end]
+        return result
+
+    def readline(self, size=-1):
+        return self.read_until(b"\n", None if size is None or size < 0 else size)
+
+    def readlines(self, hint=-1):
+        lines = []
+        total = 0
+        while hint is None or hint <= 0 or total < hint:
+            line = self.readline()
+            if not line:
+                break
+            lines.append(line)
+            total += len(line)
+        return lines
+
+    def __iter__(self):
+        while True:
+            line = self.readline()
+            if not line:
+                return
+            yield line
+
+    # ------------------------------------------------------------------
+    # Writing
+
+    def write(self, data):
+        """Writes data; raises SerialTimeoutException if write_timeout expires first."""
+        if self._device is None:
+            raise PortNotOpenError()
+        view = memoryview(data).cast('B') if not isinstance(data, bytes) else data
+        total = len(view)
+        written = 0
+        try:
+            rto = self._device._rto
+            self._set_timeouts(_BLOCKING_SLICE_MS if rto is None else rto, self._write_timeout_ms())
+            if self._write_timeout is not None:
+                return self._device.Write(view, raiseOnTimeout=True)
+            while written < total:
+                written += self._device.Write(view[written:] if written else view)
+        except HidUartWriteTimeoutError as e:
+            raise SerialTimeoutException("Write timeout ({} of {} bytes written)".format(
+                e.written, e.requested), e.status)
+        except HidUartError as e:
+            raise _wrap(e)
+        return written
+
+    def flush(self):
+        """Waits until the TX FIFO has drained."""
+        if self._device is None:
+            return
+        while self.out_waiting:
+            time.sleep(max(10.0 / self._baudrate, 0.001))
+
+    def reset_input_buffer(self):
+        if self._device is None:
+            raise PortNotOpenError()
+        del self._pending[:]
+        try:
+            self._device.FlushBuffers(False, True)
+        except HidUartError as e:
+            raise _wrap(e)
+
+    def reset_output_buffer(self):
+        if self._device is None:
+            raise PortNotOpenError()
+        try:
+            self._device.FlushBuffers(True, False)
+        except HidUartError as e:
+            raise _wrap(e)
+
+    flushInput = reset_input_buffer
+    flushOutput = reset_output_buffer
+
+    def cancel_read(self):
+        if self._device is not None:
+            try:
+                self._device.CancelIo()
+            except HidUartError as e:
+                raise _wrap(e)
+
+    cancel_write = cancel_read
+
+    # ------------------------------------------------------------------
+    # Break
+
+    def send_break(self, duration=0.25):
+        if self._device is None:
+            raise PortNotOpenError()
+        self.break_condition = True
+        time.sleep(duration)
+        self.break_condition = False
+
+    @property
+    def break_condition(self):
+        return self._break_state
+
+    @break_condition.setter
+    def break_condition(self, value):
+        if self._device is None:
+            raise PortNotOpenError()
+        value = bool(value)
+        if value == self._break_state:
+            return
+        try:
+            if value:
+                self._device.StartBreak(0)
+            else:
+                self._device.StopBreak()
+        except HidUartError as e:
+            raise _wrap(e)
+        self._break_state = value
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Auto-reconnecting CP211x sessions.
+
+A ResilientSession stands in for a HidUartDevice. When a call fails with
+HID_UART_INVALID_HANDLE, HID_UART_DEVICE_IO_FAILED or
+HID_UART_DEVICE_NOT_FOUND (board unplugged, bridge Reset()), the session
+reopens the device by serial number with exponential backoff, replays the
+configuration applied through it so far (UART config, UART enable,
+timeouts, I/O mode, GPIO latch) and retries the call once. Calls that change the line or the pins
+(Write, WriteString, sendline, WriteLatch, StartBreak) may have taken
+effect before the failure, so they re-raise after the reconnect instead of
+running twice, unless the session was created with retry_writes=True:
+
+    session = ResilientSession("0001A2B3")
+    session.SetUartConfig(921600)
+    session.SetTimeouts(50, 1000)
+    pump = RxPump(session)          # reads through the session, so it survives too
+    pump.start()
+    ...
+    print(session.stats())
+
+Readers bound to the raw device (session.device) can be registered with
+attach_reader(); they are restarted after each reconnect if they stopped.
+"""
+
+import threading
+import time
+
+from cp211x_HID_UART import (HID_UART, STALE_HANDLE_STATUSES, DeviceIndex, HidUartDevice,
+                             HidUartError, close_quietly)
+
+__all__ = ['ResilientSession', 'SessionStats']
+
+# Setters whose latest arguments are replayed after a reconnect, in this order
+# (SetIoMode saves the timeouts and reads the UART config, so it goes last).
+# The latch is restored from the device's own cache.
+_REPLAYED = ('SetUartConfig', 'SetUartEnable', 'SetTimeouts', 'SetIoMode')
+
+# Setters that replace another setter's state: only the latest of them is replayed
+_REPLAYED_AS = {'SetComTimeout': 'SetTimeouts'}
+
+# Calls not repeated after a reconnect (unless retry_writes): a failed write
+# may still have reached the device
+_NOT_RETRIED = ('Write', 'WriteString', 'sendline', 'WriteLatch', 'StartBreak')
+
+
+class SessionStats(object):
+    """
+    Reconnect counters; durations are in seconds.
+
+    reconnects       - successful reconnects
+    failed_attempts  - open/replay attempts that failed during reconnects
+    last_recovery    - time from the failed call to the replayed configuration
+    total_recovery   - sum of all recovery times
+    max_recovery     - longest recovery
+    last_error       - the error that triggered the latest reconnect
+    """
+
+    __slots__ = ('reconnects', 'failed_attempts', 'last_recovery', 'total_recovery',
+                 'max_recovery', 'last_error')
+
+    def __init__(self):
+        self.reconnects = 0
+        self.failed_attempts = 0
+        self.last_recovery = None
+        self.total_recovery = 0.0
+        self.max_recovery = 0.0
+        self.last_error = None
+
+    def to_dict(self):
+        d = {name: getattr(self, name) for name in self.__slots__}
+        d['last_error'] = str(self.last_error) if self.last_error else None
+        return d
+
+    def __repr__(self):
+        return "SessionStats({})".format(", ".join(
+            "{}={!r}".format(k, v) for k, v in self.to_dict().items()))
+
+
+class ResilientSession(object):
+    """
+    HidUartDevice proxy that reconnects and replays configuration on failure.
+
+    serial None opens device index 0 and remembers its serial number.
+    Reconnect attempts start after initial_backoff seconds and back off
+    exponentially up to max_backoff; after reconnect_timeout seconds
+    (None: never) the last error is raised. on_reconnect(session) is called
+    after every successful reconnect. retry_writes=True also retries the
+    calls in _NOT_RETRIED, for protocols where a repeated write is harmless.
+
+    Device methods are available on the session itself. Attributes of the
+    device (handle, match, latency_idle_ms, ...) live on session.device.
+    """
+
+    def __init__(self, serial=None, vid=HID_UART.VID, pid=HID_UART.PID, backend=None,
+                 initial_backoff=0.05, max_backoff=5.0, reconnect_timeout=60.0,
+                 on_reconnect=None, retry_writes=False):
+        self.vid = vid
+        self.pid = pid
+        self.backend = backend
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.reconnect_timeout = reconnect_timeout
+        self.on_reconnect = on_reconnect
+        self.retry_writes = retry_writes
+        self.device = HidUartDevice()
+        self._replay = {}
+        self._readers = []
+        self._lock = threading.RLock()
+        self._generation = 0
+        self._closed = False
+        self._stats = SessionStats()
+        if serial is None:
+            self.device.Open(0, vid, pid, backend=backend)
+            serial = self.device.GetString(HID_UART.SERIAL_STR)
+        else:
+            self.device.Open(vid=vid, pid=pid, serial=serial, backend=backend)
+        self.serial = serial
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.Close()
+
+    def __getattr__(self, name):
+        attr = getattr(self.device, name)
+        if not callable(attr) or name.startswith("_"):
+            return attr
+        wrapper = self._wrap(name)
+        setattr(self, name, wrapper)
+        return wrapper
+
+    def _wrap(self, name):
+        slot = _REPLAYED_AS.get(name, name)
+        record = slot in _REPLAYED
+        retried = name not in _NOT_RETRIED
+
+        def call(*args, **kwargs):
+            generation = self._generation
+            try:
+                result = getattr(self.device, name)(*args, **kwargs)
+            except HidUartError as e:
+                if e.status not in STALE_HANDLE_STATUSES or self._closed:
+                    raise
+                self.reconnect(e, generation)
+                if not (retried or self.retry_writes):
+                    raise
+                result = getattr(self.device, name)(*args, **kwargs)
+            if record:
+                self._replay[slot] = (name, args, kwargs)
+            return result
+        call.__name__ = name
+        return call
+
+    def Close(self):
+        """Closes the device; the session does not reconnect afterwards."""
+        self._closed = True
+        for reader in self._readers:
+            reader.stop()
+        self.device.Close()
+
+    def attach_reader(self, reader):
+        """Registers a reader (start()/stop()/running, e.g. RxPump) to restart after reconnects."""
+        self._readers.append(reader)
+        return reader
+
+    def detach_reader(self, reader):
+        self._readers.remove(reader)
+
+    def stats(self):
+        """Returns a copy of the reconnect counters."""
+        copy = SessionStats()
+        for name in SessionStats.__slots__:
+            setattr(copy, name, getattr(self._stats, name))
+        return copy
+
+    def reconnect(self, error=None, generation=None):
+        """
+        Reopens the device by serial number and replays the configuration.
+
+        Threads that fail at the same time reconnect once: a caller passing
+        the generation it saw before failing returns immediately if another
+        thread has reconnected since.
+        """
+        started = time.monotonic()
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            hu = self.device
+            state = (hu._latch, hu._latch_known)
+            close_quietly(hu)
+            deadline = None if self.reconnect_timeout is None else started + self.reconnect_timeout
+            delay = self.initial_backoff
+            while True:
+                try:
+                    self._open_and_replay(state)
+                    break
+                except HidUartError as e:
+                    self._stats.failed_attempts += 1
+                    close_quietly(hu)
+                    if deadline is not None and time.monotonic() + delay > deadline:
+                        raise e
+                time.sleep(delay)
+                delay = min(delay * 2, self.max_backoff)
+            self._generation += 1
+            recovery = time.monotonic() - started
+            stats = self._stats
+            stats.reconnects += 1
+            stats.last_recovery = recovery
+            stats.total_recovery += recovery
+            stats.max_recovery = max(stats.max_recovery, recovery)
+            stats.last_error = error
+        for reader in self._readers:
+            if not reader.running:
+                reader.start()
+        if self.on_reconnect is not None:
+            self.on_reconnect(self)
+
+    def _open_and_replay(self, state):
+        hu = self.device
+        if self.backend is None:
+            DeviceIndex.shared(self.vid, self.pid).invalidate()
+        hu.Open(vid=self.vid, pid=self.pid, serial=self.serial, backend=self.backend)
+        # The new handle has the library's default timeouts: drop the old
+        # handle's I/O mode so a replayed SetIoMode saves the replayed ones
+        hu._io_mode = None
+        for slot in _REPLAYED:
+            if slot in self._replay:
+                name, args, kwargs = self._replay[slot]
+                getattr(hu, name)(*args, **kwargs)
+        latch, known = state
+        if known:
+            hu.WriteLatch(latch & known, known)
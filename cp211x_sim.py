@@ -0,0 +1,529 @@
+#!/usr/bin/env python3
+"""
+In-process simulated CP211x library.
+
+SimulatedHidUart implements every HidUart_* entry point used by
+cp211x_HID_UART, so the whole Python layer can run and be measured without
+a CP2110 or the vendor libraries:
+
+    sim = SimulatedHidUart([SimulatedDevice(serial="SIM0", loopback=True)])
+    cp211x_HID_UART.SetLibrary(sim)
+
+Each SimulatedDevice models RX/TX FIFOs drained at the configured baud rate
+(or instantly with realtime=False), the GPIO latch, read/write timeouts and
+CancelIo. Errors are injected per entry point with fail().
+"""
+
+import itertools
+import threading
+import time
+
+from cp211x_HID_UART import (
+    HID_UART, HidUartError, _deref, HID_UART_SUCCESS, HID_UART_DEVICE_NOT_FOUND,
+    HID_UART_INVALID_HANDLE, HID_UART_INVALID_PARAMETER, HID_UART_READ_TIMED_OUT,
+    HID_UART_WRITE_TIMED_OUT, HID_UART_DEVICE_IO_FAILED, HID_UART_DEVICE_ACCESS_ERROR)
+
+__all__ = ['SimulatedHidUart', 'SimulatedDevice']
+
+# CP2110 FIFO sizes
+TX_FIFO_SIZE = 480
+RX_FIFO_SIZE = 480
+
+_DATA_BITS = {0: 5, 1: 6, 2: 7, 3: 8}
+
+
+class SimulatedDevice(object):
+    """
+    One simulated CP2110.
+
+    loopback  - transmitted bytes are received again
+    realtime  - bytes move at the configured line rate; otherwise instantly
+    source    - bytes pattern repeated endlessly on RX (a free-running talker)
+    record_tx - keep everything transmitted in tx_log
+
+    connect() wires two devices TX to RX, like a null-modem cable.
+    """
+
+    def __init__(self, serial="SIM0001", vid=HID_UART.VID, pid=HID_UART.PID,
+                 release=0x0100, loopback=False, realtime=True, source=None,
+                 record_tx=True):
+        self.serial = serial
+        self.vid = vid
+        self.pid = pid
+        self.release = release
+        self.manufacturer = "Silicon Labs"
+        self.product = "CP2110 HID USB-to-UART Bridge (simulated)"
+        self.part_number = 0x0A
+        self.version = 0x01
+        self.loopback = loopback
+        self.realtime = realtime
+        self.source = source
+        self._source_pos = 0
+        self._source_buf = b""
+        self.record_tx = record_tx
+        self.peer = None
+
+        self.enabled = True
+        self.config = [115200, HID_UART.EIGHT_DATA_BITS, HID_UART.NO_PARITY,
+                       HID_UART.SHORT_STOP_BIT, HID_UART.NO_FLOW_CONTROL]
+        self.latch = 0xFFFF
+        self.in_break = False
+        self.error_status = 0
+        self.read_timeout = 1000
+        self.write_timeout = 1000
+        self.opened = False
+        self.resets = 0
+
+        self.rx = bytearray()
+        self.tx_log = bytearray()        # everything that went out on the line
+        self._rx_t0 = 0.0                # time the first buffered RX byte started arriving
+        self._tx_busy_until = 0.0
+        self._cond = threading.Condition()
+        self._cancel = 0
+
+    # ------------------------------------------------------------------
+    # Line timing
+
+    @property
+    def char_time(self):
+        """Seconds per character on the line at the current configuration."""
+        baud, data, parity, stop, flow = self.config
+        bits = 1 + _DATA_BITS.get(data, 8) + (1 if parity else 0) + (2 if stop else 1)
+        return float(bits) / baud
+
+    def _rx_available(self, now):
+        if self.source is not None:
+            return 1 << 30
+        if not self.realtime:
+            return len(self.rx)
+        # Loopback data queued behind the TX line has not started arriving yet
+        return max(0, min(len(self.rx), int((now - self._rx_t0) / self.char_time)))
+
+    def _tx_level(self, now):
+        if not self.realtime:
+            return 0
+        return max(0, int(round((self._tx_busy_until - now) / self.char_time)))
+
+    def feed(self, data):
+        """Queues data to arrive on RX (at line rate when realtime)."""
+        with self._cond:
+            now = time.monotonic()
+            if not self.rx or self._rx_t0 > now:
+                self._rx_t0 = max(now, self._tx_busy_until if self.loopback else now)
+            self.rx += data
+            self._cond.notify_all()
+
+    def connect(self, other):
+        """Cross-connects this device and other: each receives what the other transmits."""
+        self.peer = other
+        other.peer = self
+
+    def _arrive(self, data, start):
+        # Bytes from the peer's TX line; the first starts arriving at start
+        with self._cond:
+            if not self.rx:
+                self._rx_t0 = start
+            self.rx += data
+            self._cond.notify_all()
+
+    def _take(self, out, count):
+        if self.source is not None:
+            pattern = self.source
+            pos = self._source_pos
+            if len(self._source_buf) < pos + count:
+                self._source_buf = bytes(pattern) * (-(-(pos + count) // len(pattern)))
+            out[:count] = memoryview(self._source_buf)[pos:pos + count]
+            self._source_pos = (pos + count) % len(pattern)
+            return
+        out[:count] = self.rx[:count]
+        del self.rx[:count]
+        self._rx_t0 += count * self.char_time
+
+    # ------------------------------------------------------------------
+    # Data path (called with the library conventions by SimulatedHidUart)
+
+    def read(self, out, size):
+        deadline = time.monotonic() + self.read_timeout / 1000.0
+        with self._cond:
+            cancel = self._cancel
+            while True:
+                now = time.monotonic()
+                available = self._rx_available(now)
+                if available >= size or now >= deadline or self._cancel != cancel:
+                    count = min(available, size)
+                    self._take(out, count)
+                    return count, (HID_UART_SUCCESS if count == size else HID_UART_READ_TIMED_OUT)
+                wait = deadline - now
+                if self.realtime and len(self.rx) > available:
+                    wait = min(wait, (size - available) * self.char_time)
+                self._cond.wait(max(wait, 0.0))
+
+    def write(self, data, size):
+        deadline = time.monotonic() + self.write_timeout / 1000.0
+        sent = 0
+        to_peer = []
+        with self._cond:
+            cancel = self._cancel
+            while sent < size:
+                now = time.monotonic()
+                space = TX_FIFO_SIZE - self._tx_level(now)
+                if space > 0:
+                    n = min(space, size - sent)
+                    chunk = data[sent:sent + n]
+                    sent += n
+                    if self.record_tx:
+                        self.tx_log += chunk
+                    start = now
+                    if self.realtime:
+                        start = max(now, self._tx_busy_until)
+                        self._tx_busy_until = start + n * self.char_time
+                    if self.peer is not None:
+                        to_peer.append((bytes(chunk), start))
+                    if self.loopback:
+                        if not self.rx:
+                            self._rx_t0 = max(now, self._tx_busy_until - n * self.char_time)
+                        self.rx += chunk
+                        self._cond.notify_all()
+                    continue
+                if now >= deadline or self._cancel != cancel:
+                    break
+                if to_peer:
+                    self._cond.release()
+                    try:
+                        self._deliver(to_peer)
+                    finally:
+                        self._cond.acquire()
+                    continue
+                self._cond.wait(min(deadline - now, self.char_time * 16))
+        self._deliver(to_peer)
+        return sent, (HID_UART_SUCCESS if sent == size else HID_UART_WRITE_TIMED_OUT)
+
+    def _deliver(self, chunks):
+        # Called without our lock held, so two peers writing at once cannot deadlock
+        for chunk, start in chunks:
+            self.peer._arrive(chunk, start)
+        del chunks[:]
+
+    def cancel_io(self):
+        with self._cond:
+            self._cancel += 1
+            self._cond.notify_all()
+
+    def flush(self, transmit, receive):
+        with self._cond:
+            if transmit:
+                self._tx_busy_until = 0.0
+            if receive:
+                del self.rx[:]
+
+
+class SimulatedHidUart(object):
+    """
+    Simulated SLABHIDtoUART library with the vendor calling convention.
+
+    HidUart_Read/HidUart_Write return their status; all other entry points
+    raise HidUartError on failure, as the errcheck-bound library does.
+    Install it with cp211x_HID_UART.SetLibrary() or pass it as Open(backend=...).
+    """
+
+    def __init__(self, devices=None):
+        if devices is None:
+            devices = [SimulatedDevice()]
+        self.devices = list(devices)
+        self._handles = {}
+        self._stale = set()              # handles of devices that were Reset
+        self._next_handle = itertools.count(0x1000)
+        self._faults = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    # ------------------------------------------------------------------
+    # Error injection
+
+    def fail(self, function, status, count=1):
+        """Makes the next count calls of function (e.g. 'HidUart_Read') fail with status."""
+        with self._lock:
+            self._faults[function] = [status, count]
+
+    def clear_faults(self):
+        with self._lock:
+            self._faults.clear()
+
+    def _fault(self, function):
+        if not self._faults:
+            return HID_UART_SUCCESS
+        with self._lock:
+            fault = self._faults.get(function)
+            if fault is None:
+                return HID_UART_SUCCESS
+            fault[1] -= 1
+            if fault[1] <= 0:
+                del self._faults[function]
+            return fault[0]
+
+    def _check(self, function):
+        self.calls += 1
+        status = self._fault(function)
+        if status != HID_UART_SUCCESS:
+            raise HidUartError(status)
+
+    # ------------------------------------------------------------------
+    # Helpers
+
+    def _matching(self, vid, pid):
+        return [d for d in self.devices
+                if (not vid or d.vid == vid) and (not pid or d.pid == pid)]
+
+    def _indexed(self, index, vid, pid):
+        devices = self._matching(vid, pid)
+        if not 0 <= index < len(devices):
+            raise HidUartError(HID_UART_DEVICE_NOT_FOUND)
+        return devices[index]
+
+    def _device(self, handle):
+        handle = getattr(handle, 'value', handle)
+        device = self._handles.get(handle)
+        if device is None:
+            raise HidUartError(HID_UART_INVALID_HANDLE)
+        if handle in self._stale:
+            raise HidUartError(HID_UART_DEVICE_IO_FAILED)
+        return device
+
+    @staticmethod
+    def _string(device, opt):
+        if opt == HID_UART.VID_STR:
+            return "{:04X}".format(device.vid)
+        if opt == HID_UART.PID_STR:
+            return "{:04X}".format(device.pid)
+        if opt == HID_UART.PATH_STR:
+            return "sim:" + device.serial
+        if opt == HID_UART.SERIAL_STR:
+            return device.serial
+        if opt == HID_UART.MANUFACTURER_STR:
+            return device.manufacturer
+        if opt == HID_UART.PRODUCT_STR:
+            return device.product
+        raise HidUartError(HID_UART_INVALID_PARAMETER)
+
+    @staticmethod
+    def _copy_string(buf, value):
+        data = value.encode()[:511] + b"\0"
+        memoryview(buf).cast('B')[:len(data)] = data
+
+    # ------------------------------------------------------------------
+    # Library functions
+
+    def HidUart_GetNumDevices(self, numDevices, vid, pid):
+        self._check("HidUart_GetNumDevices")
+        _deref(numDevices).value = len(self._matching(vid, pid))
+        return HID_UART_SUCCESS
+
+    def HidUart_GetAttributes(self, deviceNum, vid, pid, deviceVid, devicePid, deviceRelease):
+        self._check("HidUart_GetAttributes")
+        device = self._indexed(deviceNum, vid, pid)
+        if device.opened:
+            raise HidUartError(HID_UART_DEVICE_ACCESS_ERROR)
+        _deref(deviceVid).value = device.vid
+        _deref(devicePid).value = device.pid
+        _deref(deviceRelease).value = device.release
+        return HID_UART_SUCCESS
+
+    def HidUart_GetString(self, deviceNum, vid, pid, deviceString, options):
+        self._check("HidUart_GetString")
+        device = self._indexed(deviceNum, vid, pid)
+        if device.opened:
+            raise HidUartError(HID_UART_DEVICE_ACCESS_ERROR)
+        self._copy_string(deviceString, self._string(device, options))
+        return HID_UART_SUCCESS
+
+    def HidUart_GetLibraryVersion(self, major, minor, release):
+        self._check("HidUart_GetLibraryVersion")
+        _deref(major).value, _deref(minor).value, _deref(release).value = 6, 7, 1
+        return HID_UART_SUCCESS
+
+    def HidUart_GetHidLibraryVersion(self, major, minor, release):
+        self._check("HidUart_GetHidLibraryVersion")
+        _deref(major).value, _deref(minor).value, _deref(release).value = 1, 10, 1
+        return HID_UART_SUCCESS
+
+    def HidUart_Open(self, device, deviceNum, vid, pid):
+        self._check("HidUart_Open")
+        dev = self._indexed(deviceNum, vid, pid)
+        if dev.opened:
+            raise HidUartError(HID_UART_DEVICE_ACCESS_ERROR)
+        dev.opened = True
+        handle = next(self._next_handle)
+        self._handles[handle] = dev
+        _deref(device).value = handle
+        return HID_UART_SUCCESS
+
+    def HidUart_Close(self, device):
+        self._check("HidUart_Close")
+        handle = getattr(device, 'value', device)
+        dev = self._handles.pop(handle, None)
+        if dev is None:
+            raise HidUartError(HID_UART_INVALID_HANDLE)
+        if handle in self._stale:
+            self._stale.discard(handle)
+        else:
+            dev.opened = False
+        return HID_UART_SUCCESS
+
+    def HidUart_IsOpened(self, device, opened):
+        self._check("HidUart_IsOpened")
+        handle = getattr(device, 'value', device)
+        _deref(opened).value = int(handle in self._handles and handle not in self._stale)
+        return HID_UART_SUCCESS
+
+    def HidUart_GetPartNumber(self, device, partNumber, version):
+        self._check("HidUart_GetPartNumber")
+        dev = self._device(device)
+        _deref(partNumber).value = dev.part_number
+        _deref(version).value = dev.version
+        return HID_UART_SUCCESS
+
+    def HidUart_GetOpenedAttributes(self, device, deviceVid, devicePid, deviceRelease):
+        self._check("HidUart_GetOpenedAttributes")
+        dev = self._device(device)
+        _deref(deviceVid).value = dev.vid
+        _deref(devicePid).value = dev.pid
+        _deref(deviceRelease).value = dev.release
+        return HID_UART_SUCCESS
+
+    def HidUart_GetOpenedString(self, device, deviceString, options):
+        self._check("HidUart_GetOpenedString")
+        self._copy_string(deviceString, self._string(self._device(device), options))
+        return HID_UART_SUCCESS
+
+    def HidUart_SetUartEnable(self, device, enable):
+        self._check("HidUart_SetUartEnable")
+        self._device(device).enabled = bool(enable)
+        return HID_UART_SUCCESS
+
+    def HidUart_GetUartEnable(self, device, enable):
+        self._check("HidUart_GetUartEnable")
+        _deref(enable).value = int(self._device(device).enabled)
+        return HID_UART_SUCCESS
+
+    def HidUart_FlushBuffers(self, device, flushTransmit, flushReceive):
+        self._check("HidUart_FlushBuffers")
+        self._device(device).flush(flushTransmit, flushReceive)
+        return HID_UART_SUCCESS
+
+    def HidUart_CancelIo(self, device):
+        self._check("HidUart_CancelIo")
+        self._device(device).cancel_io()
+        return HID_UART_SUCCESS
+
+    def HidUart_SetTimeouts(self, device, readTimeout, writeTimeout):
+        self._check("HidUart_SetTimeouts")
+        dev = self._device(device)
+        dev.read_timeout = readTimeout
+        dev.write_timeout = writeTimeout
+        return HID_UART_SUCCESS
+
+    def HidUart_GetTimeouts(self, device, readTimeout, writeTimeout):
+        self._check("HidUart_GetTimeouts")
+        dev = self._device(device)
+        _deref(readTimeout).value = dev.read_timeout
+        _deref(writeTimeout).value = dev.write_timeout
+        return HID_UART_SUCCESS
+
+    def HidUart_SetUartConfig(self, device, baudRate, dataBits, parity, stopBits, flowControl):
+        self._check("HidUart_SetUartConfig")
+        if not 300 <= baudRate <= 1000000 or dataBits not in _DATA_BITS \
+                or parity > HID_UART.SPACE_PARITY or stopBits > HID_UART.LONG_STOP_BIT \
+                or flowControl > HID_UART.RTS_CTS_FLOW_CONTROL:
+            raise HidUartError(HID_UART_INVALID_PARAMETER)
+        self._device(device).config = [baudRate, dataBits, parity, stopBits, flowControl]
+        return HID_UART_SUCCESS
+
+    def HidUart_GetUartConfig(self, device, baudRate, dataBits, parity, stopBits, flowControl):
+        self._check("HidUart_GetUartConfig")
+        baud, data, par, stop, flow = self._device(device).config
+        _deref(baudRate).value = baud
+        _deref(dataBits).value = data
+        _deref(parity).value = par
+        _deref(stopBits).value = stop
+        _deref(flowControl).value = flow
+        return HID_UART_SUCCESS
+
+    def HidUart_GetUartStatus(self, device, transmitFifoSize, receiveFifoSize,
+                              errorStatus, lineBreakStatus):
+        self._check("HidUart_GetUartStatus")
+        dev = self._device(device)
+        now = time.monotonic()
+        with dev._cond:
+            _deref(transmitFifoSize).value = dev._tx_level(now)
+            _deref(receiveFifoSize).value = min(dev._rx_available(now), RX_FIFO_SIZE)
+        _deref(errorStatus).value = dev.error_status
+        _deref(lineBreakStatus).value = int(dev.in_break)
+        dev.error_status = 0
+        return HID_UART_SUCCESS
+
+    def HidUart_Reset(self, device):
+        self._check("HidUart_Reset")
+        dev = self._device(device)
+        dev.resets += 1
+        dev.flush(True, True)
+        # The device re-enumerates: the handle only remains valid for Close
+        dev.opened = False
+        self._stale.add(getattr(device, 'value', device))
+        return HID_UART_SUCCESS
+
+    def HidUart_StartBreak(self, device, duration):
+        self._check("HidUart_StartBreak")
+        self._device(device).in_break = True
+        return HID_UART_SUCCESS
+
+    def HidUart_StopBreak(self, device):
+        self._check("HidUart_StopBreak")
+        self._device(device).in_break = False
+        return HID_UART_SUCCESS
+
+    def HidUart_ReadLatch(self, device, latchValue):
+        self._check("HidUart_ReadLatch")
+        _deref(latchValue).value = self._device(device).latch
+        return HID_UART_SUCCESS
+
+    def HidUart_WriteLatch(self, device, latchValue, latchMask):
+        self._check("HidUart_WriteLatch")
+        dev = self._device(device)
+        dev.latch = (dev.latch & ~latchMask) | (latchValue & latchMask)
+        return HID_UART_SUCCESS
+
+    def HidUart_Read(self, device, buffer, numBytesToRead, numBytesRead):
+        self.calls += 1
+        count = _deref(numBytesRead)
+        count.value = 0
+        status = self._fault("HidUart_Read")
+        if status != HID_UART_SUCCESS:
+            return status
+        handle = getattr(device, 'value', device)
+        dev = self._handles.get(handle)
+        if dev is None:
+            return HID_UART_INVALID_HANDLE
+        if handle in self._stale:
+            return HID_UART_DEVICE_IO_FAILED
+        if not numBytesToRead:
+            return HID_UART_SUCCESS
+        count.value, status = dev.read(memoryview(buffer).cast('B'), numBytesToRead)
+        return status
+
+    def HidUart_Write(self, device, buffer, numBytesToWrite, numBytesWritten):
+        self.calls += 1
+        count = _deref(numBytesWritten)
+        count.value = 0
+        status = self._fault("HidUart_Write")
+        if status != HID_UART_SUCCESS:
+            return status
+        handle = getattr(device, 'value', device)
+        dev = self._handles.get(handle)
+        if dev is None:
+            return HID_UART_INVALID_HANDLE
+        if handle in self._stale:
+            return HID_UART_DEVICE_IO_FAILED
+        if not numBytesToWrite:
+            return HID_UART_SUCCESS
+        count.value, status = dev.write(memoryview(buffer).cast('B'), numBytesToWrite)
+        return status
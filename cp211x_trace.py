@@ -0,0 +1,696 @@
+#!/usr/bin/env python3
+"""
+Binary call traces of the SLABHIDtoUART entry points, and their replay.
+
+A TraceRecorder wraps the loaded library (or an installed stand-in) and
+appends every HidUart_* call to a trace file: function, device, status,
+scalar arguments, out-parameter values, data payloads (Read/Write buffers,
+strings) and monotonic timestamps. Records are batched in memory and
+written every buffer_size bytes.
+
+    file header   b"CP2TRC1\\0" + <QQH (monotonic_ns, time_ns, function count)
+                  + the function names, each NUL-terminated
+    record        <QIHHiBI (start monotonic_ns, duration ns, function,
+                  device, status, value count, payload length)
+                  + value count * <q + payload bytes
+
+Devices are numbered in the order they were opened; calls without a handle
+use device 0xFFFF. Values follow the C prototype: each scalar argument and
+out-parameter after the handle, in order (buffers go to the payload).
+
+    recorder = cp211x_trace.record("run.trace")
+    hu = HidUartDevice()
+    hu.Open(serial="0001A2B3")
+    ...
+    recorder.close()
+
+A TraceReplay backend feeds a trace back through HidUartDevice, either as
+fast as possible (speed=None) or at the original timing scaled by speed:
+
+    replay = TraceReplay("run.trace", speed=None)
+    hu = HidUartDevice()
+    hu.Open(0, backend=replay)
+    ...
+
+In strict mode (the default) every call must match the next record's
+function, device and scalar arguments, and gets that record's status,
+out-values and payload. Enumeration calls (GetNumDevices, GetString,
+GetAttributes, library versions) are matched by their arguments instead
+of their position, since DeviceIndex caches them. With strict=False the
+trace's RX data is delivered to whatever reads are made, in any sizes,
+and all other calls are answered from the latest matching record, which
+suits running parsers offline on a recorded session.
+
+Command line:
+    python3 cp211x_trace.py dump run.trace [--limit N]
+    python3 cp211x_trace.py summary run.trace
+"""
+
+import argparse
+import bisect
+import ctypes as ct
+import mmap
+import struct
+import sys
+import threading
+import time
+
+import cp211x_HID_UART
+from cp211x_HID_UART import (HID_UART_READ_TIMED_OUT,
+                             HID_UART_STATUS_DESC, HID_UART_SUCCESS, HidUartError, SetLibrary,
+                             _PROTOTYPES, _PTR, _deref)
+
+__all__ = ['TraceWriter', 'TraceReader', 'TraceRecord', 'TraceRecorder', 'TraceReplay',
+           'TraceFormatError', 'TraceReplayError', 'TraceExhausted',
+           'record', 'stop', 'record_device']
+
+MAGIC = b"CP2TRC1\0"
+FILE_HEADER = struct.Struct("<8sQQH")
+RECORD_HEADER = struct.Struct("<QIHHiBI")
+VALUE = struct.Struct("<q")
+
+NO_DEVICE = 0xFFFF
+_MAX_DURATION = 0xFFFFFFFF
+
+# Functions returning their status instead of raising (library convention)
+_STATUS_FUNCTIONS = frozenset(["HidUart_Read", "HidUart_Write"])
+# Buffer argument index of functions that move data; the payload is its contents
+_BUFFER_ARGS = {"HidUart_Read": 1, "HidUart_Write": 1,
+                "HidUart_GetString": 3, "HidUart_GetOpenedString": 1}
+# Entry points that take no device handle
+_UNBOUND_FUNCTIONS = frozenset([
+    "HidUart_GetNumDevices", "HidUart_GetAttributes", "HidUart_GetString",
+    "HidUart_GetLibraryVersion", "HidUart_GetHidLibraryVersion", "HidUart_Open"])
+# Calls answered by argument rather than position on replay
+_ENUMERATION_FUNCTIONS = frozenset([
+    "HidUart_GetNumDevices", "HidUart_GetAttributes", "HidUart_GetString",
+    "HidUart_GetLibraryVersion", "HidUart_GetHidLibraryVersion"])
+
+
+class TraceFormatError(Exception):
+    """Raised for files that are not trace files."""
+
+
+class TraceReplayError(Exception):
+    """Raised when a replayed call does not match the trace."""
+
+
+class TraceExhausted(TraceReplayError):
+    """Raised by a replayed call after the last record."""
+
+
+class _Plan(object):
+    """Argument layout of one entry point, derived from its C prototype."""
+
+    __slots__ = ('name', 'bound', 'values', 'buffer', 'returns_status')
+
+    def __init__(self, name):
+        prototype = _PROTOTYPES[name]
+        self.name = name
+        self.bound = name not in _UNBOUND_FUNCTIONS
+        self.buffer = _BUFFER_ARGS.get(name)
+        self.returns_status = name in _STATUS_FUNCTIONS
+        values = []
+        for index, argtype in enumerate(prototype):
+            if index == 0 and (self.bound or name == "HidUart_Open"):
+                continue
+            if index == self.buffer:
+                continue
+            values.append((index, argtype is _PTR))
+        self.values = tuple(values)      # (argument index, is out-parameter)
+
+    def inputs(self, values):
+        """Returns the scalar input values among a record's values."""
+        return tuple(v for v, (_, out) in zip(values, self.values) if not out)
+
+
+_PLANS = {name: _Plan(name) for name in _PROTOTYPES}
+
+
+def _scalar(arg):
+    return int(getattr(arg, 'value', arg) or 0)
+
+
+def _handle_value(arg):
+    return getattr(arg, 'value', arg) or 0
+
+
+def status_name(status):
+    return HID_UART_STATUS_DESC.get(status, "0x{:02X}".format(status))
+
+
+class TraceRecord(object):
+    """One recorded call; payload is a memoryview into the trace file."""
+
+    __slots__ = ('start_ns', 'duration_ns', 'function', 'device', 'status', 'values', 'payload')
+
+    def __init__(self, start_ns, duration_ns, function, device, status, values, payload):
+        self.start_ns = start_ns
+        self.duration_ns = duration_ns
+        self.function = function
+        self.device = device
+        self.status = status
+        self.values = values
+        self.payload = payload
+
+    @property
+    def end_ns(self):
+        return self.start_ns + self.duration_ns
+
+    def __repr__(self):
+        return "TraceRecord({}, device={}, status={}, values={}, payload={} bytes)".format(
+            self.function, self.device, status_name(self.status), list(self.values),
+            len(self.payload))
+
+
+class TraceWriter(object):
+    """
+    Writes trace records to path, buffering up to buffer_size bytes.
+
+    Thread-safe; records appear in the order the calls completed.
+    """
+
+    def __init__(self, path, buffer_size=256 << 10):
+        self.path = path
+        self.buffer_size = buffer_size
+        self.functions = tuple(_PROTOTYPES)
+        self._ids = {name: i for i, name in enumerate(self.functions)}
+        self._pending = bytearray()
+        self._lock = threading.Lock()
+        self._file = open(path, "wb")
+        start = time.monotonic_ns()
+        self._file.write(FILE_HEADER.pack(MAGIC, start, time.time_ns(), len(self.functions)))
+        self._file.write(b"".join(name.encode() + b"\0" for name in self.functions))
+        self.records = 0
+        self.payload_bytes = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write(self, start_ns, duration_ns, function, device, status, values, payload=b""):
+        """Appends one record; function is a HidUart_* name."""
+        header = RECORD_HEADER.pack(start_ns, min(duration_ns, _MAX_DURATION),
+                                    self._ids[function], device, status, len(values),
+                                    len(payload))
+        with self._lock:
+            pending = self._pending
+            pending += header
+            for value in values:
+                pending += VALUE.pack(value)
+            pending += payload
+            self.records += 1
+            self.payload_bytes += len(payload)
+            if len(pending) >= self.buffer_size:
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if self._file is None:
+            return
+        if self._pending:
+            self._file.write(self._pending)
+            del self._pending[:]
+        self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._flush_locked()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class TraceReader(object):
+    """
+    Reads a trace file through mmap; payloads are views into the mapping.
+
+    A truncated last record (a recorder that did not close) ends the trace.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            size = f.seek(0, 2)
+            if size < FILE_HEADER.size:
+                raise TraceFormatError("not a trace file: " + path)
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._map)
+        magic, self.start_ns, self.start_time_ns, count = FILE_HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            self.close()
+            raise TraceFormatError("not a trace file: " + path)
+        offset = FILE_HEADER.size
+        names = []
+        for _ in range(count):
+            end = self._map.find(b"\0", offset)
+            if end < 0:
+                self.close()
+                raise TraceFormatError("truncated trace header: " + path)
+            names.append(bytes(self._map[offset:end]).decode())
+            offset = end + 1
+        self.functions = tuple(names)
+        self.data_offset = offset
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Unmaps the file, or leaves that to the last TraceRecord payload still in use."""
+        if self._map is not None:
+            self._view.release()
+            try:
+                self._map.close()
+            except BufferError:
+                pass
+            self._map = None
+
+    def offsets(self):
+        """Yields (offset, function index, device) for every complete record."""
+        data = self._map
+        size = len(data)
+        offset = self.data_offset
+        unpack = RECORD_HEADER.unpack_from
+        while offset + RECORD_HEADER.size <= size:
+            _, _, function, device, _, nvalues, length = unpack(data, offset)
+            end = offset + RECORD_HEADER.size + nvalues * VALUE.size + length
+            if end > size:
+                break
+            yield offset, function, device
+            offset = end
+
+    def record_at(self, offset):
+        start, duration, function, device, status, nvalues, length = \
+            RECORD_HEADER.unpack_from(self._map, offset)
+        offset += RECORD_HEADER.size
+        values = struct.unpack_from("<{}q".format(nvalues), self._map, offset)
+        offset += nvalues * VALUE.size
+        return TraceRecord(start, duration, self.functions[function], device, status, values,
+                           self._view[offset:offset + length])
+
+    def __iter__(self):
+        for offset, _, _ in self.offsets():
+            yield self.record_at(offset)
+
+    def summary(self):
+        """Returns {function: [calls, failed calls, payload bytes, total ns]} and the span in ns."""
+        totals = {}
+        first = last = None
+        for rec in self:
+            t = totals.setdefault(rec.function, [0, 0, 0, 0])
+            t[0] += 1
+            if rec.status != HID_UART_SUCCESS and rec.status != HID_UART_READ_TIMED_OUT:
+                t[1] += 1
+            t[2] += len(rec.payload)
+            t[3] += rec.duration_ns
+            if first is None:
+                first = rec.start_ns
+            last = rec.end_ns
+        return totals, (last - first if first is not None else 0)
+
+
+class TraceRecorder(object):
+    """
+    Library proxy that records every HidUart_* call into a TraceWriter.
+
+    Functions not in the C prototype table are passed through unrecorded.
+    """
+
+    def __init__(self, lib, writer):
+        self.library = lib
+        self.writer = writer
+        self._slots = {}
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        if not name.startswith("HidUart_"):
+            raise AttributeError(name)
+        fn = getattr(self.library, name)
+        plan = _PLANS.get(name)
+        wrapper = fn if plan is None else self._wrap(plan, fn)
+        setattr(self, name, wrapper)
+        return wrapper
+
+    def close(self):
+        """Flushes and closes the trace; uninstalls the recorder if record() installed it."""
+        if cp211x_HID_UART._DLL is self:
+            SetLibrary(self.library)
+        self.writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _slot(self, handle):
+        slot = self._slots.get(handle)
+        if slot is None:
+            with self._lock:
+                slot = self._slots.setdefault(handle, len(self._slots))
+        return slot
+
+    def _wrap(self, plan, fn):
+        name = plan.name
+        write = self.writer.write
+        monotonic_ns = time.monotonic_ns
+        value_args = plan.values
+        buffer_arg = plan.buffer
+        returns_status = plan.returns_status
+        is_open = name == "HidUart_Open"
+        slots = self._slots
+
+        def call(*args):
+            error = None
+            start = monotonic_ns()
+            try:
+                result = fn(*args)
+                status = result if returns_status else HID_UART_SUCCESS
+            except HidUartError as e:
+                result = None
+                status = e.status
+                error = e
+            duration = monotonic_ns() - start
+            if is_open:
+                device = self._slot(_handle_value(_deref(args[0]))) if error is None else NO_DEVICE
+                # Reopening reuses the handle slot of a closed device
+            elif plan.bound:
+                handle = _handle_value(args[0])
+                device = slots.get(handle)
+                if device is None:
+                    device = self._slot(handle) if handle else NO_DEVICE
+            else:
+                device = NO_DEVICE
+            values = [_deref(args[i]).value or 0 if out else _scalar(args[i])
+                      for i, out in value_args]
+            payload = b""
+            if buffer_arg is not None:
+                payload = _buffer_payload(name, args, values)
+            write(start, duration, name, device, status, values, payload)
+            if error is not None:
+                raise error
+            return result
+        call.__name__ = name
+        return call
+
+
+def _buffer_payload(name, args, values):
+    buf = args[_BUFFER_ARGS[name]]
+    if name == "HidUart_Read":
+        count = min(values[1], values[0])
+    elif name == "HidUart_Write":
+        count = values[0]
+    else:
+        return _deref(buf).value        # NUL-terminated string buffer
+    if not count or buf is None:
+        return b""
+    if isinstance(buf, bytes):
+        return buf[:count]
+    return ct.string_at(ct.addressof(_deref(buf)), count)
+
+
+def _fill_buffer(buf, payload, count):
+    if count and buf is not None:
+        ct.memmove(ct.addressof(_deref(buf)), bytes(payload[:count]), count)
+
+
+class TraceReplay(object):
+    """
+    HidUart_* stand-in that answers calls from a trace (path or TraceReader).
+
+    speed None replays as fast as possible; otherwise each call returns no
+    earlier than its recorded completion time divided by speed, counted from
+    the first replayed call. See the module docstring for strict=False.
+    Replaying calls from several threads is only deterministic when the
+    recording's interleaving is reproduced.
+    """
+
+    def __init__(self, trace, speed=None, strict=True):
+        self.reader = trace if isinstance(trace, TraceReader) else TraceReader(trace)
+        self.speed = speed
+        self.strict = strict
+        self._lock = threading.RLock()
+        self._offsets = []
+        self._by_function = {}          # function -> [record positions]
+        self._enumeration = {}          # (function, inputs) -> first record
+        self._attach = []               # devices recorded without their Open (record_device)
+        functions = self.reader.functions
+        opened = set()
+        for position, (offset, function, device) in enumerate(self.reader.offsets()):
+            name = functions[function]
+            self._offsets.append(offset)
+            self._by_function.setdefault(name, []).append(position)
+            if name == "HidUart_Open":
+                opened.add(device)
+            elif device != NO_DEVICE and device not in opened and device not in self._attach:
+                self._attach.append(device)
+        for name in _ENUMERATION_FUNCTIONS:
+            for position in self._by_function.get(name, ()):
+                rec = self._record(position)
+                self._enumeration.setdefault((name, _PLANS[name].inputs(rec.values)), rec)
+        self._position = 0              # next record (strict) / records consumed so far
+        self._rx = bytearray()          # strict=False: RX data not yet delivered
+        self._origin = None
+        self.calls = 0
+
+    def __len__(self):
+        return len(self._offsets)
+
+    @property
+    def remaining(self):
+        """Records not yet replayed."""
+        return len(self._offsets) - self._position
+
+    def close(self):
+        self.reader.close()
+
+    def _record(self, position):
+        return self.reader.record_at(self._offsets[position])
+
+    def __getattr__(self, name):
+        plan = _PLANS.get(name)
+        if plan is None:
+            raise AttributeError(name)
+
+        def call(*args):
+            with self._lock:
+                self.calls += 1
+                if self.strict:
+                    rec = self._next_strict(plan, args)
+                else:
+                    rec = self._next_loose(plan, args)
+                    if rec is None:     # Read/Write answered from the RX stream
+                        return self._loose_transfer(plan, args)
+                self._wait(rec)
+            return self._apply(plan, rec, args)
+        call.__name__ = name
+        setattr(self, name, call)
+        return call
+
+    def _wait(self, rec):
+        if self.speed is None:
+            return
+        now = time.monotonic_ns()
+        if self._origin is None:
+            self._origin = now - int((rec.end_ns - self.reader.start_ns) / self.speed)
+        delay = self._origin + (rec.end_ns - self.reader.start_ns) / self.speed - now
+        if delay > 0:
+            time.sleep(delay / 1e9)
+
+    def _device(self, plan, args):
+        if not plan.bound:
+            return NO_DEVICE
+        handle = _handle_value(args[0])
+        return handle - 1 if handle else NO_DEVICE
+
+    def _next_strict(self, plan, args):
+        name = plan.name
+        inputs = tuple(_scalar(args[i]) for i, out in plan.values if not out)
+        if name in _ENUMERATION_FUNCTIONS:
+            if self._position < len(self._offsets):
+                rec = self._record(self._position)
+                if rec.function == name and plan.inputs(rec.values) == inputs:
+                    self._position += 1
+                    return rec
+            rec = self._enumeration.get((name, inputs))
+            if rec is None:
+                raise TraceReplayError("{}{} was not recorded".format(name, inputs))
+            return rec
+        while True:
+            if self._position >= len(self._offsets):
+                raise TraceExhausted("trace ended before {}".format(name))
+            rec = self._record(self._position)
+            if rec.function not in _ENUMERATION_FUNCTIONS:
+                break
+            self._position += 1          # enumeration the replaying code served from a cache
+        if name == "HidUart_Open" and rec.function != name and self._attach:
+            # Hand out a device whose recording started after it was opened
+            return TraceRecord(rec.start_ns, 0, name, self._attach.pop(0), HID_UART_SUCCESS,
+                               inputs, b"")
+        if rec.function != name:
+            raise TraceReplayError("record {}: expected {}, got {}".format(
+                self._position, rec.function, name))
+        device = self._device(plan, args)
+        if plan.bound and device != rec.device:
+            raise TraceReplayError("record {}: {} on device {}, expected device {}".format(
+                self._position, name, device, rec.device))
+        if plan.inputs(rec.values) != inputs:
+            raise TraceReplayError("record {}: {}{}, expected arguments {}".format(
+                self._position, name, inputs, plan.inputs(rec.values)))
+        self._position += 1
+        return rec
+
+    def _next_loose(self, plan, args):
+        name = plan.name
+        if name in _STATUS_FUNCTIONS:
+            return None
+        if name in _ENUMERATION_FUNCTIONS:
+            inputs = tuple(_scalar(args[i]) for i, out in plan.values if not out)
+            rec = self._enumeration.get((name, inputs))
+            if rec is not None:
+                return rec
+        positions = self._by_function.get(name)
+        if not positions:
+            if name == "HidUart_Open" and self._attach:
+                return TraceRecord(self.reader.start_ns, 0, name, self._attach[0],
+                                   HID_UART_SUCCESS, (), b"")
+            raise TraceReplayError("{} was not recorded".format(name))
+        # The latest record of this function up to the replay position, else the first
+        index = bisect.bisect_left(positions, self._position) - 1
+        return self._record(positions[max(index, 0)])
+
+    def _loose_transfer(self, plan, args):
+        size = _scalar(args[2])
+        if plan.name == "HidUart_Write":
+            _deref(args[3]).value = size
+            return HID_UART_SUCCESS
+        rx = self._rx
+        if not rx:
+            reads = self._by_function.get("HidUart_Read", ())
+            index = bisect.bisect_left(reads, self._position)
+            if index >= len(reads):
+                raise TraceExhausted("no more recorded reads")
+            rec = self._record(reads[index])
+            self._position = reads[index] + 1
+            rx += rec.payload
+            self._wait(rec)
+        count = min(size, len(rx))
+        _fill_buffer(args[1], rx, count)
+        del rx[:count]
+        _deref(args[3]).value = count
+        return HID_UART_SUCCESS if count == size else HID_UART_READ_TIMED_OUT
+
+    def _apply(self, plan, rec, args):
+        name = plan.name
+        if name == "HidUart_Open":
+            if rec.status == HID_UART_SUCCESS:
+                _deref(args[0]).value = rec.device + 1
+        for value, (index, out) in zip(rec.values, plan.values):
+            if out and args[index] is not None:
+                _deref(args[index]).value = value
+        if plan.buffer is not None:
+            buf = args[plan.buffer]
+            if name == "HidUart_Read":
+                _fill_buffer(buf, rec.payload, min(rec.values[1], len(rec.payload)))
+            elif name != "HidUart_Write" and rec.status == HID_UART_SUCCESS:
+                payload = bytes(rec.payload)
+                ct.memmove(ct.addressof(_deref(buf)), payload + b"\0", len(payload) + 1)
+        if plan.returns_status:
+            return rec.status
+        if rec.status != HID_UART_SUCCESS:
+            raise HidUartError(rec.status)
+        return HID_UART_SUCCESS
+
+
+_recorder = None
+
+
+def record(path, buffer_size=256 << 10):
+    """
+    Records the process-wide library into a new trace at path and returns the TraceRecorder.
+
+    Loads the vendor libraries if nothing is installed yet. Devices opened
+    before record() keep calling the unrecorded library (see record_device).
+    """
+    global _recorder
+    stop()
+    lib = cp211x_HID_UART._library()
+    _recorder = TraceRecorder(lib, TraceWriter(path, buffer_size))
+    SetLibrary(_recorder)
+    return _recorder
+
+
+def stop():
+    """Uninstalls and closes the recorder installed by record()."""
+    global _recorder
+    if _recorder is not None:
+        _recorder.close()
+        _recorder = None
+
+
+def record_device(device, writer):
+    """
+    Records one open HidUartDevice (e.g. one using a custom backend) into writer.
+
+    The trace then has no HidUart_Open for the device; on replay the first
+    Open that does not match a recorded one attaches to it.
+    """
+    recorder = TraceRecorder(device._dll, writer)
+    device._bind_library(recorder)
+    if device.handle.value:
+        recorder._slot(device.handle.value)
+    return recorder
+
+
+def _format_payload(payload, limit=32):
+    data = bytes(payload[:limit])
+    text = data.hex()
+    return text + ("..." if len(payload) > limit else "")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect CP211x call traces")
+    sub = parser.add_subparsers(dest="command", required=True)
+    dump = sub.add_parser("dump", help="print every record")
+    dump.add_argument("trace")
+    dump.add_argument("--limit", type=int, default=None, help="print at most this many records")
+    summary = sub.add_parser("summary", help="print per-function totals")
+    summary.add_argument("trace")
+    args = parser.parse_args(argv)
+
+    try:
+        reader = TraceReader(args.trace)
+    except (OSError, TraceFormatError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    with reader:
+        if args.command == "summary":
+            totals, span = reader.summary()
+            print("{:<32} {:>8} {:>7} {:>12} {:>12}".format(
+                "function", "calls", "failed", "bytes", "mean us"))
+            for name, (calls, failed, nbytes, ns) in sorted(totals.items()):
+                print("{:<32} {:>8} {:>7} {:>12} {:>12.1f}".format(
+                    name, calls, failed, nbytes, ns / calls / 1e3))
+            print("span {:.3f} s".format(span / 1e9))
+            return 0
+        for n, rec in enumerate(reader):
+            if args.limit is not None and n >= args.limit:
+                break
+            device = "-" if rec.device == NO_DEVICE else str(rec.device)
+            print("{:>14.6f} {:>9.1f}us  dev {:<3} {:<28} {:<26} {}{}".format(
+                (rec.start_ns - reader.start_ns) / 1e9, rec.duration_ns / 1e3, device,
+                rec.function, status_name(rec.status), list(rec.values),
+                "  " + _format_payload(rec.payload) if len(rec.payload) else ""))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Write coalescing for CP211x devices.
+
+Every HidUart_Write costs at least one USB interrupt transaction, and each
+CP2110 interrupt report carries at most 63 UART payload bytes. Scripts that
+send many short commands therefore spend most of their time on per-call
+overhead. A CoalescingWriter gathers small writes and hands them to the
+library as full reports:
+
+  - on size: as soon as a full report is buffered, all complete reports
+    are written and only the tail stays behind
+  - on flush(): everything buffered is written immediately
+  - on linger: a partial report is written once it has waited `linger`
+    seconds, so a lone command is never held back for long
+
+    with CoalescingWriter(hu, linger=0.002) as tx:
+        for cmd in commands:
+            tx.write(cmd)
+"""
+
+import threading
+import time
+
+from cp211x_HID_UART import HID_UART_MAX_REPORT_PAYLOAD, HidUartError, HidUartWriteTimeoutError
+
+__all__ = ['CoalescingWriter']
+
+
+class CoalescingWriter(object):
+    """
+    Buffered writer that coalesces small writes into report-sized transfers.
+
+    A write that times out raises HidUartWriteTimeoutError with the number of
+    bytes that went out; other library errors raise HidUartError. Either way
+    the unsent bytes stay at the front of the buffer so the next flush
+    retries them. After an error the linger thread stops retrying; the first
+    error it hit is raised from the next write() or flush(), and the write
+    after that re-arms the linger.
+    """
+
+    def __init__(self, device, linger=0.002, report_size=HID_UART_MAX_REPORT_PAYLOAD,
+                 max_buffer=64 * 1024):
+        self.device = device
+        self.linger = linger
+        self.report_size = report_size
+        self.max_buffer = max_buffer
+        self._buffer = bytearray()
+        self._deadline = None
+        self._error = None
+        self._closed = False
+        self._lock = threading.Condition()
+        self._io_lock = threading.Lock()
+        self._thread = None
+        if linger is not None:
+            self._thread = threading.Thread(
+                target=self._linger_loop, name="CoalescingWriter", daemon=True)
+            self._thread.start()
+
+        # Counters
+        self.transactions = 0
+        self.reports = 0
+        self.bytes_written = 0
+        self.timeouts = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    # ------------------------------------------------------------------
+
+    def write(self, data):
+        """Queues data for transmission and returns the number of bytes accepted."""
+        with self._lock:
+            self._check_error()
+            if self._closed:
+                raise ValueError("write to closed CoalescingWriter")
+            if self._deadline is None:
+                self._deadline = time.monotonic() + (self.linger or 0)
+                self._lock.notify()
+            self._buffer += data
+            pending = len(self._buffer)
+        if pending >= self.max_buffer:
+            self.flush()
+        elif pending >= self.report_size:
+            self._send(whole_reports=True)
+        return len(data)
+
+    def flush(self):
+        """Writes all buffered data now."""
+        with self._lock:
+            self._check_error()
+        self._send(whole_reports=False)
+
+    def close(self):
+        """Flushes buffered data and stops the linger thread."""
+        if self._closed:
+            return
+        try:
+            self.flush()
+        finally:
+            with self._lock:
+                self._closed = True
+                self._lock.notify()
+            if self._thread is not None:
+                self._thread.join()
+
+    def pending(self):
+        """Returns the number of buffered bytes not yet written."""
+        return len(self._buffer)
+
+    def stats(self):
+        """Returns the writer counters as a dict."""
+        return {
+            'transactions': self.transactions,
+            'reports': self.reports,
+            'bytes_written': self.bytes_written,
+            'timeouts': self.timeouts,
+            'pending': len(self._buffer),
+        }
+
+    # ------------------------------------------------------------------
+
+    def _check_error(self):
+        error = self._error
+        if error is not None:
+            self._error = None
+            raise error
+
+    def _send(self, whole_reports):
+        with self._io_lock:
+            with self._lock:
+                count = len(self._buffer)
+                if whole_reports:
+                    count -= count % self.report_size
+                if not count:
+                    return
+                chunk = bytes(self._buffer[:count])
+                del self._buffer[:count]
+                if not self._buffer:
+                    self._deadline = None
+            written = 0
+            try:
+                written = self.device.Write(chunk, raiseOnTimeout=True)
+            except HidUartError as e:
+                if isinstance(e, HidUartWriteTimeoutError):
+                    written = e.written
+                    self.timeouts += 1
+                with self._lock:
+                    self._buffer[:0] = chunk[written:]
+                    self._deadline = None
+                raise
+            finally:
+                self.transactions += 1
+                self.reports += -(-written // self.report_size)
+                self.bytes_written += written
+
+    def _linger_loop(self):
+        with self._lock:
+            while not self._closed:
+                if self._deadline is None:
+                    self._lock.wait()
+                    continue
+                remaining = self._deadline - time.monotonic()
+                if remaining > 0:
+                    self._lock.wait(remaining)
+                    continue
+                self._deadline = None
+                error = None
+                self._lock.release()
+                try:
+                    self._send(whole_reports=False)
+                except Exception as e:
+                    error = e
+                finally:
+                    self._lock.acquire()
+                if error is not None and self._error is None:
+                    self._error = error
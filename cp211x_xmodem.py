@@ -0,0 +1,648 @@
+#!/usr/bin/env python3
+"""
+XMODEM-1K and YMODEM file transfers over a HidUartDevice.
+
+ModemTransfer sends and receives XMODEM (CRC-16 or checksum, 128- and
+1024-byte blocks), YMODEM batches and, when the receiver asks for it with
+"G", streaming YMODEM-g:
+
+    xfer = ModemTransfer(hu)
+    stats = xfer.send_xmodem("bootloader.bin")
+    print(stats)                    # bytes/s and fraction of the line rate
+    xfer.send_ymodem(["app.bin", "config.txt"])
+    files = xfer.receive_ymodem("downloads")
+
+Blocks are assembled in one buffer reused for the whole transfer and go
+out with a single Write; a receiver reads each block with a single
+ReadInto sized to the frame. The CRC is binascii.crc_hqx, the table-driven
+CRC-16/XMODEM of the standard library. Each wait is derived from the
+configured line rate: the time the frame takes on the wire plus a
+turnaround allowance for the other side, which doubles on every retry.
+When SetUartConfig enabled RTS/CTS flow control, a receiver asks for
+streaming (no per-block ACKs) and writes may wait for the line as long as
+block_timeout.
+
+Command line:
+    python3 cp211x_xmodem.py send [--ymodem] [--serial S] [--baud B] [--rtscts] FILE...
+    python3 cp211x_xmodem.py receive [--ymodem] [--serial S] [--baud B] [--rtscts] [PATH]
+"""
+
+import argparse
+import binascii
+import contextlib
+import io
+import os
+import sys
+import time
+
+from cp211x_HID_UART import HID_UART, HidUartDevice, HidUartError, _uart_char_time
+
+__all__ = ['ModemTransfer', 'TransferStats', 'TransferError', 'crc16']
+
+SOH = 0x01
+STX = 0x02
+EOT = 0x04
+ACK = 0x06
+NAK = 0x15
+CAN = 0x18
+SUB = 0x1A
+CRC_REQUEST = 0x43          # 'C'
+STREAM_REQUEST = 0x47       # 'G'
+
+_ACK = bytes([ACK])
+_NAK = bytes([NAK])
+_EOT = bytes([EOT])
+_CANCEL = bytes([CAN] * 5)
+_SUB_PAD = bytes([SUB]) * 1024
+_NUL_PAD = bytes(1024)
+
+
+def crc16(data, crc=0):
+    """Returns the CRC-16/XMODEM (polynomial 0x1021, initial value 0) of data."""
+    return binascii.crc_hqx(data, crc)
+
+
+class TransferError(Exception):
+    """Raised when a transfer is cancelled or runs out of retries."""
+
+
+class TransferStats(object):
+    """
+    Transfer counters; rates are in bytes per second.
+
+    bytes       - file bytes sent or received (without padding)
+    blocks      - data blocks accepted by the receiver
+    files       - files completed (YMODEM)
+    retransmits - blocks sent again (sender) or NAKed (receiver)
+    timeouts    - waits for an ACK or a block that expired
+    elapsed     - seconds from the first request to the end of the transfer
+    line_rate   - bytes per second the UART configuration can carry
+    """
+
+    __slots__ = ('bytes', 'blocks', 'files', 'retransmits', 'timeouts', 'elapsed', 'line_rate')
+
+    def __init__(self, line_rate=0.0):
+        self.bytes = 0
+        self.blocks = 0
+        self.files = 0
+        self.retransmits = 0
+        self.timeouts = 0
+        self.elapsed = 0.0
+        self.line_rate = line_rate
+
+    @property
+    def bytes_per_s(self):
+        return self.bytes / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def efficiency(self):
+        """Effective throughput as a fraction of the line rate."""
+        return self.bytes_per_s / self.line_rate if self.line_rate else 0.0
+
+    def to_dict(self):
+        d = {name: getattr(self, name) for name in self.__slots__}
+        d['bytes_per_s'] = self.bytes_per_s
+        d['efficiency'] = self.efficiency
+        return d
+
+    def __repr__(self):
+        return "TransferStats(bytes={}, blocks={}, files={}, retransmits={}, timeouts={}, " \
+               "elapsed={:.3f}, bytes_per_s={:.0f}, efficiency={:.1%})".format(
+                   self.bytes, self.blocks, self.files, self.retransmits, self.timeouts,
+                   self.elapsed, self.bytes_per_s, self.efficiency)
+
+
+class ModemTransfer(object):
+    """
+    XMODEM/YMODEM engine bound to an open HidUartDevice (or ResilientSession).
+
+    turnaround is the time in seconds allowed for the other side to answer
+    after a frame has left the wire (receiver processing, USB latency); it
+    doubles on each retry up to block_timeout. retries limits how often one
+    block is sent again or NAKed. start_timeout bounds the wait for the
+    receiver's first request, request_interval the spacing of a receiver's
+    requests. streaming None asks for streaming (receiver side) only when
+    RTS/CTS flow control is enabled. progress(stats) is called after every
+    block.
+    """
+
+    def __init__(self, device, turnaround=0.25, retries=10, block_timeout=10.0,
+                 start_timeout=60.0, request_interval=1.0, streaming=None, progress=None):
+        self.device = device
+        self.turnaround = turnaround
+        self.retries = retries
+        self.block_timeout = block_timeout
+        self.start_timeout = start_timeout
+        self.request_interval = request_interval
+        self.streaming = streaming
+        self.progress = progress
+        self._frame = bytearray(3 + 1024 + 2)
+        self._view = memoryview(self._frame)
+        self._byte = bytearray(1)
+        self._char_time = 10.0 / 115200
+        self._flow = False
+        self._wto = 1000
+        self.stats = TransferStats()
+
+    # ------------------------------------------------------------------
+    # Session setup and line access
+
+    @contextlib.contextmanager
+    def _session(self):
+        hu = self.device
+        baud, data, parity, stop, flow = hu.GetUartConfig()
+        self._char_time = _uart_char_time(baud, data, parity, stop)
+        self._flow = flow == HID_UART.RTS_CTS_FLOW_CONTROL
+        # With flow control the line may stall; otherwise a frame drains at line rate
+        wait = self.block_timeout if self._flow else self._frame_time(len(self._frame)) + \
+            self.turnaround
+        self._wto = _ms(wait)
+        io_mode = hu.GetIoMode()[0]
+        if io_mode is not None:
+            hu.SetIoMode(None)
+        saved = hu.GetTimeouts()
+        self.stats = TransferStats(1.0 / self._char_time)
+        start = time.monotonic()
+        try:
+            yield self.stats
+        finally:
+            self.stats.elapsed = time.monotonic() - start
+            try:
+                hu.SetTimeouts(*saved)
+                if io_mode is not None:
+                    hu.SetIoMode(io_mode)
+            except HidUartError:
+                pass
+
+    def _frame_time(self, length):
+        return length * self._char_time
+
+    def _set_read_timeout(self, timeout):
+        hu = self.device
+        rto = _ms(timeout)
+        if rto != hu._rto or self._wto != hu._wto:
+            hu.SetTimeouts(rto, self._wto)
+
+    def _read(self, view, timeout):
+        """Reads len(view) bytes, waiting at most timeout seconds; returns the count."""
+        self._set_read_timeout(timeout)
+        return self.device.ReadInto(view)
+
+    def _getc(self, timeout):
+        """Returns the next received byte, or None after timeout seconds."""
+        if self._read(self._byte, timeout):
+            return self._byte[0]
+        return None
+
+    def _write(self, data):
+        hu = self.device
+        sent = hu.Write(data)
+        if sent < len(data):
+            deadline = time.monotonic() + self.block_timeout
+            view = memoryview(data)
+            while sent < len(data):
+                if time.monotonic() >= deadline:
+                    raise TransferError("write stalled after {} of {} bytes".format(
+                        sent, len(data)))
+                sent += hu.Write(view[sent:])
+
+    def _purge(self):
+        """Discards input until the line has been idle for a moment."""
+        idle = max(self._frame_time(64), 0.002) + 0.001
+        scratch = self._view[1:]
+        while self._read(scratch, idle):
+            pass
+
+    def _cancel(self, message):
+        try:
+            self._write(_CANCEL)
+        except (HidUartError, TransferError):
+            pass
+        raise TransferError(message)
+
+    def _cancelled(self):
+        """Checks for the second CAN of a cancel request (the first was just read)."""
+        return self._getc(self._frame_time(2) + self.turnaround) == CAN
+
+    def _report(self):
+        if self.progress is not None:
+            self.progress(self.stats)
+
+    # ------------------------------------------------------------------
+    # Frames
+
+    def _seal(self, seq, size, crc, pad=_SUB_PAD, used=None):
+        """Completes the block in the frame buffer (payload already at [3:3+used]); returns its length."""
+        view = self._view
+        if used is not None and used < size:
+            view[3 + used:3 + size] = pad[:size - used]
+        view[0] = STX if size == 1024 else SOH
+        view[1] = seq & 0xFF
+        view[2] = 0xFF - (seq & 0xFF)
+        payload = view[3:3 + size]
+        if crc:
+            value = binascii.crc_hqx(payload, 0)
+            view[3 + size] = value >> 8
+            view[4 + size] = value & 0xFF
+            return size + 5
+        view[3 + size] = sum(payload) & 0xFF
+        return size + 4
+
+    def _receive_frame(self, crc, timeout):
+        """
+        Reads one frame into the frame buffer.
+
+        Returns (EOT, None, 0), (SOH/STX, block number, size), (CAN, None, 0)
+        for a cancel request, or (None, None, 0) on timeout or a bad frame.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            c = self._getc(timeout)
+            if c is None:
+                return None, None, 0
+            if c == EOT:
+                return EOT, None, 0
+            if c == CAN and self._cancelled():
+                return CAN, None, 0
+            if c == SOH or c == STX:
+                break
+            timeout = deadline - time.monotonic()     # line noise: keep waiting
+            if timeout <= 0:
+                return None, None, 0
+        size = 1024 if c == STX else 128
+        rest = size + (4 if crc else 3)
+        view = self._view
+        view[0] = c
+        if self._read(view[1:1 + rest], self._frame_time(rest) + self.turnaround) < rest:
+            self._purge()
+            return None, None, 0
+        payload = view[3:3 + size]
+        if view[1] + view[2] != 0xFF:
+            return None, None, 0
+        if crc:
+            if binascii.crc_hqx(payload, 0) != (view[3 + size] << 8 | view[4 + size]):
+                return None, None, 0
+        elif sum(payload) & 0xFF != view[3 + size]:
+            return None, None, 0
+        return c, view[1], size
+
+    # ------------------------------------------------------------------
+    # Sending
+
+    def _wait_request(self):
+        """Waits for the receiver's request; returns (crc, streaming)."""
+        deadline = time.monotonic() + self.start_timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TransferError("receiver did not start the transfer")
+            c = self._getc(min(remaining, self.request_interval))
+            if c == CRC_REQUEST:
+                return True, False
+            if c == STREAM_REQUEST:
+                return True, True
+            if c == NAK:
+                return False, False
+            if c == CAN and self._cancelled():
+                raise TransferError("cancelled by receiver")
+
+    def _send_block(self, length, streaming):
+        frame = self._view[:length]
+        if streaming:
+            self._write(frame)
+            return
+        wire = self._frame_time(length + 1)
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self.stats.retransmits += 1
+            self._write(frame)
+            timeout = wire + min(self.turnaround * (1 << attempt), self.block_timeout)
+            deadline = time.monotonic() + timeout
+            while True:
+                c = self._getc(timeout)
+                if c == ACK:
+                    return
+                if c is None:
+                    self.stats.timeouts += 1
+                    break
+                if c == NAK:
+                    break
+                if c == CAN and self._cancelled():
+                    raise TransferError("cancelled by receiver")
+                timeout = deadline - time.monotonic()   # ignore line noise and repeated requests
+                if timeout <= 0:
+                    self.stats.timeouts += 1
+                    break
+        self._cancel("block {} not acknowledged after {} retries".format(
+            self._frame[1], self.retries))
+
+    def _send_data(self, reader, crc, streaming, size=None):
+        view = self._view
+        seq = 1
+        remaining = size
+        while remaining is None or remaining > 0:
+            want = 1024 if remaining is None else min(1024, remaining)
+            count = _readinto_full(reader, view[3:3 + want])
+            if not count:
+                break
+            length = self._seal(seq, 128 if count <= 128 else 1024, crc, used=count)
+            self._send_block(length, streaming)
+            seq += 1
+            self.stats.bytes += count
+            self.stats.blocks += 1
+            if remaining is not None:
+                remaining -= count
+            self._report()
+            if count < want:
+                break
+
+    def _send_eot(self, streaming):
+        # YMODEM receivers NAK the first EOT
+        for attempt in range(self.retries + 1):
+            self._write(_EOT)
+            c = self._getc(self._frame_time(2) + min(self.turnaround * (1 << attempt),
+                                                     self.block_timeout))
+            if c == ACK:
+                return
+            if c == CAN and self._cancelled():
+                raise TransferError("cancelled by receiver")
+            if c is None:
+                self.stats.timeouts += 1
+        self._cancel("end of transmission not acknowledged")
+
+    def send_xmodem(self, source):
+        """Sends source (bytes, a path or a binary file object) with XMODEM-1K; returns TransferStats."""
+        with _open_source(source) as (reader, _, _):
+            with self._session() as stats:
+                crc, streaming = self._wait_request()
+                self._send_data(reader, crc, streaming)
+                self._send_eot(streaming)
+                stats.files = 1
+        return self.stats
+
+    def send_ymodem(self, files):
+        """
+        Sends a YMODEM batch; returns TransferStats.
+
+        files holds paths, or (name, source) pairs where source is bytes or
+        a seekable binary file object.
+        """
+        with self._session() as stats:
+            for item in files:
+                name, source = (os.path.basename(item), item) if isinstance(item, str) else item
+                with _open_source(source) as (reader, size, mtime):
+                    crc, streaming = self._wait_request()
+                    if not crc:
+                        self._cancel("YMODEM requires CRC mode")
+                    header = name.encode() + b"\0" + (
+                        b"%d %o" % (size, mtime) if mtime else b"%d" % size)
+                    if len(header) > 1024:
+                        self._cancel("file name too long: " + name)
+                    self._view[3:3 + len(header)] = header
+                    length = self._seal(0, 128 if len(header) <= 128 else 1024, True,
+                                        _NUL_PAD, len(header))
+                    self._send_block(length, streaming)
+                    crc, streaming = self._wait_request()
+                    self._send_data(reader, crc, streaming, size)
+                    self._send_eot(streaming)
+                    stats.files += 1
+            crc, streaming = self._wait_request()
+            self._view[3:3 + 128] = _NUL_PAD[:128]
+            self._send_block(self._seal(0, 128, True), streaming)
+        return self.stats
+
+    # ------------------------------------------------------------------
+    # Receiving
+
+    def _use_streaming(self):
+        return self._flow if self.streaming is None else self.streaming
+
+    def _request(self, crc, streaming, fallback=False):
+        """
+        Sends the request character until a frame arrives; returns (crc, frame result).
+
+        With fallback, CRC requests switch to checksum mode (NAK) after three
+        unanswered tries, for plain XMODEM senders.
+        """
+        deadline = time.monotonic() + self.start_timeout
+        tries = 0
+        while time.monotonic() < deadline:
+            self._write(bytes([STREAM_REQUEST if streaming else CRC_REQUEST if crc else NAK]))
+            frame = self._receive_frame(crc, self.request_interval)
+            if frame[0] is not None:
+                return crc, frame
+            tries += 1
+            if fallback and crc and not streaming and tries >= 3:
+                crc = False
+        self._cancel("sender did not respond")
+
+    def _receive_data(self, writer, crc, streaming, frame, size=None, ymodem=False):
+        """Receives data blocks (the first already in frame) until EOT; returns the byte count."""
+        seq = 1
+        received = 0
+        errors = 0
+        eots = 0
+        view = self._view
+        while True:
+            kind, number, block = frame
+            if kind == SOH or kind == STX:
+                errors = 0
+                if number == seq & 0xFF:
+                    take = block if size is None else min(block, size - received)
+                    if take > 0:
+                        writer.write(view[3:3 + take])
+                        received += take
+                    seq += 1
+                    self.stats.bytes += max(take, 0)
+                    self.stats.blocks += 1
+                    if not streaming:
+                        self._write(_ACK)
+                    self._report()
+                elif number == (seq - 1) & 0xFF:
+                    if not streaming:
+                        self._write(_ACK)        # our ACK was lost: the sender repeated the block
+                else:
+                    self._cancel("block {} out of sequence (expected {})".format(number, seq & 0xFF))
+            elif kind == EOT:
+                if ymodem and not streaming and eots == 0:
+                    eots += 1
+                    self._write(_NAK)
+                else:
+                    self._write(_ACK)
+                    return received
+            elif kind == CAN:
+                raise TransferError("cancelled by sender")
+            else:
+                if streaming:
+                    self._cancel("error in streaming transfer")
+                errors += 1
+                if kind is None:
+                    self.stats.timeouts += 1
+                if errors > self.retries:
+                    self._cancel("too many errors at block {}".format(seq & 0xFF))
+                self.stats.retransmits += 1
+                self._write(_NAK)
+            frame = self._receive_frame(crc, self.block_timeout)
+
+    def receive_xmodem(self, destination=None):
+        """
+        Receives one XMODEM file into destination (a path or binary file object).
+
+        Without a destination the data is returned as bytes; otherwise the
+        TransferStats are returned. XMODEM carries no length, so the last
+        block's padding (SUB) is kept.
+        """
+        buffer = io.BytesIO() if destination is None else None
+        with _open_destination(destination if buffer is None else buffer) as writer:
+            with self._session() as stats:
+                streaming = self._use_streaming()
+                crc, frame = self._request(True, streaming, fallback=True)
+                self._receive_data(writer, crc, streaming, frame)
+                stats.files = 1
+        return buffer.getvalue() if buffer is not None else self.stats
+
+    def receive_ymodem(self, directory=None):
+        """
+        Receives a YMODEM batch.
+
+        With a directory the files are written there (base names only) and
+        their paths returned; otherwise a list of (name, bytes) is returned.
+        self.stats holds the counters afterwards.
+        """
+        results = []
+        with self._session() as stats:
+            streaming = self._use_streaming()
+            while True:
+                _, frame = self._request(True, streaming)
+                kind, number, block = frame
+                if kind == EOT:
+                    self._write(_ACK)           # EOT repeated after our final ACK was lost
+                    continue
+                if kind == CAN:
+                    raise TransferError("cancelled by sender")
+                if number != 0:
+                    self._cancel("expected a YMODEM header, got block {}".format(number))
+                header = bytes(self._view[3:3 + block])
+                name, _, info = header.partition(b"\0")
+                if not streaming:
+                    self._write(_ACK)
+                if not name:
+                    break
+                name = name.decode("utf-8", "replace")
+                fields = info.split(b"\0", 1)[0].split()
+                size = int(fields[0]) if fields and fields[0].isdigit() else None
+                if directory is not None:
+                    path = os.path.join(directory, os.path.basename(name))
+                    target = path
+                else:
+                    target = io.BytesIO()
+                with _open_destination(target) as writer:
+                    _, first = self._request(True, streaming)
+                    self._receive_data(writer, True, streaming, first, size, ymodem=True)
+                    if directory is None:
+                        results.append((name, target.getvalue()))
+                if directory is not None:
+                    results.append(path)
+                stats.files += 1
+        return results
+
+
+def _ms(seconds):
+    return max(1, int(seconds * 1000 + 0.999))
+
+
+def _readinto_full(reader, view):
+    got = 0
+    while got < len(view):
+        n = reader.readinto(view[got:])
+        if not n:
+            break
+        got += n
+    return got
+
+
+@contextlib.contextmanager
+def _open_source(source):
+    """Yields (reader, size, mtime) for bytes, a path or a binary file object."""
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            st = os.fstat(f.fileno())
+            yield f, st.st_size, int(st.st_mtime)
+    elif isinstance(source, (bytes, bytearray, memoryview)):
+        yield io.BytesIO(source), memoryview(source).nbytes, 0
+    else:
+        position = source.tell()
+        size = source.seek(0, io.SEEK_END) - position
+        source.seek(position)
+        yield source, size, 0
+
+
+@contextlib.contextmanager
+def _open_destination(destination):
+    if isinstance(destination, str):
+        with open(destination, "wb") as f:
+            yield f
+    else:
+        yield destination
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="XMODEM-1K/YMODEM transfers over a CP211x UART")
+    parser.add_argument("command", choices=("send", "receive"))
+    parser.add_argument("paths", nargs="*", help="files to send, or the output file (XMODEM) "
+                        "or directory (YMODEM, default: .) to receive into")
+    parser.add_argument("--ymodem", action="store_true", help="YMODEM batch instead of XMODEM-1K")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--serial", help="device serial number")
+    group.add_argument("--index", type=int, default=0, help="device index (default: 0)")
+    parser.add_argument("--baud", type=int, default=None)
+    parser.add_argument("--rtscts", action="store_true", help="enable RTS/CTS flow control")
+    parser.add_argument("--turnaround", type=float, default=0.25,
+                        help="seconds allowed for the other side to answer a frame")
+    args = parser.parse_args(argv)
+    if args.command == "send" and not args.paths:
+        parser.error("send needs at least one file")
+    if args.command == "receive" and not args.ymodem and len(args.paths) != 1:
+        parser.error("XMODEM receive needs one output file")
+
+    hu = HidUartDevice()
+    try:
+        if args.serial:
+            hu.Open(serial=args.serial)
+        else:
+            hu.Open(args.index)
+        baud, data, parity, stop, flow = hu.GetUartConfig()
+        if args.rtscts:
+            flow = HID_UART.RTS_CTS_FLOW_CONTROL
+        hu.SetUartConfig(args.baud or baud, data, parity, stop, flow)
+
+        def progress(stats):
+            print("\r{:>10} bytes  {:>8.1f} KB/s".format(
+                stats.bytes, stats.bytes / max(time.monotonic() - started, 1e-6) / 1e3),
+                end="", file=sys.stderr, flush=True)
+
+        started = time.monotonic()
+        xfer = ModemTransfer(hu, turnaround=args.turnaround, progress=progress)
+        if args.command == "send":
+            stats = xfer.send_ymodem(args.paths) if args.ymodem else xfer.send_xmodem(args.paths[0])
+        elif args.ymodem:
+            xfer.receive_ymodem(args.paths[0] if args.paths else ".")
+            stats = xfer.stats
+        else:
+            stats = xfer.receive_xmodem(args.paths[0])
+        print("\n{} bytes in {:.2f} s: {:.1f} KB/s, {:.1%} of the line rate, "
+              "{} retransmits".format(stats.bytes, stats.elapsed, stats.bytes_per_s / 1e3,
+                                      stats.efficiency, stats.retransmits), file=sys.stderr)
+        return 0
+    except TransferError as e:
+        print("\nTransfer failed:", e, file=sys.stderr)
+        return 1
+    except HidUartError as e:
+        print("Device Error:", e, "-", hex(e.status), file=sys.stderr)
+        return 1
+    finally:
+        hu.Close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,41 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cp211x_HID_UART as hu_mod
+from cp211x_sim import SimulatedHidUart, SimulatedDevice
+
+
+@pytest.fixture
+def simulate():
+    """Returns install(*devices): installs a SimulatedHidUart for the test and returns it."""
+    saved = hu_mod._DLL
+
+    def install(*devices):
+        if not devices:
+            devices = (SimulatedDevice(realtime=False),)
+        sim = SimulatedHidUart(list(devices))
+        hu_mod.SetLibrary(sim)
+        hu_mod.DeviceIndex._shared.clear()
+        return sim
+
+    yield install
+    hu_mod._DLL = saved
+    hu_mod.DeviceIndex._shared.clear()
+
+
+@pytest.fixture
+def loopback(simulate):
+    """An open HidUartDevice on a non-realtime loopback SimulatedDevice."""
+    device = SimulatedDevice(loopback=True, realtime=False)
+    sim = simulate(device)
+    hu = hu_mod.HidUartDevice()
+    hu.Open(0)
+    hu.SetTimeouts(20, 1000)
+    hu.sim = sim
+    hu.sim_device = device
+    yield hu
+    hu.Close()
@@ -0,0 +1,46 @@
+import asyncio
+
+from cp211x_asyncio import open_hid_uart_connection
+from cp211x_sim import SimulatedDevice
+
+
+def test_close_flushes_queued_data(simulate):
+    device = SimulatedDevice(realtime=True)
+    simulate(device)
+    payload = bytes(range(256)) * 8
+    cancelled_at = []
+    cancel_io = device.cancel_io
+
+    def record_cancel():
+        cancelled_at.append(len(device.tx_log))
+        cancel_io()
+
+    device.cancel_io = record_cancel
+
+    async def run():
+        reader, writer = await open_hid_uart_connection(0, baud=115200)
+        await asyncio.sleep(0.05)       # let the reader block in HidUart_Read
+        writer.write(payload)
+        await asyncio.sleep(0.01)
+        writer.close()
+        await writer.wait_closed()
+
+    asyncio.run(run())
+    assert bytes(device.tx_log) == payload
+    # The pending read is only aborted once the last write was accepted
+    assert cancelled_at and cancelled_at[0] == len(payload)
+
+
+def test_loopback_readline(simulate):
+    simulate(SimulatedDevice(loopback=True, realtime=False))
+
+    async def run():
+        reader, writer = await open_hid_uart_connection(0)
+        writer.write(b"hello\nworld\n")
+        await writer.drain()
+        lines = [await reader.readline(), await reader.readline()]
+        writer.close()
+        await writer.wait_closed()
+        return lines
+
+    assert asyncio.run(run()) == [b"hello\n", b"world\n"]
@@ -0,0 +1,100 @@
+import io
+import os
+import time
+
+from cp211x_capture import (FILE_HEADER, INDEX_SUFFIX, CaptureReader, CaptureWriter,
+                            UartCapture, main)
+from cp211x_rx import RxPump
+
+
+def _wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+def _records(count, size=100, start=1000):
+    return [(start + i * 1000, bytes([i % 256]) * size) for i in range(count)]
+
+
+def test_round_trip(tmp_path):
+    records = _records(50)
+    with CaptureWriter(str(tmp_path), prefix="board") as writer:
+        for stamp, data in records:
+            writer.write(data, stamp)
+    assert writer.records == 50 and writer.bytes_captured == 5000
+    reader = CaptureReader(str(tmp_path), prefix="board")
+    assert list(reader.records()) == records
+    assert list(reader.records(start=11000, end=21000)) == records[10:20]
+
+
+def test_rotation_keeps_newest_files(tmp_path):
+    records = _records(100)
+    with CaptureWriter(str(tmp_path), max_bytes=2048, max_files=3, buffer_size=1) as writer:
+        for stamp, data in records:
+            writer.write(data, stamp)
+    assert writer.files > 3
+    reader = CaptureReader(str(tmp_path))
+    assert len(reader.paths) == 3
+    kept = list(reader.records())
+    assert kept == records[-len(kept):]
+    for path in reader.paths:
+        assert os.path.exists(path + INDEX_SUFFIX)
+
+
+def test_index_seeks_to_timestamp(tmp_path):
+    records = _records(200)
+    with CaptureWriter(str(tmp_path), index_interval=1024) as writer:
+        for stamp, data in records:
+            writer.write(data, stamp)
+    reader = CaptureReader(str(tmp_path))
+    path = reader.paths[0]
+    assert os.path.getsize(path + INDEX_SUFFIX) > 16
+    offset = CaptureReader._seek_offset(path, 150000)
+    assert FILE_HEADER.size < offset < os.path.getsize(path)
+    with open(path, "rb") as f:
+        f.seek(offset)
+        # The indexed record is at or before the requested timestamp
+        assert int.from_bytes(f.read(8), "little") <= 150000
+    assert list(reader.records(start=150000)) == records[149:]
+
+
+def test_export_text_prefixes_lines(tmp_path):
+    with CaptureWriter(str(tmp_path)) as writer:
+        writer.write(b"boot", 1000)
+        writer.write(b"ing\nlogin: ", 2000000)
+        writer.write(b"\n", 3000000)
+    out = io.StringIO()
+    assert CaptureReader(str(tmp_path)).export_text(out, wall=False) == 2
+    assert out.getvalue() == "    0.000000 booting\n    0.001999 login: \n"
+
+
+def test_export_finds_files_recorded_by_serial(tmp_path, capsys):
+    with CaptureWriter(str(tmp_path), prefix="0001A2B3") as writer:
+        writer.write(b"hello\n")
+    assert main(["export", str(tmp_path), "--serial", "0001A2B3", "--relative"]) == 0
+    assert capsys.readouterr().out.endswith(" hello\n")
+    assert main(["export", str(tmp_path)]) == 1
+
+
+def test_capture_device(loopback, tmp_path):
+    loopback.sim_device.feed(b"abc\0def")
+    with CaptureWriter(str(tmp_path)) as writer:
+        with UartCapture(loopback, writer) as capture:
+            _wait_for(lambda: writer.bytes_captured == 7)
+        assert not capture.running
+    data = b"".join(d for _, d in CaptureReader(str(tmp_path)).records())
+    assert data == b"abc\0def"
+
+
+def test_capture_pump_stops_promptly(loopback, tmp_path):
+    with RxPump(loopback) as pump, CaptureWriter(str(tmp_path)) as writer:
+        capture = UartCapture(pump, writer)
+        capture.start()
+        loopback.sim_device.feed(b"through the pump")
+        _wait_for(lambda: writer.bytes_captured == 16)
+        started = time.monotonic()
+        assert capture.stop(timeout=3)
+        assert time.monotonic() - started < 1.0
+        assert not capture.running
@@ -0,0 +1,108 @@
+import argparse
+import socket
+import threading
+
+import pytest
+
+from cp211x_daemon import DeviceDaemon, _device_arg
+from cp211x_sim import SimulatedDevice
+
+
+@pytest.fixture
+def daemon(simulate):
+    daemon = DeviceDaemon(socket_path="/nonexistent/cp211x.sock")
+    daemon.sim = simulate(SimulatedDevice("A", realtime=False), SimulatedDevice("0042", realtime=False))
+    yield daemon
+    daemon.close()
+
+
+def _info(daemon, device):
+    response = daemon.handle({"id": 1, "method": "info", "params": {"device": device}})
+    assert "error" not in response, response
+    return response["result"]["serial"]
+
+
+def test_digit_strings_are_serials(daemon):
+    assert _info(daemon, "0042") == "0042"
+    assert _info(daemon, None) == "A"
+    assert _info(daemon, 1) == "0042"
+
+
+def test_unknown_digit_serial_is_not_an_index(daemon):
+    response = daemon.handle({"id": 1, "method": "info", "params": {"device": "1"}})
+    assert "error" in response
+
+
+def test_non_string_device_is_rejected(daemon):
+    response = daemon.handle({"id": 1, "method": "info", "params": {"device": 1.0}})
+    assert "invalid parameters" in response["error"]["message"]
+
+
+def test_cli_device_argument():
+    assert _device_arg("0042") == "0042"
+    assert _device_arg("#1") == 1
+    with pytest.raises(argparse.ArgumentTypeError):
+        _device_arg("#x")
+
+
+def test_index_and_serial_share_one_slot(daemon):
+    assert _info(daemon, 0) == "A"
+    assert _info(daemon, "A") == "A"
+    assert _info(daemon, "0042") == "0042"
+    assert _info(daemon, 1) == "0042"
+    assert sorted(daemon._slots) == ["0042", "A"]
+    listing = daemon.handle({"id": 1, "method": "list"})["result"]
+    assert [entry["open"] for entry in listing] == [True, True]
+    daemon.handle({"id": 2, "method": "close", "params": {"device": 0}})
+    assert sorted(daemon._slots) == ["0042"]
+    assert _info(daemon, "A") == "A"
+
+
+def test_slow_open_does_not_block_other_devices(daemon):
+    sim = daemon.sim
+    opening = threading.Event()
+    release = threading.Event()
+    open_device = sim.HidUart_Open
+
+    def slow_open(device, deviceNum, vid, pid):
+        if deviceNum == 0:
+            opening.set()
+            release.wait(5)
+        return open_device(device, deviceNum, vid, pid)
+    sim.HidUart_Open = slow_open
+
+    results = []
+    thread = threading.Thread(target=lambda: results.append(_info(daemon, "A")))
+    thread.start()
+    try:
+        assert opening.wait(5)
+        assert _info(daemon, "0042") == "0042"
+        assert not results
+    finally:
+        release.set()
+        thread.join()
+    assert results == ["A"]
+
+
+def test_stream_sets_timeouts_under_the_slot_lock(daemon):
+    _info(daemon, "A")
+    slot = daemon._slots["A"]
+    device = daemon.sim.devices[0]
+    slot.device.SetTimeouts(500, 600)
+    ours, theirs = socket.socketpair()
+    try:
+        with slot.lock:
+            thread = threading.Thread(target=daemon.stream, args=({"device": "A", "_id": 7}, ours))
+            thread.start()
+            thread.join(0.05)
+            assert device.read_timeout == 500
+        assert theirs.makefile("rb").readline().startswith(b'{"id": 7')
+        assert device.read_timeout == 20
+        theirs.shutdown(socket.SHUT_WR)
+        thread.join(5)
+        assert not thread.is_alive()
+        assert (device.read_timeout, device.write_timeout) == (500, 600)
+        assert not slot.streaming
+    finally:
+        ours.close()
+        theirs.close()
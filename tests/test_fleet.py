@@ -0,0 +1,51 @@
+import time
+
+import pytest
+
+from cp211x_HID_UART import DeviceIndex, HidUartError, HID_UART_DEVICE_ACCESS_ERROR
+from cp211x_fleet import Fleet
+from cp211x_sim import SimulatedDevice
+
+
+def _devices(*serials):
+    return [SimulatedDevice(serial, realtime=False) for serial in serials]
+
+
+def test_power_cycle_all(simulate):
+    devices = _devices("A", "B", "C")
+    simulate(*devices)
+    with Fleet() as fleet:
+        assert sorted(fleet.devices) == ["A", "B", "C"]
+        results = fleet.power_cycle(barrier=True)
+    assert [r.serial for r in results] == ["A", "B", "C"]
+    assert all(r.ok and r.error is None for r in results)
+    assert not any(d.opened for d in devices)
+
+
+def test_open_failure_closes_opened_devices(simulate):
+    devices = _devices("A", "B", "C")
+    simulate(*devices)
+    DeviceIndex.shared().sync()
+    devices[1].opened = True            # held by another process
+    fleet = Fleet()
+    with pytest.raises(HidUartError) as info:
+        fleet.open()
+    assert info.value.status == HID_UART_DEVICE_ACCESS_ERROR
+    assert not devices[0].opened and not devices[2].opened
+    assert len(fleet) == 0
+
+
+def test_late_worker_does_not_overwrite_timeout(simulate):
+    simulate(*_devices("A", "B"))
+
+    def operation(hu, gate, result):
+        if hu.GetString() == "B":
+            time.sleep(0.2)
+        result.latch = hu.ReadLatch()
+
+    with Fleet() as fleet:
+        results = fleet.run(operation, timeout=0.05)
+        time.sleep(0.3)
+    a, b = results
+    assert a.ok and a.latch is not None
+    assert not b.ok and b.error == "timeout" and b.latch is None
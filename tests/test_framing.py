@@ -0,0 +1,126 @@
+import struct
+
+import pytest
+
+from cp211x_framing import (
+    CobsDecoder, DelimiterDecoder, FramedReader, LengthPrefixedDecoder, LineDecoder,
+    SlipDecoder, cobs_encode, length_prefix_encode, slip_encode)
+
+
+def _chunks(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 63, 4096])
+def test_line_decoder_any_chunking(size):
+    text = b"".join(b"line %d\r\n" % i for i in range(50)) + b"tail"
+    decoder = LineDecoder()
+    frames = []
+    for chunk in _chunks(text, size):
+        frames += decoder.decode(chunk)
+    assert frames == [b"line %d\r\n" % i for i in range(50)]
+    assert decoder.pending() == 4 and decoder.frames == 50
+
+
+def test_line_decoder_accepts_memoryview():
+    assert LineDecoder().decode(memoryview(b"abc\ndef")) == [b"abc\n"]
+
+
+def test_memoryview_chunks_keep_every_line():
+    text = b"".join(b"line %04d\n" % i for i in range(200))
+    assert len(text) == 2000
+    decoder = LineDecoder(max_frame=1024)
+    view = memoryview(text)
+    frames = []
+    for i in range(0, len(text), 63):
+        frames += decoder.decode(view[i:i + 63])
+    assert len(frames) == 200 and decoder.errors == 0
+    assert b"".join(frames) == text
+
+
+def test_decode_after_next_frame_keeps_order():
+    decoder = LineDecoder()
+    decoder.feed(b"a\nb\n")
+    assert decoder.next_frame() == b"a\n"
+    assert decoder.decode(b"c\n") == [b"b\n", b"c\n"]
+
+
+def test_line_decoder_strip():
+    decoder = LineDecoder(strip=True)
+    assert decoder.decode(b"a\r\nb\nc") == [b"a", b"b"]
+
+
+def test_multibyte_delimiter_straddles_chunks():
+    decoder = DelimiterDecoder(b"\r\n", include_delimiter=False)
+    assert decoder.decode(b"one\r") == []
+    assert decoder.decode(b"\ntwo\r") == [b"one"]
+    assert decoder.decode(b"\n") == [b"two"]
+
+
+def test_oversized_frame_is_dropped():
+    decoder = LineDecoder(max_frame=8)
+    assert decoder.decode(b"x" * 20) == []
+    assert decoder.errors == 1 and decoder.pending() == 0
+    assert decoder.decode(b"ok\n") == [b"ok\n"]
+
+
+def test_slip_round_trip():
+    payloads = [b"\xc0\xdb plain", b"", b"\xdb\xdd\xdc"]
+    stream = b"".join(slip_encode(p) for p in payloads)
+    decoder = SlipDecoder()
+    frames = []
+    for chunk in _chunks(stream, 3):
+        frames += decoder.decode(chunk)
+    assert frames == [p for p in payloads if p]
+
+
+def test_slip_bad_escape_counts_error():
+    decoder = SlipDecoder()
+    assert decoder.decode(b"\xc0ab\xdbx\xc0ok\xc0") == [b"ok"]
+    assert decoder.errors == 1
+
+
+def test_cobs_round_trip():
+    payloads = [b"\0", b"abc", b"\0\0x\0", bytes(range(1, 256)) * 2, bytes(300)]
+    stream = b"".join(cobs_encode(p) for p in payloads)
+    decoder = CobsDecoder(max_frame=1024)
+    frames = []
+    for chunk in _chunks(stream, 17):
+        frames += decoder.decode(chunk)
+    assert frames == payloads
+
+
+def test_length_prefixed_round_trip():
+    payloads = [b"", b"a", b"\0" * 300]
+    for header, include in ((">H", False), ("<I", True)):
+        stream = b"".join(length_prefix_encode(p, header, include) for p in payloads)
+        decoder = LengthPrefixedDecoder(header, include)
+        frames = []
+        for chunk in _chunks(stream, 5):
+            frames += decoder.decode(chunk)
+        assert frames == payloads
+
+
+def test_length_prefixed_oversize_resyncs():
+    decoder = LengthPrefixedDecoder(max_frame=16)
+    assert decoder.decode(struct.pack(">H", 1000) + b"junk") == []
+    assert decoder.errors == 1 and decoder.pending() == 0
+
+
+def test_framed_reader_over_device(loopback):
+    reader = FramedReader(loopback, chunk_size=64)
+    loopback.Write(b"banner\nlogin: rest")
+    assert reader.readline(timeout=1.0) == b"banner\n"
+    assert reader.read_until(b"login: ", timeout=1.0) == b"login: "
+    assert reader.read(4, timeout=1.0) == b"rest"
+    assert reader.readline(timeout=0.05) == b""
+
+
+def test_framed_reader_iter_frames_returns_leftover(loopback):
+    reader = FramedReader(loopback, chunk_size=64)
+    loopback.Write(slip_encode(b"one") + slip_encode(b"two") + b"\xc0par")
+    frames = []
+    for frame in reader.iter_frames(SlipDecoder(), timeout=0.05):
+        frames.append(frame)
+    assert frames == [b"one", b"two"]
+    assert reader.read(3, timeout=0) == b"par"
@@ -0,0 +1,270 @@
+import ctypes as ct
+import json
+
+import pytest
+
+from cp211x_HID_UART import (
+    _print_json_info, HidUartDevice, HidUartError, HID_UART_DEVICE_IO_FAILED, HID_UART_DEVICE_NOT_FOUND,
+    HID_UART_READ_TIMED_OUT, IO_MODE_AUTO, IO_MODE_LATENCY, IO_MODE_THROUGHPUT)
+from cp211x_sim import SimulatedDevice
+
+
+def test_read_into_keeps_nul_bytes(loopback):
+    payload = b"\x00ab\x00\x00cd\x00"
+    loopback.sim_device.feed(payload)
+    buf = bytearray(32)
+    count = loopback.ReadInto(buf)
+    assert count == len(payload)
+    assert bytes(buf[:count]) == payload
+
+
+def test_read_returns_nul_bytes(loopback):
+    loopback.Write(b"\x00\x01\x00")
+    assert loopback.Read(16) == b"\x00\x01\x00"
+
+
+def test_read_into_memoryview_slice(loopback):
+    loopback.sim_device.feed(b"xyz")
+    buf = bytearray(8)
+    assert loopback.ReadInto(memoryview(buf)[4:]) == 3
+    assert bytes(buf) == b"\0\0\0\0xyz\0"
+
+
+def test_ccomport_forms_report_errors_as_zero(loopback):
+    buf = ct.create_string_buffer(16)
+    loopback.sim.fail('HidUart_Read', HID_UART_DEVICE_IO_FAILED)
+    assert loopback.Read(buf, 16) == 0
+    loopback.sim.fail('HidUart_Write', HID_UART_DEVICE_IO_FAILED)
+    assert loopback.Write(b"abc", 3) == 0
+    assert loopback.Write(b"abc", 3) == 3
+    assert loopback.Read(buf, 16) == 3
+    assert buf.raw[:3] == b"abc"
+
+
+def test_plain_forms_raise(loopback):
+    loopback.sim.fail('HidUart_Read', HID_UART_DEVICE_IO_FAILED)
+    try:
+        loopback.Read(16)
+    except HidUartError as e:
+        assert e.status == HID_UART_DEVICE_IO_FAILED
+    else:
+        raise AssertionError("Read did not raise")
+
+
+def test_open_by_serial(simulate):
+    simulate(SimulatedDevice("A", realtime=False), SimulatedDevice("B", realtime=False))
+    hu = HidUartDevice()
+    hu.Open(serial="B")
+    try:
+        assert hu.GetString() == "B"
+    finally:
+        hu.Close()
+    try:
+        hu.Open(serial="C")
+    except HidUartError as e:
+        assert e.status == HID_UART_DEVICE_NOT_FOUND
+    else:
+        raise AssertionError("Open did not raise")
+
+
+def test_latch_shadow_skips_device_reads(loopback):
+    loopback.WriteLatch(0x1234, 0xFFFF)
+    calls = loopback.sim.calls
+    assert loopback.ReadLatch() == 0x1234
+    assert loopback.sim.calls == calls
+    loopback.WriteLatch(0x0001, 0x000F)
+    assert loopback.ReadLatch() == 0x1231
+    assert loopback.sim_device.latch == 0x1231
+
+
+def test_latch_partially_known_reads_device(loopback):
+    loopback.sim_device.latch = 0xAA00
+    loopback.WriteLatch(0x0055, 0x00FF)
+    calls = loopback.sim.calls
+    assert loopback.ReadLatch() == 0xAA55
+    assert loopback.sim.calls == calls + 1
+    assert loopback.ReadLatch() == 0xAA55
+    assert loopback.sim.calls == calls + 1
+
+
+def test_latch_verify_counts_drift(loopback):
+    loopback.WriteLatch(0x00FF, 0xFFFF)
+    loopback.sim_device.latch = 0x00FE           # pin changed behind our back
+    assert loopback.ReadLatch() == 0x00FF
+    assert loopback.ReadLatch(verify=True) == 0x00FE
+    assert loopback.latch_drift == 1
+    assert loopback.ReadLatch() == 0x00FE
+
+
+def test_latch_transaction_is_one_write(loopback):
+    loopback.WriteLatch(0xFFFF, 0xFFFF)
+    calls = loopback.sim.calls
+    with loopback.LatchTransaction() as tx:
+        tx.low(2).high(3).low(5)
+    assert loopback.sim.calls == calls + 1
+    assert loopback.sim_device.latch == 0xFFFF & ~(1 << 2) & ~(1 << 5)
+    assert loopback.ReadLatch() == loopback.sim_device.latch
+
+
+def test_expect_matches_earliest_pattern(loopback):
+    loopback.sim_device.feed(b"U-Boot 2024\r\nPassword: login: ")
+    assert loopback.expect([r"login: ", r"Password: "], timeout=1.0) == 1
+    assert loopback.before == "U-Boot 2024\r\n"
+    assert loopback.after == "Password: "
+    assert loopback.expect(r"login: ", timeout=1.0) == 0
+    assert loopback.before == ""
+
+
+def test_expect_timeout_keeps_buffer(loopback):
+    loopback.sim_device.feed(b"partial")
+    try:
+        loopback.expect("prompt>", timeout=0.05)
+    except HidUartError as e:
+        assert e.status == HID_UART_READ_TIMED_OUT
+    else:
+        raise AssertionError("expect did not time out")
+    assert loopback.before == "partial"
+    loopback.sim_device.feed(b" prompt>")
+    assert loopback.expect("prompt>", timeout=1.0) == 0
+    assert loopback.before == "partial "
+
+
+def test_sendline_round_trip(loopback):
+    loopback.sendline("echo hi")
+    assert loopback.expect(r"echo hi\r", timeout=1.0) == 0
+    # expect() restores the caller's timeouts
+    assert loopback.GetTimeouts() == (20, 1000)
+
+
+def test_latch_verify_interval_checks_in_background(loopback):
+    import time
+    loopback.WriteLatch(0x00FF, 0xFFFF)
+    loopback.latch_verify_interval = 0.01
+    try:
+        loopback.sim_device.latch = 0x00F0
+        deadline = time.monotonic() + 2.0
+        while loopback.latch_drift == 0 and time.monotonic() < deadline:
+            time.sleep(0.005)
+        assert loopback.latch_drift == 1
+        assert loopback.ReadLatch() == 0x00F0
+    finally:
+        loopback.latch_verify_interval = None
+    assert loopback._latch_timer is None
+
+
+def test_latch_verifier_stops_on_close(loopback):
+    loopback.WriteLatch(0, 0xFFFF)
+    loopback.latch_verify_interval = 0.01
+    loopback.Close()
+    assert loopback._latch_timer is None
+    loopback.Open(0)
+    assert loopback._latch_timer is not None
+    loopback.latch_verify_interval = None
+
+
+def test_json_info_indexes_every_entry(simulate, capsys):
+    sim = simulate(SimulatedDevice("A"), SimulatedDevice("B"))
+    sim.fail("HidUart_Open", HID_UART_DEVICE_NOT_FOUND)
+    assert _print_json_info() == 1
+    infos = json.loads(capsys.readouterr().out)
+    assert [info["index"] for info in infos] == [0, 1]
+    assert "open" in infos[0]["errors"] and infos[1]["serial"] == "B"
+    assert _print_json_info(1) == 0
+    assert json.loads(capsys.readouterr().out)["index"] == 1
+
+
+def test_open_defaults_to_index_zero(simulate):
+    simulate(SimulatedDevice("A", realtime=False), SimulatedDevice("B", realtime=False))
+    hu = HidUartDevice()
+    hu.Open()
+    try:
+        assert hu.GetString() == "A"
+    finally:
+        hu.Close()
+
+
+def test_hot_entry_points_on_compiled_library(simulate, tmp_path):
+    import cp211x_HID_UART as mod
+    from cp211x_bench import build_stub_library
+
+    path = build_stub_library(str(tmp_path))
+    if path is None:
+        pytest.skip("no C compiler for the stub library")
+    lib = mod.SetLibrary(ct.CDLL(path))
+    for fnc in lib._hot_functions:
+        assert fnc.argtypes is None and fnc.errcheck is None
+    hu = HidUartDevice()
+    hu.Open()
+    try:
+        hu.WriteLatch(0x0004, 0x0004)
+        assert hu.ReadLatch(verify=True) == 0xFFFF
+        assert hu.ReadInto(bytearray(16)) == 16
+        assert hu.Write(b"x" * 8) == 8
+        hu.SetTimeouts(20, 30)
+        hu.SetTimeouts(0xFFFFFFFF, 0xFFFFFFFF)
+        assert hu.Write(bytearray(b"y" * 4)) == 4
+        assert hu.GetTimeouts() == (1000, 1000)
+    finally:
+        hu.Close()
+
+
+def test_set_com_timeout_updates_timeouts(loopback):
+    loopback.SetComTimeout(500)
+    assert loopback.GetTimeouts() == (700, 700)
+    assert (loopback._rto, loopback._wto) == (700, 700)
+    loopback.SetIoMode(IO_MODE_LATENCY)
+    loopback.Read(8)
+    loopback.SetIoMode(None)
+    assert loopback.GetTimeouts() == (700, 700)
+
+
+def test_io_mode_latency_waits_for_pending_bytes(loopback):
+    loopback.SetIoMode(IO_MODE_LATENCY)
+    assert loopback.GetIoMode() == (IO_MODE_LATENCY, IO_MODE_LATENCY)
+    assert loopback.Read(8) == b""
+    assert loopback.sim_device.read_timeout == loopback.latency_idle_ms
+    loopback.Write(b"x" * 100)
+    assert loopback.Read(256) == b"x" * 100
+    # Two reports pending: one USB frame each, plus one
+    assert loopback.sim_device.read_timeout == 3
+    assert loopback.sim_device.write_timeout == 1000
+
+
+def test_io_mode_throughput_waits_for_whole_request(loopback):
+    loopback.SetUartConfig(115200)
+    loopback.SetIoMode(IO_MODE_THROUGHPUT)
+    assert loopback.GetIoMode() == (IO_MODE_THROUGHPUT, IO_MODE_THROUGHPUT)
+    loopback.Read(1000)
+    expected = int(1000 * loopback._char_time * 1000.0 * 1.5) + 2
+    assert loopback.sim_device.read_timeout == expected
+    loopback.throughput_max_ms = 50
+    loopback.Read(1000)
+    assert loopback.sim_device.read_timeout == 50
+
+
+def test_io_mode_auto_switches_with_fill_level(loopback):
+    loopback.SetIoMode(IO_MODE_AUTO)
+    assert loopback.GetIoMode() == (IO_MODE_AUTO, IO_MODE_LATENCY)
+    for _ in range(5):
+        loopback.Write(b"y" * 200)
+        assert len(loopback.Read(200)) == 200
+    assert loopback.GetIoMode() == (IO_MODE_AUTO, IO_MODE_THROUGHPUT)
+    for _ in range(10):
+        loopback.Read(200)
+    assert loopback.GetIoMode() == (IO_MODE_AUTO, IO_MODE_LATENCY)
+
+
+def test_io_mode_none_restores_timeouts(loopback):
+    loopback.SetTimeouts(300, 400)
+    loopback.SetIoMode(IO_MODE_LATENCY)
+    loopback.Read(8)
+    assert loopback.GetTimeouts() != (300, 400)
+    loopback.SetIoMode(None)
+    assert loopback.GetIoMode() == (None, None)
+    assert loopback.GetTimeouts() == (300, 400)
+
+    loopback.SetIoMode(IO_MODE_THROUGHPUT)
+    loopback.SetTimeouts(250, 600)
+    loopback.Read(8)
+    loopback.SetIoMode(None)
+    assert loopback.GetTimeouts() == (250, 600)
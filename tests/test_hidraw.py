@@ -0,0 +1,48 @@
+import pytest
+
+from cp211x_HID_UART import HidUartDevice, HID_UART
+from cp211x_hidraw import Cp2110ReportEmulator, HidrawBackend
+
+
+@pytest.fixture
+def emulated():
+    emu = Cp2110ReportEmulator(serial="EMU0")
+    hu = HidUartDevice()
+    hu.Open(0, backend=HidrawBackend(enumerate=emu.enumerate))
+    hu.SetTimeouts(20, 1000)
+    hu.emulator = emu
+    yield hu
+    hu.Close()
+
+
+def test_open_reads_descriptors(emulated):
+    assert emulated.GetString(HID_UART.SERIAL_STR) == "EMU0"
+    assert emulated.GetAttributes()[:2] == (HID_UART.VID, HID_UART.PID)
+
+
+def test_read_into_keeps_nul_bytes_across_reports(emulated):
+    payload = (b"\0" * 70) + b"x\0y" + bytes(range(256))
+    assert emulated.Write(payload) == len(payload)
+    buf = bytearray(len(payload) + 16)
+    count = 0
+    while count < len(payload):
+        got = emulated.ReadInto(memoryview(buf)[count:], len(payload) - count)
+        assert got
+        count += got
+    assert bytes(buf[:count]) == payload
+
+
+def test_uart_config_round_trip(emulated):
+    emulated.SetUartConfig(57600, HID_UART.SEVEN_DATA_BITS, HID_UART.EVEN_PARITY,
+                           HID_UART.LONG_STOP_BIT, HID_UART.RTS_CTS_FLOW_CONTROL)
+    assert emulated.GetUartConfig() == (57600, HID_UART.SEVEN_DATA_BITS, HID_UART.EVEN_PARITY,
+                                        HID_UART.LONG_STOP_BIT, HID_UART.RTS_CTS_FLOW_CONTROL)
+
+
+def test_latch_shadow_over_reports(emulated):
+    emulated.WriteLatch(0x0A0A, 0xFFFF)
+    assert emulated.emulator.latch == 0x0A0A
+    emulated.emulator.latch = 0x0A0B
+    assert emulated.ReadLatch() == 0x0A0A
+    assert emulated.ReadLatch(verify=True) == 0x0A0B
+    assert emulated.latch_drift == 1
@@ -0,0 +1,21 @@
+import os
+import subprocess
+import sys
+
+from cp211x_bench import IMPORT_BUDGET_MS, measure_import_time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_import_within_budget():
+    module_cost, total = measure_import_time(runs=3)
+    assert module_cost * 1e3 <= IMPORT_BUDGET_MS, (
+        "importing cp211x_HID_UART took {:.2f} ms, budget {:.2f} ms".format(
+            module_cost * 1e3, IMPORT_BUDGET_MS))
+
+
+def test_import_does_not_load_library():
+    code = ("import sys, cp211x_HID_UART as m; "
+            "assert isinstance(m._DLL, m._LazyLibrary); "
+            "assert 'cp211x_sim' not in sys.modules")
+    subprocess.check_call([sys.executable, "-c", code], cwd=ROOT)
@@ -0,0 +1,128 @@
+import pytest
+
+import cp211x_HID_UART as hu_mod
+import cp211x_metrics
+from cp211x_HID_UART import (HidUartDevice, HidUartError, HID_UART_DEVICE_IO_FAILED,
+                             HID_UART_SUCCESS)
+from cp211x_metrics import BUCKET_COUNT, InstrumentedLibrary, Metrics, bucket_bounds
+from cp211x_sim import SimulatedDevice
+
+
+@pytest.fixture(autouse=True)
+def no_global_metrics(monkeypatch):
+    monkeypatch.setattr(cp211x_metrics, "_metrics", None)
+
+
+def test_enable_and_disable_swap_the_library(simulate):
+    sim = simulate(SimulatedDevice("M1", loopback=True, realtime=False))
+    metrics = cp211x_metrics.enable()
+    assert isinstance(hu_mod._library(), InstrumentedLibrary)
+    assert cp211x_metrics.get_metrics() is metrics
+    assert cp211x_metrics.enable() is metrics
+
+    hu = HidUartDevice()
+    hu.Open(serial="M1")
+    assert isinstance(hu._dll, InstrumentedLibrary)
+    hu.Close()
+
+    cp211x_metrics.disable()
+    assert hu_mod._library() is sim
+    hu = HidUartDevice()
+    hu.Open(serial="M1")
+    assert hu._dll is sim
+    hu.Write(b"x")
+    hu.Close()
+    assert "HidUart_Write" not in metrics.by_function()
+
+
+def test_enable_with_new_metrics_does_not_wrap_twice(simulate):
+    sim = simulate()
+    first = cp211x_metrics.enable()
+    second = cp211x_metrics.enable(Metrics())
+    assert second is not first
+    lib = hu_mod._library()
+    assert lib.metrics is second and lib.library is sim
+
+
+def test_counts_bytes_and_errors_per_function_and_device(simulate):
+    sim = simulate(SimulatedDevice("M1", loopback=True, realtime=False))
+    metrics = cp211x_metrics.enable()
+    hu = HidUartDevice()
+    hu.Open(serial="M1")
+    hu.SetTimeouts(20, 1000)
+    hu.Write(b"hello")
+    hu.Write(b"abc")
+    assert hu.Read(8) == b"helloabc"
+    sim.fail("HidUart_SetUartConfig", HID_UART_DEVICE_IO_FAILED)
+    with pytest.raises(HidUartError):
+        hu.SetUartConfig(9600)
+    hu.Close()
+
+    functions = metrics.by_function()
+    assert functions["HidUart_Open"].calls == 1
+    assert functions["HidUart_Write"].calls == 2
+    assert functions["HidUart_Write"].bytes == 8
+    assert functions["HidUart_Read"].bytes == 8
+    assert functions["HidUart_SetUartConfig"].statuses == {HID_UART_DEVICE_IO_FAILED: 1}
+
+    devices = metrics.to_dict()["devices"]
+    assert devices["-"]["HidUart_Open"]["calls"] == 1
+    assert devices["M1"]["HidUart_Write"]["statuses"] == {"HID_UART_SUCCESS": 2}
+    assert devices["M1"]["HidUart_SetUartConfig"]["statuses"] == {"HID_UART_DEVICE_IO_FAILED": 1}
+
+
+def test_instrument_labels_an_already_open_device(simulate):
+    simulate(SimulatedDevice("M2", loopback=True, realtime=False))
+    hu = HidUartDevice()
+    hu.Open(serial="M2")
+    metrics = cp211x_metrics.instrument(hu)
+    hu.Write(b"data")
+    hu.Close()
+    assert metrics.to_dict()["devices"]["M2"]["HidUart_Write"]["bytes"] == 4
+    assert not isinstance(hu_mod._library(), InstrumentedLibrary)
+
+
+def test_histogram_bucket_boundaries():
+    metrics = Metrics()
+    bounds = bucket_bounds()
+    assert len(bounds) == BUCKET_COUNT - 1
+    assert bounds[0] == 1024 / 1e9 and bounds[1] == 2048 / 1e9
+    for ns in (0, 1023, 1024, 2047, 2048, 1 << 40):
+        metrics.record("HidUart_Read", "-", HID_UART_SUCCESS, ns)
+    stats = metrics.by_function()["HidUart_Read"]
+    assert stats.buckets[0] == 2
+    assert stats.buckets[1] == 2
+    assert stats.buckets[2] == 1
+    assert stats.buckets[-1] == 1
+    assert sum(stats.buckets) == stats.calls == 6
+    assert stats.max_ns == 1 << 40
+
+
+def test_prometheus_text():
+    metrics = Metrics()
+    metrics.record("HidUart_Write", "M1", HID_UART_SUCCESS, 1500, nbytes=10)
+    metrics.record("HidUart_Write", "M1", HID_UART_DEVICE_IO_FAILED, 3000)
+    text = metrics.to_prometheus(prefix="t")
+    lines = text.splitlines()
+    assert text.endswith("\n")
+    assert "# TYPE t_calls_total counter" in lines
+    assert 't_calls_total{function="HidUart_Write",device="M1",status="HID_UART_SUCCESS"} 1' in lines
+    assert 't_calls_total{function="HidUart_Write",device="M1",status="HID_UART_DEVICE_IO_FAILED"} 1' in lines
+    assert 't_bytes_total{function="HidUart_Write",device="M1"} 10' in lines
+    labels = 'function="HidUart_Write",device="M1"'
+    assert 't_call_duration_seconds_bucket{%s,le="1.024e-06"} 0' % labels in lines
+    assert 't_call_duration_seconds_bucket{%s,le="2.048e-06"} 1' % labels in lines
+    assert 't_call_duration_seconds_bucket{%s,le="4.096e-06"} 2' % labels in lines
+    assert 't_call_duration_seconds_bucket{%s,le="+Inf"} 2' % labels in lines
+    assert 't_call_duration_seconds_sum{%s} 0.000004500' % labels in lines
+    assert 't_call_duration_seconds_count{%s} 2' % labels in lines
+
+
+def test_write_prometheus_replaces_file(tmp_path):
+    metrics = Metrics()
+    metrics.record("HidUart_Open", "-", HID_UART_SUCCESS, 10)
+    path = tmp_path / "cp211x.prom"
+    path.write_text("stale\n")
+    metrics.write_prometheus(str(path))
+    assert path.read_text() == metrics.to_prometheus()
+    assert [p.name for p in tmp_path.iterdir()] == ["cp211x.prom"]
@@ -0,0 +1,98 @@
+import threading
+
+import pytest
+
+from cp211x_HID_UART import (DeviceIndex, HidUartError, HID_UART_DEVICE_ACCESS_ERROR,
+                             HID_UART_DEVICE_IO_FAILED)
+from cp211x_pool import DevicePool
+from cp211x_sim import SimulatedDevice
+
+
+@pytest.fixture
+def pool(simulate):
+    devices = [SimulatedDevice(serial, realtime=False) for serial in ("A", "B")]
+    sim = simulate(*devices)
+    pool = DevicePool(max_idle=None)
+    pool.sim = sim
+    pool.sim_devices = devices
+    yield pool
+    pool.close()
+
+
+def test_default_lease_keeps_first_device(pool):
+    # An open device hides its serial from enumeration; with a backend the
+    # pool enumerates afresh, so only the remembered choice finds "A" again
+    with DevicePool(max_idle=None, backend=pool.sim) as backend_pool:
+        for _ in range(3):
+            with backend_pool.lease() as hu:
+                assert hu.GetString() == "A"
+        stats = backend_pool.stats()
+        assert (stats.misses, stats.hits) == (1, 2)
+        assert backend_pool.open_serials() == ["A"]
+
+
+def test_default_lease_chooses_again_when_device_is_gone(pool):
+    with pool.lease() as hu:
+        assert hu.GetString() == "A"
+    pool.close()
+    del pool.sim.devices[0]
+    DeviceIndex._shared.clear()             # what the hidraw watch reports on unplug
+    with pytest.raises(HidUartError):
+        with pool.lease():
+            pass
+    with pool.lease() as hu:
+        assert hu.GetString() == "B"
+
+
+def test_lease_reuses_handle(pool):
+    with pool.lease("B") as hu:
+        handle = hu.handle.value
+        assert hu.GetString() == "B"
+    with pool.lease("B") as hu:
+        assert hu.handle.value == handle
+    stats = pool.stats()
+    assert (stats.misses, stats.hits) == (1, 1)
+    assert pool.open_serials() == ["B"]
+
+
+def test_lease_reopens_after_reset(pool):
+    with pool.lease("A") as hu:
+        old = hu.handle.value
+        pool.sim.HidUart_Reset(hu.handle)        # board re-enumerated behind the pool
+    with pool.lease("A") as hu:
+        assert hu.handle.value != old
+        hu.WriteLatch(0, 1)
+    assert pool.stats().reopens == 1
+
+
+def test_stale_error_discards_handle(pool):
+    with pytest.raises(HidUartError):
+        with pool.lease("A") as hu:
+            pool.sim.fail('HidUart_GetUartConfig', HID_UART_DEVICE_IO_FAILED)
+            hu.GetUartConfig()
+    assert pool.stats().discards == 1
+    assert pool.open_serials() == []
+    assert not pool.sim_devices[0].opened
+
+
+def test_lease_is_exclusive(pool):
+    entered = threading.Event()
+    release = threading.Event()
+
+    def holder():
+        with pool.lease("A"):
+            entered.set()
+            release.wait(2.0)
+
+    thread = threading.Thread(target=holder)
+    thread.start()
+    try:
+        entered.wait(2.0)
+        with pytest.raises(HidUartError) as info:
+            with pool.lease("A", timeout=0.05):
+                pass
+        assert info.value.status == HID_UART_DEVICE_ACCESS_ERROR
+        assert pool.stats().waits == 1
+    finally:
+        release.set()
+        thread.join()
@@ -0,0 +1,69 @@
+import argparse
+import os
+import select
+import termios
+import time
+import tty
+
+import pytest
+
+from cp211x_HID_UART import HID_UART
+from cp211x_pty import PtyBridge, _cli_config
+
+
+def _wait(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def _read(fd, size, timeout=2.0):
+    data = b""
+    deadline = time.monotonic() + timeout
+    while len(data) < size and time.monotonic() < deadline:
+        if select.select([fd], [], [], 0.05)[0]:
+            data += os.read(fd, size - len(data))
+    return data
+
+
+@pytest.fixture
+def bridge(loopback):
+    bridge = PtyBridge(loopback, poll_interval=0.02, io_mode=None)
+    bridge.start()
+    fd = os.open(bridge.slave_name, os.O_RDWR | os.O_NOCTTY)
+    tty.setraw(fd)
+    bridge.fd = fd
+    yield bridge
+    os.close(fd)
+    bridge.stop()
+
+
+def test_pty_round_trip(bridge):
+    payload = bytes(range(256)) * 4
+    os.write(bridge.fd, payload)
+    assert _read(bridge.fd, len(payload)) == payload
+    assert bridge.tx_bytes == bridge.rx_bytes == len(payload)
+    assert bridge.error is None
+
+
+def test_tcsetattr_baud_reaches_device(bridge):
+    attrs = termios.tcgetattr(bridge.fd)
+    attrs[4] = attrs[5] = termios.B9600
+    termios.tcsetattr(bridge.fd, termios.TCSANOW, attrs)
+    assert _wait(lambda: bridge.config_changes == 1)
+    assert bridge.device.GetUartConfig()[0] == 9600
+    assert bridge.device.sim_device.config[0] == 9600
+
+
+def test_cli_keeps_device_data_bits_and_parity():
+    config = (9600, HID_UART.SEVEN_DATA_BITS, HID_UART.EVEN_PARITY, HID_UART.LONG_STOP_BIT,
+              HID_UART.RTS_CTS_FLOW_CONTROL)
+    unset = argparse.Namespace(baud=None, data=None, parity=None)
+    assert _cli_config(config, unset) == config
+    given = argparse.Namespace(baud=115200, data=8, parity="none")
+    assert _cli_config(config, given) == (
+        115200, HID_UART.EIGHT_DATA_BITS, HID_UART.NO_PARITY, HID_UART.LONG_STOP_BIT,
+        HID_UART.RTS_CTS_FLOW_CONTROL)
@@ -0,0 +1,60 @@
+import time
+
+import pytest
+
+from cp211x_rx import RxOverflowError, RxPump
+
+DATA = bytes(range(40))
+
+
+def _wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+def test_block_keeps_every_byte(loopback):
+    loopback.sim_device.feed(DATA)
+    received = bytearray()
+    with RxPump(loopback, capacity=16, overflow=RxPump.BLOCK) as pump:
+        while len(received) < len(DATA):
+            received += pump.read(8, timeout=1.0)
+        assert pump.stats()['bytes_dropped'] == 0
+        assert pump.high_water <= 16
+    assert bytes(received) == DATA
+
+
+def test_drop_oldest_keeps_newest(loopback):
+    loopback.sim_device.feed(DATA)
+    with RxPump(loopback, capacity=16, overflow=RxPump.DROP_OLDEST) as pump:
+        _wait_for(lambda: pump.bytes_received == len(DATA))
+        assert pump.read(timeout=0) == DATA[-16:]
+        assert pump.bytes_dropped == len(DATA) - 16
+        assert pump.overruns >= 1
+
+
+def test_raise_stops_pump(loopback):
+    loopback.sim_device.feed(DATA)
+    pump = RxPump(loopback, capacity=16, overflow=RxPump.RAISE)
+    pump.start()
+    try:
+        _wait_for(lambda: not pump.running)
+        with pytest.raises(RxOverflowError) as info:
+            pump.read(timeout=0)
+        assert info.value.dropped == 16
+        # The bytes that fitted are still there after the error was reported
+        assert pump.read(timeout=0) == DATA[:16]
+    finally:
+        pump.stop()
+
+
+def test_readinto_keeps_nul_bytes(loopback):
+    payload = b"\0\0a\0b\0"
+    loopback.sim_device.feed(payload)
+    with RxPump(loopback) as pump:
+        buf = bytearray(16)
+        count = 0
+        while count < len(payload):
+            count += pump.readinto(memoryview(buf)[count:], timeout=1.0)
+    assert bytes(buf[:count]) == payload
@@ -0,0 +1,36 @@
+import pytest
+
+from cp211x_HID_UART import HidUartError, HID_UART_DEVICE_IO_FAILED
+from cp211x_sequencer import Sequencer, power_cycle_sequence
+
+
+def test_sequence_runs_steps_in_order(loopback):
+    seq = Sequencer(loopback)
+    seq.add(2, False, 0.001).add(2, True, 0.001)
+    report = seq.run(repeat=3)
+    assert report.error is None and report.repetitions == 3
+    assert len(report.write_ns[0]) == 3
+    assert loopback.sim_device.latch & (1 << 2)
+
+
+def test_power_cycle_sequence(loopback):
+    report = power_cycle_sequence(loopback, off_time=0.002).run()
+    assert report.error is None
+    assert report.elapsed_ns >= 2000000
+
+
+def test_library_error_is_reported(loopback):
+    seq = Sequencer(loopback).add(0, True, 0.0).add(0, False, 0.0)
+    loopback.sim.fail('HidUart_WriteLatch', HID_UART_DEVICE_IO_FAILED)
+    report = seq.run(repeat=2)
+    assert isinstance(report.error, HidUartError)
+    assert report.repetitions == 0
+
+
+def test_other_exceptions_propagate(loopback):
+    def on_repetition(n, report):
+        raise KeyError("bug in callback")
+
+    seq = Sequencer(loopback).add(0, True, 0.0)
+    with pytest.raises(KeyError):
+        seq.run(repeat=2, on_repetition=on_repetition)
@@ -0,0 +1,32 @@
+import pytest
+
+from cp211x_serial import Serial, SerialException
+from cp211x_sim import SimulatedDevice
+
+
+@pytest.fixture
+def devices(simulate):
+    simulate(SimulatedDevice("A", realtime=False), SimulatedDevice("0042", realtime=False))
+
+
+@pytest.mark.parametrize("port, serial", [
+    ("0042", "0042"),
+    ("cp211x://0042", "0042"),
+    ("cp211x://A", "A"),
+    (1, "0042"),
+    ("cp211x://#1", "0042"),
+    ("cp211x://#0", "A"),
+])
+def test_port_forms(devices, port, serial):
+    with Serial(port) as ser:
+        assert ser.device.GetString() == serial
+
+
+def test_digit_string_is_a_serial_not_an_index(devices):
+    with pytest.raises(SerialException):
+        Serial("1")
+
+
+def test_invalid_index_is_rejected(devices):
+    with pytest.raises(SerialException):
+        Serial("cp211x://#x")
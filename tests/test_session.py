@@ -0,0 +1,104 @@
+import pytest
+
+from cp211x_HID_UART import HidUartError, IO_MODE_LATENCY
+from cp211x_sim import SimulatedDevice
+from cp211x_session import ResilientSession
+from cp211x_rx import RxPump
+
+
+def _session(simulate, **kwargs):
+    device = SimulatedDevice("S1", loopback=True, realtime=False)
+    sim = simulate(device)
+    return ResilientSession("S1", initial_backoff=0.001, **kwargs), sim, device
+
+
+def _unplug(sim, session):
+    sim.HidUart_Reset(session.device.handle)
+
+
+def test_reconnect_replays_configuration(simulate):
+    session, sim, device = _session(simulate)
+    with session:
+        session.SetUartConfig(921600)
+        session.SetTimeouts(20, 500)
+        session.WriteLatch(0x0F0F, 0xFFFF)
+        _unplug(sim, session)
+        device.config[0] = 115200
+        device.latch = 0xFFFF
+        assert session.GetUartConfig()[0] == 921600
+        assert session.GetTimeouts() == (20, 500)
+        assert device.latch == 0x0F0F
+        stats = session.stats()
+        assert stats.reconnects == 1 and stats.last_error is not None
+
+
+def test_reconnect_restarts_attached_reader(simulate):
+    reconnected = []
+    session, sim, device = _session(simulate, on_reconnect=reconnected.append)
+    with session:
+        session.SetTimeouts(20, 1000)
+        pump = session.attach_reader(RxPump(session.device))
+        pump.start()
+        _unplug(sim, session)
+        pump._thread.join(1.0)
+        assert not pump.running
+        session.GetUartStatus()
+        assert reconnected == [session]
+        assert pump.running
+        session.Write(b"again")
+        assert pump.read(5, timeout=1.0) == b"again"
+
+
+def test_writes_are_not_retried_after_reconnect(simulate):
+    session, sim, device = _session(simulate)
+    with session:
+        session.WriteLatch(0x0000, 0x0002)
+        _unplug(sim, session)
+        with pytest.raises(HidUartError):
+            session.Write(b"once")
+        assert session.stats().reconnects == 1
+        _unplug(sim, session)
+        with pytest.raises(HidUartError):
+            session.WriteLatch(0x0002, 0x0002)
+        assert session.stats().reconnects == 2
+        assert device.latch & 0x0002 == 0       # replayed, not rewritten
+        session.Write(b"next")
+        assert b"once" not in bytes(device.tx_log)
+
+
+def test_retry_writes_repeats_the_write(simulate):
+    session, sim, device = _session(simulate, retry_writes=True)
+    with session:
+        _unplug(sim, session)
+        session.Write(b"once")
+        assert session.stats().reconnects == 1
+        assert bytes(device.tx_log).endswith(b"once")
+
+
+def test_reconnect_replays_requested_timeouts_and_io_mode(simulate):
+    session, sim, device = _session(simulate)
+    with session:
+        session.SetComTimeout(300)
+        session.SetIoMode(IO_MODE_LATENCY)
+        session.Read(8)
+        assert device.read_timeout != 500
+        _unplug(sim, session)
+        assert session.Read(8) == b""
+        assert session.stats().reconnects == 1
+        assert session.GetIoMode() == (IO_MODE_LATENCY, IO_MODE_LATENCY)
+        assert device.read_timeout == session.device.latency_idle_ms
+        session.SetIoMode(None)
+        assert session.GetTimeouts() == (500, 500)
+
+
+def test_reconnect_replays_latest_timeouts(simulate):
+    session, sim, device = _session(simulate)
+    with session:
+        session.SetTimeouts(20, 400)
+        session.SetComTimeout(100)
+        _unplug(sim, session)
+        assert session.GetTimeouts() == (300, 300)
+        session.SetTimeouts(40, 800)
+        _unplug(sim, session)
+        assert session.GetTimeouts() == (40, 800)
+        assert session.stats().reconnects == 2
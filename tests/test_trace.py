@@ -0,0 +1,107 @@
+import pytest
+
+import cp211x_trace
+from cp211x_HID_UART import HidUartDevice, HidUartError, HID_UART_DEVICE_IO_FAILED
+from cp211x_framing import LineDecoder
+from cp211x_sim import SimulatedDevice
+from cp211x_trace import TraceExhausted, TraceReader, TraceReplay, TraceReplayError
+
+PAYLOAD = b"boot\0log\r\n" * 20
+
+
+def _session(hu):
+    hu.SetUartConfig(921600)
+    hu.SetTimeouts(20, 1000)
+    hu.WriteLatch(0x00F0, 0x00FF)
+    hu.Write(PAYLOAD)
+    buf = bytearray(64)
+    received = bytearray()
+    while len(received) < len(PAYLOAD):
+        count = hu.ReadInto(buf)
+        received += buf[:count]
+    return bytes(received)
+
+
+@pytest.fixture
+def trace(simulate, tmp_path):
+    path = str(tmp_path / "session.trace")
+    simulate(SimulatedDevice("T1", loopback=True, realtime=False))
+    cp211x_trace.record(path)
+    try:
+        hu = HidUartDevice()
+        hu.Open(serial="T1")
+        assert _session(hu) == PAYLOAD
+        hu.Close()
+    finally:
+        cp211x_trace.stop()
+    return path
+
+
+def test_trace_records_calls(trace):
+    with TraceReader(trace) as reader:
+        functions = [rec.function for rec in reader]
+        totals, span = reader.summary()
+    assert functions.count("HidUart_Open") == 1
+    assert functions[-1] == "HidUart_Close"
+    assert totals["HidUart_Write"][2] == len(PAYLOAD)
+    assert totals["HidUart_Read"][2] == len(PAYLOAD)
+    assert span > 0
+
+
+def test_strict_replay_reproduces_session(trace):
+    replay = TraceReplay(trace)
+    hu = HidUartDevice()
+    hu.Open(0, backend=replay)
+    assert _session(hu) == PAYLOAD
+    hu.Close()
+    assert replay.remaining == 0
+    with pytest.raises(TraceExhausted):
+        hu.Open(0, backend=replay)
+    replay.close()
+
+
+def test_strict_replay_rejects_other_calls(trace):
+    replay = TraceReplay(trace)
+    hu = HidUartDevice()
+    hu.Open(0, backend=replay)
+    with pytest.raises(TraceReplayError):
+        hu.SetUartConfig(9600)
+    replay.close()
+
+
+def test_loose_replay_streams_rx(trace):
+    replay = TraceReplay(trace, strict=False)
+    hu = HidUartDevice()
+    hu.Open(0, backend=replay)
+    decoder = LineDecoder()
+    lines = []
+    buf = bytearray(7)
+    while len(lines) < 20:
+        lines += decoder.decode(buf[:hu.ReadInto(buf)])
+    assert lines == [b"boot\0log\r\n"] * 20
+    replay.close()
+
+
+def test_record_device_replays_without_open(simulate, tmp_path):
+    path = str(tmp_path / "device.trace")
+    sim = simulate(SimulatedDevice("T2", loopback=True, realtime=False))
+    hu = HidUartDevice()
+    hu.Open(0)
+    writer = cp211x_trace.TraceWriter(path)
+    cp211x_trace.record_device(hu, writer)
+    sim.fail('HidUart_GetUartStatus', HID_UART_DEVICE_IO_FAILED)
+    with pytest.raises(HidUartError):
+        hu.GetUartStatus()
+    assert _session(hu) == PAYLOAD
+    hu.Close()
+    writer.close()
+
+    replay = TraceReplay(path)
+    hu = HidUartDevice()
+    hu.Open(0, backend=replay)
+    with pytest.raises(HidUartError) as info:
+        hu.GetUartStatus()
+    assert info.value.status == HID_UART_DEVICE_IO_FAILED
+    assert _session(hu) == PAYLOAD
+    hu.Close()
+    replay.close()
@@ -0,0 +1,86 @@
+import pytest
+
+from cp211x_HID_UART import (
+    HID_UART_DEVICE_IO_FAILED, HidUartError, HidUartWriteTimeoutError)
+from cp211x_tx import CoalescingWriter
+
+
+def test_small_writes_coalesce_into_reports(loopback):
+    calls = loopback.sim.calls
+    with CoalescingWriter(loopback, linger=None, report_size=63) as tx:
+        for _ in range(100):
+            tx.write(b"AT\r")
+        assert tx.pending() == 300 % 63
+    assert bytes(loopback.sim_device.tx_log) == b"AT\r" * 100
+    assert tx.transactions == 300 // 63 + 1
+    assert loopback.sim.calls - calls == tx.transactions
+
+
+def test_linger_flushes_partial_report(loopback):
+    import time
+    with CoalescingWriter(loopback, linger=0.001) as tx:
+        tx.write(b"ping")
+        deadline = time.monotonic() + 1.0
+        while tx.pending() and time.monotonic() < deadline:
+            time.sleep(0.001)
+        assert tx.pending() == 0
+    assert bytes(loopback.sim_device.tx_log) == b"ping"
+
+
+def test_error_requeues_unsent_data(loopback):
+    tx = CoalescingWriter(loopback, linger=None)
+    tx.write(b"hello")
+    loopback.sim.fail('HidUart_Write', HID_UART_DEVICE_IO_FAILED)
+    with pytest.raises(HidUartError) as info:
+        tx.flush()
+    assert info.value.status == HID_UART_DEVICE_IO_FAILED
+    assert tx.pending() == 5
+    tx.write(b" world")
+    tx.close()
+    assert bytes(loopback.sim_device.tx_log) == b"hello world"
+
+
+def test_timeout_requeues_tail(loopback):
+    class PartialWrite(object):
+        def __init__(self, device):
+            self.device = device
+            self.fail = True
+
+        def Write(self, data, raiseOnTimeout=False):
+            if self.fail:
+                self.fail = False
+                self.device.Write(data[:2])
+                raise HidUartWriteTimeoutError(2, len(data))
+            return self.device.Write(data)
+
+    tx = CoalescingWriter(PartialWrite(loopback), linger=None)
+    tx.write(b"abcdef")
+    with pytest.raises(HidUartWriteTimeoutError):
+        tx.flush()
+    assert tx.pending() == 4 and tx.timeouts == 1
+    tx.close()
+    assert bytes(loopback.sim_device.tx_log) == b"abcdef"
+
+
+def test_linger_error_stops_retrying_and_keeps_first_error(loopback):
+    import time
+    loopback.sim.fail('HidUart_Write', HID_UART_DEVICE_IO_FAILED, count=1000)
+    tx = CoalescingWriter(loopback, linger=0.001)
+    tx.write(b"ping")
+    deadline = time.monotonic() + 1.0
+    while tx.transactions == 0 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    time.sleep(0.05)
+    assert tx.transactions == 1
+    first = tx._error
+    assert first is not None and first.status == HID_UART_DEVICE_IO_FAILED
+
+    with pytest.raises(HidUartError) as info:
+        tx.write(b" pong")
+    assert info.value is first
+    assert tx.pending() == 4
+
+    loopback.sim.clear_faults()
+    tx.write(b" pong")
+    tx.close()
+    assert bytes(loopback.sim_device.tx_log) == b"ping pong"
@@ -0,0 +1,86 @@
+import os
+import threading
+
+import pytest
+
+from cp211x_HID_UART import HID_UART, HidUartDevice
+from cp211x_sim import SimulatedDevice
+from cp211x_xmodem import ACK, SUB, ModemTransfer
+
+BAUD = 1000000
+
+
+@pytest.fixture
+def pair(simulate):
+    """A sender and a receiver HidUartDevice on cross-connected simulated devices."""
+    a, b = SimulatedDevice("TX"), SimulatedDevice("RX")
+    a.connect(b)
+    simulate(a, b)
+    sender, receiver = HidUartDevice(), HidUartDevice()
+    sender.Open(0)
+    receiver.Open(1)
+    sender.sim_device, receiver.sim_device = a, b
+    yield sender, receiver
+    sender.Close()
+    receiver.Close()
+
+
+def _configure(devices, flow=HID_UART.NO_FLOW_CONTROL):
+    for hu in devices:
+        hu.SetUartConfig(BAUD, HID_UART.EIGHT_DATA_BITS, HID_UART.NO_PARITY,
+                         HID_UART.SHORT_STOP_BIT, flow)
+
+
+def _transfer(receive, send):
+    """Runs receive() on a thread and send() here; returns (received, sent)."""
+    result = {}
+
+    def run():
+        try:
+            result['value'] = receive()
+        except Exception as e:
+            result['error'] = e
+    thread = threading.Thread(target=run)
+    thread.start()
+    sent = send()
+    thread.join(30)
+    assert not thread.is_alive()
+    if 'error' in result:
+        raise result['error']
+    return result['value'], sent
+
+
+@pytest.mark.parametrize("size", [0, 1, 127, 128, 129, 1023, 1024, 1025, 70000])
+def test_xmodem_sizes(pair, size):
+    sender, receiver = pair
+    _configure(pair)
+    data = os.urandom(size)
+    got, stats = _transfer(ModemTransfer(receiver).receive_xmodem,
+                           lambda: ModemTransfer(sender).send_xmodem(data))
+    # XMODEM has no length field: the last block is padded with SUB
+    assert got[:size] == data
+    assert set(got[size:]) <= {SUB} and len(got) - size < 1024
+    assert stats.bytes == size and stats.retransmits == 0
+
+
+def test_ymodem_batch_with_empty_file(pair):
+    sender, receiver = pair
+    _configure(pair)
+    files = [("empty.bin", b""), ("hello.txt", b"hello\n"), ("blob.bin", os.urandom(5000))]
+    got, stats = _transfer(ModemTransfer(receiver).receive_ymodem,
+                           lambda: ModemTransfer(sender).send_ymodem(files))
+    assert got == files
+    assert stats.files == 3 and stats.bytes == 5006
+
+
+def test_ymodem_g_streams_with_rtscts(pair):
+    sender, receiver = pair
+    _configure(pair, HID_UART.RTS_CTS_FLOW_CONTROL)
+    data = os.urandom(20000)
+    rx = ModemTransfer(receiver)
+    got, stats = _transfer(rx.receive_ymodem,
+                           lambda: ModemTransfer(sender).send_ymodem([("g.bin", data)]))
+    assert got == [("g.bin", data)]
+    assert rx.stats.blocks == 20 and stats.retransmits == 0
+    # Streaming: the receiver acknowledges only the final EOT, not each block
+    assert bytes(receiver.sim_device.tx_log).count(bytes([ACK])) == 1